@@ -0,0 +1,295 @@
+"""
+Online backups of the database.
+
+Snapshots are taken with SQLite's backup API through a separate read
+connection, a bounded number of pages per step with a short pause in
+between, on a background thread, so the app keeps working (and writing)
+while a backup runs. Each snapshot is checked with PRAGMA integrity_check
+before it is compressed; the newest KEEP are kept and older ones deleted.
+A snapshot is skipped when nothing has changed since the last one.
+
+    python backup.py create --db kayscoops.db --dir /sdcard/KayScoops/backups
+    python backup.py list --dir /sdcard/KayScoops/backups
+    python backup.py verify /sdcard/KayScoops/backups/kayscoops-20261018-101500-1a2b3c4d-1234.db.gz
+    python backup.py restore /sdcard/KayScoops/backups/kayscoops-20261018-101500-1a2b3c4d-1234.db.gz --db kayscoops.db
+
+The app backs up on a timer into KAYSCOOPS_BACKUP_DIR, or a backups
+folder in its data directory when that is not set. Point it at storage
+that survives losing the tablet (an SD card, a synced folder).
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from db_pool import connect, get_pool
+
+PAGES_PER_STEP = 256       # pages copied per backup step (1 MiB at 4 KiB pages)
+STEP_PAUSE = 0.005         # seconds between steps, so other threads get the database and the GIL
+KEEP = 10                  # snapshots kept in the backup directory
+BACKUP_INTERVAL = 60 * 60  # seconds between scheduled backups while the app runs
+FIRST_BACKUP_DELAY = 120   # seconds after startup before the first one
+PREFIX = "kayscoops-"
+SUFFIX = ".db.gz"
+COMPRESS_LEVEL = 1         # a third of the time of the default level for ~6% bigger files
+
+
+class BackupError(Exception):
+    """A snapshot that failed its integrity check or could not be read."""
+
+
+def default_directory(user_data_dir):
+    return os.environ.get("KAYSCOOPS_BACKUP_DIR") or os.path.join(user_data_dir, "backups")
+
+
+def list_backups(directory):
+    """Snapshot paths in directory, newest first (names start with their time)."""
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n.startswith(PREFIX) and n.endswith(SUFFIX)]
+    return [os.path.join(directory, n) for n in sorted(names, reverse=True)]
+
+
+def _version(conn):
+    """
+    "<device>-<change number>" of the database: the sync change counter
+    moves with every change to clients, items and orders, and a restore
+    changes the device, so equal versions mean equal data.
+    """
+    try:
+        device, seq = conn.execute("SELECT device_id, seq FROM sync_state WHERE id = 1").fetchone()
+    except (sqlite3.OperationalError, TypeError):
+        return None
+    return f"{device[:8]}-{seq}"
+
+
+def check_integrity(path):
+    """Raise BackupError unless the uncompressed database at path passes integrity_check."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{path} is not a readable database ({e})")
+    finally:
+        conn.close()
+    if problems != ["ok"]:
+        raise BackupError(f"{path} failed the integrity check: {'; '.join(problems[:5])}")
+
+
+def _gunzip(path, target):
+    with gzip.open(path, "rb") as src, open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# -----------------------------
+# Backup
+# -----------------------------
+def create_backup(db_path, directory, keep=KEEP, force=False, pages=PAGES_PER_STEP, pause=STEP_PAUSE):
+    """
+    Snapshot db_path into directory and return the new file's path, or
+    None when a snapshot of this exact version exists (unless force).
+    Raises BackupError if the copy fails its integrity check.
+    """
+    os.makedirs(directory, exist_ok=True)
+    source = connect(db_path, read_only=True)
+    try:
+        # One read transaction for the whole copy: under WAL it pins a
+        # snapshot without blocking writers, so the paged copy is never
+        # restarted by a write from the app
+        source.execute("BEGIN")
+        version = _version(source)
+        if not force and version is not None and any(
+            path.endswith(f"-{version}{SUFFIX}") for path in list_backups(directory)
+        ):
+            return None
+
+        name = time.strftime(f"{PREFIX}%Y%m%d-%H%M%S") + (f"-{version}" if version else "") + SUFFIX
+        path = os.path.join(directory, name)
+        partial = path[:-len(SUFFIX)] + ".partial"
+        compressed = path + ".partial"
+        try:
+            target = sqlite3.connect(partial)
+            try:
+                source.backup(target, pages=pages, progress=lambda status, remaining, total: time.sleep(pause))
+                # The copy inherits WAL mode; a single self-contained file is easier to restore
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+            check_integrity(partial)
+            with open(partial, "rb") as src, gzip.open(compressed, "wb", compresslevel=COMPRESS_LEVEL) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(compressed, path)
+        finally:
+            _remove(partial, compressed)
+    finally:
+        source.close()
+
+    rotate(directory, keep)
+    return path
+
+
+def rotate(directory, keep=KEEP):
+    """Delete all but the newest `keep` snapshots; returns the deleted paths."""
+    old = list_backups(directory)[keep:]
+    _remove(*old)
+    return old
+
+
+def verify_backup(path):
+    """Decompress a snapshot to a temporary file and check it; raises BackupError."""
+    scratch = path[:-len(SUFFIX)] + ".verify"
+    try:
+        try:
+            _gunzip(path, scratch)
+        except (OSError, EOFError) as e:
+            raise BackupError(f"{path} cannot be decompressed ({e})")
+        check_integrity(scratch)
+    finally:
+        _remove(scratch)
+
+
+# -----------------------------
+# Restore
+# -----------------------------
+def restore_backup(path, db_path, directory=None):
+    """
+    Replace the contents of db_path with a snapshot. The snapshot is
+    checked first and, with a directory, the current database is backed
+    up there (unless a snapshot of it exists) before being overwritten.
+
+    The data is copied in through the pool's writer connection, so the
+    running app's connections stay valid and see the restored data on
+    their next read. The restored database then gets a new sync device
+    id: its change counter went back in time, so peers must treat it as
+    a device they have never synced with.
+    """
+    scratch = db_path + ".restore"
+    try:
+        try:
+            _gunzip(path, scratch)
+        except (OSError, EOFError) as e:
+            raise BackupError(f"{path} cannot be decompressed ({e})")
+        check_integrity(scratch)
+
+        if directory and os.path.exists(db_path):
+            try:
+                # Not rotated: the snapshot being restored must not be deleted
+                create_backup(db_path, directory, keep=len(list_backups(directory)) + 1)
+            except (BackupError, sqlite3.DatabaseError) as e:
+                # The current database may be the reason for restoring
+                print(f"Warning: could not back up the current database first ({e})")
+
+        from migrations import migrate
+
+        source = sqlite3.connect(scratch)
+        try:
+            with get_pool(db_path).writer() as conn:
+                source.backup(conn)
+                # Snapshots from an older version of the app are upgraded in place
+                migrate(conn)
+        finally:
+            source.close()
+    finally:
+        _remove(scratch)
+
+    from db_ops import DBOps
+    from row_cache import get_cache
+    from sync import new_device
+
+    new_device(DBOps(db_path))
+    for table in ("clients", "items"):
+        get_cache(db_path, table).clear()
+
+
+# -----------------------------
+# Background backups
+# -----------------------------
+_running = threading.Lock()
+
+
+def backup_in_background(db_path, directory, callback=None, on_error=None):
+    """
+    Run create_backup on its own thread (not the DB executor, so queued
+    queries are not held up behind it). callback(path or None) or
+    on_error(exception) runs on the Kivy main thread. Returns False if a
+    backup is already running.
+    """
+    from kivy.clock import Clock
+
+    if not _running.acquire(blocking=False):
+        return False
+
+    def deliver(fn, value):
+        if fn is not None:
+            Clock.schedule_once(lambda dt: fn(value))
+
+    def work():
+        try:
+            path = create_backup(db_path, directory)
+        except Exception as e:
+            if on_error is None:
+                print(f"Backup failed: {e}")
+            deliver(on_error, e)
+        else:
+            deliver(callback, path)
+        finally:
+            _running.release()
+
+    threading.Thread(target=work, name="backup", daemon=True).start()
+    return True
+
+
+# -----------------------------
+# Command line
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Backups of the KayScoops database")
+    parser.add_argument("action", choices=["create", "list", "verify", "restore"])
+    parser.add_argument("path", nargs="?", help="snapshot to verify or restore")
+    parser.add_argument("--db", help="path to kayscoops.db")
+    parser.add_argument("--dir", help="backup directory")
+    parser.add_argument("--keep", type=int, default=KEEP, help="snapshots to keep")
+    parser.add_argument("--force", action="store_true", help="back up even if nothing changed")
+    args = parser.parse_args()
+
+    try:
+        if args.action == "create":
+            if not (args.db and args.dir):
+                parser.error("create needs --db and --dir")
+            start = time.perf_counter()
+            path = create_backup(args.db, args.dir, keep=args.keep, force=args.force)
+            if path is None:
+                print("Nothing changed since the last backup")
+            else:
+                print(f"Backed up to {path} ({os.path.getsize(path) / 1024:.0f} KiB) "
+                      f"in {time.perf_counter() - start:.2f}s")
+        elif args.action == "list":
+            if not args.dir:
+                parser.error("list needs --dir")
+            for path in list_backups(args.dir):
+                print(f"{os.path.basename(path)}  {os.path.getsize(path) / 1024:>10.0f} KiB")
+        elif args.action == "verify":
+            if not args.path:
+                parser.error("verify needs a snapshot")
+            verify_backup(args.path)
+            print(f"{args.path}: ok")
+        else:
+            if not (args.path and args.db):
+                parser.error("restore needs a snapshot and --db")
+            restore_backup(args.path, args.db, args.dir)
+            print(f"Restored {args.db} from {args.path}")
+    except BackupError as e:
+        raise SystemExit(f"Backup error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+
+# The benchmarks take their own flags; keep Kivy (imported through db.py)
+# from parsing the command line, and quiet on the console
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
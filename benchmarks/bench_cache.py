@@ -0,0 +1,74 @@
+"""
+Check that the client/item row cache notices writes made outside this
+process (the bulk_io, sync and backup command lines) and measure what
+the version check costs a cache hit.
+
+A separate sqlite3 connection stands in for the other process: it
+renames a client and changes an item's stock, and the next fetch must
+miss and return the new values. A sale saved through DBOps must still
+leave the cache warm. Exits non-zero if either check fails.
+
+Run from the project root:
+    python -m benchmarks.bench_cache [--repeat 2000]
+"""
+import argparse
+import sqlite3
+import sys
+import time
+
+from benchmarks.bench_save_scoop import fresh_db
+from row_cache import get_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    db = fresh_db()
+    clients = get_cache(db.db_path, "clients")
+    items = get_cache(db.db_path, "items")
+    failures = []
+
+    db.fetch_clients()
+    db.fetch_items()
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        db.fetch_clients()
+    print(f"cached fetch_clients: {(time.perf_counter() - start) / args.repeat * 1e6:.1f} us per call")
+
+    # Writes made here patch the cache and keep it warm
+    db.save_scoop(1, 150.0, [{"item_id": 1, "quantity": 1}])
+    misses = clients.misses, items.misses
+    db.fetch_clients()
+    db.fetch_items()
+    if (clients.misses, items.misses) != misses:
+        failures.append("a sale saved through DBOps emptied the cache")
+
+    # Another process writes
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("UPDATE clients SET name = 'Renamed Elsewhere' WHERE id = 1")
+    conn.execute("UPDATE items SET name = 'Restocked Elsewhere', quantity = 7 WHERE id = 2")
+    conn.commit()
+    conn.close()
+
+    misses = clients.misses, items.misses
+    client_names = {row[0]: row[1] for row in db.fetch_clients()}
+    item_rows = {row[0]: row for row in db.fetch_items()}
+    if clients.misses == misses[0] or items.misses == misses[1]:
+        failures.append("fetch after an outside write was served from the cache")
+    if client_names.get(1) != "Renamed Elsewhere":
+        failures.append(f"client 1 is {client_names.get(1)!r} after an outside rename")
+    if item_rows.get(2, (None, None, None))[1:3] != ("Restocked Elsewhere", 7):
+        failures.append(f"item 2 is {item_rows.get(2)!r} after an outside restock")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: outside writes invalidate the cache, own writes keep it warm")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Invoices rendered per second: a fresh InvoiceRenderer per invoice (cold,
+the old behaviour of re-reading the logo every time) versus one reused
+renderer (warm). Output goes to memory, so disk speed is not measured.
+
+Run from the project root:
+    python -m benchmarks.bench_invoice_render [--invoices 200] [--lines 5]
+"""
+import argparse
+import time
+
+from invoice_generator import InvoiceRenderer
+
+
+def make_invoice(n, lines):
+    return {
+        "scoop_id": n,
+        "date": "2025-01-31 12:00:00",
+        "total_price": 300.0,
+        "client_name": f"Client {n}",
+        "phone": "0821234567",
+        "email": f"client{n}@example.com",
+        "items": [(f"Item {i}", 1 + i % 3, 25.0, 80.0) for i in range(lines)],
+    }
+
+
+def run(label, invoices, renderer_for):
+    start = time.perf_counter()
+    size = 0
+    for invoice in invoices:
+        size += len(renderer_for().render(invoice))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8}{len(invoices) / elapsed:>14.1f}{elapsed * 1000 / len(invoices):>14.2f}"
+          f"{size / len(invoices) / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args()
+    invoices = [make_invoice(n, args.lines) for n in range(1, args.invoices + 1)]
+
+    print(f"{args.invoices} invoices x {args.lines} lines")
+    print(f"{'mode':<8}{'invoices/s':>14}{'ms/invoice':>14}{'KiB/pdf':>12}")
+    run("cold", invoices, InvoiceRenderer)
+    warm = InvoiceRenderer()
+    run("warm", invoices, lambda: warm)
+
+
+if __name__ == "__main__":
+    main()
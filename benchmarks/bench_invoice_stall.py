@@ -0,0 +1,91 @@
+"""
+Check that the Kivy main loop keeps ticking while invoices are generated.
+
+No window is opened: the clock is ticked by hand at ~60 fps while a batch
+of invoices is requested, first inline on the main thread (the old
+@mainthread behaviour) and then on the invoice worker. Exits non-zero if
+any frame on the worker run took longer than --max-frame-ms.
+
+Run from the project root:
+    python -m benchmarks.bench_invoice_stall [--invoices 50] [--max-frame-ms 50]
+"""
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KCFG_GRAPHICS_MAXFPS", "0")
+
+import argparse
+import sys
+import tempfile
+import time
+
+from kivy.clock import Clock
+
+from benchmarks.bench_save_scoop import fresh_db, make_scoops
+from db_executor import DBExecutor
+from invoice_generator import generate_invoice
+
+FRAME_MS = 1000 / 60
+
+
+def run_loop(scoop_ids, request, finished):
+    """Request one invoice per frame, tick until all are done; frame times in ms."""
+    work = []
+    pending = list(scoop_ids)
+    while pending or finished() < len(scoop_ids):
+        start = time.perf_counter()
+        Clock.tick()
+        if pending:
+            request(pending.pop(0))
+        elapsed = (time.perf_counter() - start) * 1000
+        work.append(elapsed)
+        time.sleep(max(0.0, (FRAME_MS - elapsed) / 1000))
+    return work
+
+
+def summarize(label, work, count):
+    ordered = sorted(work)
+    janky = sum(1 for w in work if w > FRAME_MS)
+    print(f"{label:<10}{count:>10}{len(work):>8}{ordered[-1]:>10.1f}"
+          f"{ordered[int(len(ordered) * 0.95) - 1]:>10.1f}{janky:>8}")
+    return ordered[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=50)
+    parser.add_argument("--max-frame-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    db = fresh_db()
+    scoop_ids = db.save_scoops(make_scoops(args.invoices))
+    out_dir = tempfile.mkdtemp(prefix="kayscoops-invoices-")
+
+    def make(scoop_id):
+        generate_invoice(scoop_id, os.path.join(out_dir, f"invoice_{scoop_id}.pdf"), db=db)
+
+    print(f"{'mode':<10}{'invoices':>10}{'frames':>8}{'max ms':>10}{'p95 ms':>10}{'janky':>8}")
+
+    done = []
+    inline = run_loop(scoop_ids, lambda scoop_id: done.append(make(scoop_id)), lambda: len(done))
+    summarize("inline", inline, len(done))
+
+    executor = DBExecutor(name="bench-invoice-worker")
+    done = []
+    background = run_loop(
+        scoop_ids,
+        lambda scoop_id: executor.submit(make, scoop_id, callback=done.append),
+        lambda: len(done),
+    )
+    executor.shutdown()
+    worst = summarize("worker", background, len(done))
+
+    if worst > args.max_frame_ms:
+        print(f"FAIL: a frame took {worst:.1f} ms while invoices rendered in the background")
+        sys.exit(1)
+    print(f"OK: main loop kept ticking (worst frame {worst:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure how long the Kivy main thread stalls while search queries run,
+inline on the main thread versus on the background DB executor.
+
+No window is opened: the Kivy clock is ticked by hand at ~60 fps and every
+few frames a "keystroke" issues a client search. Exits non-zero if any
+frame on the executor run took longer than --max-frame-ms.
+
+Run from the project root:
+    python -m benchmarks.bench_main_thread_stall [--clients 100000] [--seconds 5] [--max-frame-ms 50]
+"""
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+# Let the loop below pace frames instead of Clock.tick() sleeping itself
+os.environ.setdefault("KCFG_GRAPHICS_MAXFPS", "0")
+
+import argparse
+import sys
+import tempfile
+import time
+
+from kivy.clock import Clock
+
+from benchmarks.bench_search import TERMS, populate
+from db import init_db
+from db_executor import DBExecutor
+from db_ops import DBOps
+
+FRAME_MS = 1000 / 60
+FRAMES_PER_KEYSTROKE = 6
+
+
+def run_loop(seconds, on_keystroke):
+    """Tick the clock at ~60 fps and return the main-thread work time per frame (ms)."""
+    work = []
+    frame = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        Clock.tick()  # delivers executor results scheduled with Clock.schedule_once
+        if frame % FRAMES_PER_KEYSTROKE == 0:
+            on_keystroke(TERMS[(frame // FRAMES_PER_KEYSTROKE) % len(TERMS)])
+        elapsed = (time.perf_counter() - start) * 1000
+        work.append(elapsed)
+        frame += 1
+        time.sleep(max(0.0, (FRAME_MS - elapsed) / 1000))
+    return work
+
+
+def summarize(label, work, delivered):
+    ordered = sorted(work)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    janky = sum(1 for w in work if w > FRAME_MS)
+    print(f"{label:<10}{len(work):>8}{ordered[-1]:>10.1f}{p95:>10.1f}"
+          f"{sum(work):>12.0f}{janky:>8}{delivered:>11}")
+    return ordered[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--max-frame-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "bench.db")
+    init_db(db_path)
+    db = DBOps(db_path)
+    populate(db, args.clients)
+
+    print(f"{args.clients} clients, a search every {FRAMES_PER_KEYSTROKE} frames for {args.seconds:.0f}s")
+    print(f"{'mode':<10}{'frames':>8}{'max ms':>10}{'p95 ms':>10}"
+          f"{'stall ms':>12}{'janky':>8}{'results':>11}")
+
+    delivered = []
+    inline = run_loop(args.seconds, lambda term: delivered.append(db.fetch_clients(term)))
+    summarize("inline", inline, len(delivered))
+
+    executor = DBExecutor(name="bench-db-worker")
+    delivered = []
+    background = run_loop(
+        args.seconds,
+        lambda term: executor.submit(db.fetch_clients, term, callback=delivered.append, key="search"),
+    )
+    # Drain whatever is still in flight so the worker exits cleanly
+    executor.shutdown()
+    Clock.tick()
+    worst = summarize("executor", background, len(delivered))
+
+    if worst > args.max_frame_ms:
+        print(f"FAIL: a frame took {worst:.1f} ms while searches ran on the executor")
+        sys.exit(1)
+    print(f"OK: main loop kept ticking (worst frame {worst:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
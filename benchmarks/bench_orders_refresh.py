@@ -0,0 +1,87 @@
+"""
+Cost of refreshing the Orders list after a sale as order history grows:
+rebuilding every row as a display string (the old screen before
+pagination), reloading the first page, and the incremental update that
+only fetches orders newer than the top row and prepends them.
+
+Run from the project root (builds or reuses datagen templates):
+    python -m benchmarks.bench_orders_refresh [--sizes 10000,100000,1000000] [--loaded 500]
+"""
+import argparse
+import time
+
+from benchmarks.datagen import DEFAULTS, fresh_copy
+from db_ops import DBOps, PAGE_SIZE
+
+
+def order_row(order):
+    scoop_id, client, date, total, client_id = order
+    return {"scoop_id": scoop_id, "client_id": client_id, "client": client, "date": date, "total": total}
+
+
+def best_ms(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(db, loaded, repeat):
+    # What the screen holds after the user scrolled through `loaded` orders
+    data = []
+    while len(data) < loaded:
+        last = data[-1] if data else None
+        page = db.fetch_orders_page(before=(last["date"], last["scoop_id"]) if last else None)
+        if not page:
+            break
+        data.extend(order_row(o) for o in page)
+
+    def rebuild_all():
+        return [f"ID: {o[0]} | Client: {o[1]} | Date: {o[2]} | Total: R{o[3]:.2f}" for o in db.fetch_orders()]
+
+    def first_page():
+        return [order_row(o) for o in db.fetch_orders_page()]
+
+    def incremental():
+        newest = data[0]
+        new_orders = db.fetch_orders_since((newest["date"], newest["scoop_id"]), PAGE_SIZE)
+        names = db.fetch_client_names({row["client_id"] for row in data})
+        for index, row in enumerate(data):
+            name = names.get(row["client_id"], row["client"])
+            if name != row["client"]:
+                data[index] = dict(row, client=name)
+        data[0:0] = [order_row(o) for o in new_orders]
+
+    def sale():
+        db.save_scoop(data[0]["client_id"], 150.0, [])
+
+    results = {"rebuild all": best_ms(rebuild_all, 1), "first page": best_ms(first_page, repeat)}
+    times = []
+    for _ in range(repeat):
+        sale()
+        times.append(best_ms(incremental, 1))
+    results["incremental"] = min(times)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="scoop counts to compare")
+    parser.add_argument("--clients", type=int, default=DEFAULTS["clients"])
+    parser.add_argument("--items", type=int, default=DEFAULTS["items"])
+    parser.add_argument("--loaded", type=int, default=500, help="orders already on screen")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'scoops':>10}{'rebuild all':>14}{'first page':>13}{'incremental':>14}   (ms)")
+    for size in (int(n) for n in args.sizes.split(",")):
+        db = DBOps(fresh_copy(args.clients, args.items, size))
+        r = run(db, args.loaded, args.repeat)
+        print(f"{size:>10}{r['rebuild all']:>14.1f}{r['first page']:>13.2f}{r['incremental']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
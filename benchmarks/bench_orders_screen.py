@@ -0,0 +1,88 @@
+"""
+Check that the Orders screen survives coming back to it after a sale:
+the incremental update prepends the new order to a live RecycleView, and
+the next layout pass must not trip over the RecycleView's row bookkeeping
+(inserting with data[0:0] = ... made it fail
+`assert len(data) == len(opts)`).
+
+No window is opened: the real OrdersScreen is built from its kv file and
+the Kivy clock is ticked by hand. Exits non-zero on failure.
+
+Run from the project root:
+    python -m benchmarks.bench_orders_screen
+"""
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+import sys
+import threading
+import time
+
+from kivy.clock import Clock
+
+from benchmarks.bench_save_scoop import fresh_db
+from db_executor import get_executor, shutdown_executor
+from orders_window import OrdersScreen
+
+
+def tick_until(condition, timeout=10.0):
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            return False
+        Clock.tick()
+        time.sleep(0.01)
+    # A few more frames so the RecycleView lays out the new rows
+    for _ in range(3):
+        Clock.tick()
+    return True
+
+
+def main():
+    db = fresh_db()
+    for n in range(5):
+        db.save_scoop(n + 1, 150.0, [{"item_id": n + 1, "quantity": 1}])
+
+    screen = OrdersScreen()
+    # Hold the DB worker so the screen's DBOps gets the benchmark database
+    # before its first query runs
+    ready = threading.Event()
+    get_executor().submit(ready.wait)
+    screen.on_pre_enter()
+    screen.db.db_path = db.db_path
+    ready.set()
+
+    failures = []
+    if not tick_until(lambda: screen.loaded and len(screen.orders) == 5):
+        failures.append(f"first page never arrived ({len(screen.orders)} rows)")
+
+    scoop_id = db.save_scoop(2, 99.0, [{"item_id": 3, "quantity": 1}])
+    _, _, contact, email, _ = next(row for row in db.fetch_clients() if row[0] == 1)
+    db.update_client(1, "Renamed Client", contact, email)
+    screen.on_pre_enter()  # coming back to the screen
+    try:
+        tick_until(lambda: len(screen.orders) == 6)
+    except AssertionError as e:
+        failures.append(f"the RecycleView failed after the update ({e!r})")
+    else:
+        rows = screen.orders
+        if len(rows) != 6 or rows[0]["scoop_id"] != scoop_id:
+            failures.append(f"new order not at the top: {[row['scoop_id'] for row in rows]}")
+        views = len(screen.ids.rv_orders.layout_manager.view_opts)
+        if views != len(rows):
+            failures.append(f"{len(rows)} rows but the layout knows {views}")
+        if not any(row["client"] == "Renamed Client" for row in rows):
+            failures.append("renamed client not patched into the list")
+
+    shutdown_executor()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: new orders are prepended to the live list")
+
+
+if __name__ == "__main__":
+    main()
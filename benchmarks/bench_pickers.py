@@ -0,0 +1,59 @@
+"""
+New Scoop pickers: every matching row formatted into the Spinner (the old
+fetch_clients/fetch_items path) versus the ranked top-N from
+pick_clients/pick_items.
+
+Run from the project root (builds or reuses a datagen template):
+    python -m benchmarks.bench_pickers [--clients 100000] [--items 5000] [--scoops 1000000]
+"""
+import argparse
+import time
+
+from benchmarks.datagen import DEFAULTS, fresh_copy
+from db_ops import DBOps
+from row_cache import get_cache
+
+TERMS = ["", "a", "an", "smith", "pink", "teddy"]
+
+
+def timed_ms(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=DEFAULTS["clients"])
+    parser.add_argument("--items", type=int, default=DEFAULTS["items"])
+    parser.add_argument("--scoops", type=int, default=DEFAULTS["scoops"])
+    args = parser.parse_args()
+
+    db = DBOps(fresh_copy(args.clients, args.items, args.scoops))
+    caches = [get_cache(db.db_path, "clients"), get_cache(db.db_path, "items")]
+
+    def all_clients(term):
+        for cache in caches:
+            cache.clear()
+        return [f"{c[1]} (ID:{c[0]})" for c in db.fetch_clients(term)]
+
+    def all_items(term):
+        for cache in caches:
+            cache.clear()
+        return [f"{i[1]} (Stock:{i[2]})" for i in db.fetch_items(term)]
+
+    print(f"{'picker':<8}{'term':<8}{'all rows':>10}{'ms':>9}{'top N':>8}{'ms':>9}")
+    for label, everything, ranked in (("clients", all_clients, db.pick_clients),
+                                      ("items", all_items, db.pick_items)):
+        for term in TERMS:
+            old_ms, old = timed_ms(lambda: everything(term))
+            new_ms, new = timed_ms(lambda: ranked(term))
+            print(f"{label:<8}{term or '-':<8}{len(old):>10}{old_ms:>9.1f}{len(new):>8}{new_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
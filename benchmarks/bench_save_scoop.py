@@ -0,0 +1,106 @@
+"""
+Throughput of saving scoops: the old per-line statements, save_scoop one at
+a time, and save_scoops committing queued scoops in batches.
+
+Run from the project root:
+    python -m benchmarks.bench_save_scoop [--scoops 5000] [--batch 100]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from db import init_db
+from db_ops import DBOps, local_now_str
+
+CLIENTS = 1000
+ITEMS = 500
+LINES_PER_SCOOP = 3
+
+
+def fresh_db(seed=7):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "bench.db")
+    init_db(db_path)
+    db = DBOps(db_path)
+    rng = random.Random(seed)
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO clients (name, contact_info, email) VALUES (?, ?, ?)",
+            [(f"Client {n}", "", f"client{n}@example.com") for n in range(CLIENTS)]
+        )
+        conn.executemany(
+            "INSERT INTO items (name, quantity, cost_price, selling_price) VALUES (?, ?, ?, ?)",
+            [(f"Item {n}", 10**9, rng.uniform(5, 50), rng.uniform(60, 150)) for n in range(ITEMS)]
+        )
+    return db
+
+
+def make_scoops(count, seed=11):
+    rng = random.Random(seed)
+    return [
+        {
+            "client_id": rng.randint(1, CLIENTS),
+            "scoop_price": 300.0,
+            "items": [
+                {"item_id": item_id, "quantity": rng.randint(1, 3)}
+                for item_id in rng.sample(range(1, ITEMS + 1), LINES_PER_SCOOP)
+            ],
+        }
+        for _ in range(count)
+    ]
+
+
+def legacy_save_scoop(db, client_id, scoop_price, items):
+    """The pre-batching implementation: one statement per line, no stock check."""
+    with db.writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO scoops (client_id, date, total_price, video_url) VALUES (?, ?, ?, ?)",
+            (client_id, local_now_str(), scoop_price, None)
+        )
+        scoop_id = cursor.lastrowid
+        for i in items:
+            cursor.execute(
+                "INSERT INTO scoop_items (scoop_id, item_id, quantity) VALUES (?, ?, ?)",
+                (scoop_id, i["item_id"], i["quantity"])
+            )
+            cursor.execute("UPDATE items SET quantity = quantity - ? WHERE id = ?", (i["quantity"], i["item_id"]))
+        cursor.execute(
+            "UPDATE clients SET total_spent = total_spent + ? WHERE id = ?",
+            (scoop_price, client_id)
+        )
+
+
+def run(label, scoops, save):
+    start = time.perf_counter()
+    save(scoops)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{len(scoops) / elapsed:>14.0f}{elapsed * 1000:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scoops", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+    scoops = make_scoops(args.scoops)
+
+    print(f"{args.scoops} scoops x {LINES_PER_SCOOP} lines")
+    print(f"{'mode':<28}{'scoops/s':>14}{'total ms':>12}")
+
+    db = fresh_db()
+    run("legacy per-line", scoops,
+        lambda s: [legacy_save_scoop(db, x["client_id"], x["scoop_price"], x["items"]) for x in s])
+
+    db = fresh_db()
+    run("save_scoop", scoops,
+        lambda s: [db.save_scoop(x["client_id"], x["scoop_price"], x["items"]) for x in s])
+
+    db = fresh_db()
+    run(f"save_scoops (batch {args.batch})", scoops,
+        lambda s: [db.save_scoops(s[i:i + args.batch]) for i in range(0, len(s), args.batch)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare the legacy LIKE search with the trigram FTS5 search on 100k clients.
+
+Run from the project root:
+    python -m benchmarks.bench_search [--clients 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from db import init_db
+from db_ops import DBOps
+
+FIRST_NAMES = ["Ann", "Bongani", "Chloe", "Dineo", "Elsa", "Fikile", "Grace", "Hannah",
+               "Imran", "Johan", "Kagiso", "Lerato", "Marco", "Naledi", "Olivia", "Pieter"]
+LAST_NAMES = ["Smith", "Nkosi", "van Wyk", "Botha", "Dlamini", "Naidoo", "Pillay", "Mokoena",
+              "Jacobs", "Steyn", "Khumalo", "Adams", "Peters", "Venter", "Mahlangu", "Fourie"]
+TERMS = ["smith", "van w", "dlam", "@gmail", "082", "zzzz"]
+
+LIKE_QUERY = """
+    SELECT id, name, contact_info, email, total_spent
+    FROM clients
+    WHERE name LIKE ? OR contact_info LIKE ? OR email LIKE ?
+"""
+
+
+def populate(db, count, seed=42):
+    rng = random.Random(seed)
+    rows = []
+    for n in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append((
+            f"{first} {last}",
+            f"0{rng.randint(60, 84)}{rng.randint(1000000, 9999999)}",
+            f"{first}.{last.replace(' ', '')}{n}@{rng.choice(['gmail.com', 'mweb.co.za', 'icloud.com'])}".lower(),
+        ))
+    with db.writer() as conn:
+        conn.executemany("INSERT INTO clients (name, contact_info, email) VALUES (?, ?, ?)", rows)
+
+
+def time_it(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "bench.db")
+    init_db(db_path)
+    db = DBOps(db_path)
+    populate(db, args.clients)
+
+    def like_search(term):
+        with db.reader() as conn:
+            like = f"%{term}%"
+            return conn.execute(LIKE_QUERY, (like, like, like)).fetchall()
+
+    print(f"{args.clients} clients, mean of {args.repeat} runs")
+    print(f"{'term':<10}{'rows':>8}{'LIKE ms':>12}{'FTS ms':>12}{'speedup':>10}")
+    for term in TERMS:
+        like_ms, like_rows = time_it(lambda: like_search(term), args.repeat)
+        fts_ms, fts_rows = time_it(lambda: db.fetch_clients(term), args.repeat)
+        assert like_rows == fts_rows, f"result mismatch for {term!r}: {like_rows} vs {fts_rows}"
+        print(f"{term:<10}{fts_rows:>8}{like_ms:>12.2f}{fts_ms:>12.2f}{like_ms / fts_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Stock-at-date lookups on a ledger of a million movements: nearest snapshot
+plus the movements after it, versus replaying the item's whole history.
+Also checks that a lookup reads no movement its snapshot already covers,
+and that a sale stamped earlier than the latest snapshot still counts.
+
+Run from the project root:
+    python -m benchmarks.bench_stock_ledger [--movements 1000000] [--items 200] [--days 730]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from db import init_db
+from db_ops import DBOps
+
+REPLAY_QUERY = """
+    SELECT COALESCE(SUM(change), 0) FROM stock_movements
+    WHERE item_id = ? AND at <= ?
+"""
+
+
+def populate(db, movements, items, days, seed=3):
+    """Spread movements over `days`, taking the daily snapshot after each day."""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    with db.writer() as conn:
+        conn.executemany(
+            "INSERT INTO items (name, quantity, cost_price, selling_price) VALUES (?, 0, 10, 20)",
+            [(f"Item {n}",) for n in range(items)]
+        )
+        # Backdate the opening movements so the ledger stays in time order
+        conn.execute("UPDATE stock_movements SET at = ?", (f"{start - timedelta(days=1)} 00:00:00",))
+    per_day = movements // days
+    for d in range(days):
+        day = (start + timedelta(days=d)).isoformat()
+        rows = []
+        for n in range(per_day):
+            at = f"{day} {n * 86399 // per_day // 3600:02d}:{n * 86399 // per_day // 60 % 60:02d}:00"
+            if rng.random() < 0.1:
+                rows.append((rng.randint(1, items), at, "restock", rng.randint(20, 100)))
+            else:
+                rows.append((rng.randint(1, items), at, "sale", -rng.randint(1, 3)))
+        with db.writer() as conn:
+            conn.executemany(
+                "INSERT INTO stock_movements (item_id, at, kind, change) VALUES (?, ?, ?, ?)", rows
+            )
+        db.take_stock_snapshots()
+    return start
+
+
+def check_out_of_order():
+    """
+    Stock 10, sell 1, snapshot, then sell 4 stamped before the snapshot
+    (a clock correction, or a sale synced from another device): the
+    snapshots and stock_at must still count it and reconcile must leave
+    the correct stock of 5 alone.
+    """
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "order.db")
+    init_db(db_path)
+    db = DBOps(db_path)
+    db.add_client("Ledger Check", "", "")
+    db.add_item("Ledger Item", 10, 1.0, 2.0)
+    client_id, item_id = db.fetch_clients()[0][0], db.fetch_items()[0][0]
+    db.save_scoop(client_id, 2.0, [{"item_id": item_id, "quantity": 1}])
+    db.take_stock_snapshots()
+    late = db.save_scoop(client_id, 8.0, [{"item_id": item_id, "quantity": 4}])
+    with db.writer() as conn:
+        conn.execute("UPDATE stock_movements SET at = '2000-01-01 00:00:00' WHERE scoop_id = ?", (late,))
+
+    report = db.reconcile()
+    quantity = db.fetch_items()[0][2]
+    assert quantity == 5, f"reconcile turned stock 5 into {quantity}"
+    assert report["stock_drift"] == [], f"ledger disagrees with stock: {report['stock_drift']}"
+    assert db.stock_at(item_id, "9999-12-31") == 5, "stock_at dropped a sale stamped before its snapshot"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--movements", type=int, default=1_000_000)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    check_out_of_order()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "bench.db")
+    init_db(db_path)
+    db = DBOps(db_path)
+
+    t = time.perf_counter()
+    start = populate(db, args.movements, args.items, args.days)
+    print(f"{args.movements} movements, {args.items} items, {args.days} daily snapshots "
+          f"(built in {time.perf_counter() - t:.1f}s)")
+
+    rng = random.Random(9)
+    lookups = [
+        (rng.randint(1, args.items), (start + timedelta(days=rng.randrange(args.days))).isoformat())
+        for _ in range(args.lookups)
+    ]
+
+    t = time.perf_counter()
+    fast = [db.stock_at(item_id, day) for item_id, day in lookups]
+    snapshot_ms = (time.perf_counter() - t) * 1000 / len(lookups)
+
+    t = time.perf_counter()
+    with db.reader() as conn:
+        slow = [conn.execute(REPLAY_QUERY, (item_id, day + " 23:59:59")).fetchone()[0]
+                for item_id, day in lookups]
+    replay_ms = (time.perf_counter() - t) * 1000 / len(lookups)
+
+    assert fast == slow, "snapshot and replay disagree"
+
+    # Corrupt every movement the snapshots before halfway already cover:
+    # lookups from halfway on must not notice, as they never read them
+    halfway = (start + timedelta(days=args.days // 2)).isoformat()
+    with db.writer() as conn:
+        covered = conn.execute(
+            "SELECT MAX(movement_id) FROM stock_snapshots WHERE at < ?", (halfway,)
+        ).fetchone()[0]
+        conn.execute("UPDATE stock_movements SET change = change + 1000000 WHERE id <= ?", (covered,))
+    later = [(n, item_id, day) for n, (item_id, day) in enumerate(lookups) if day >= halfway]
+    assert later and all(db.stock_at(item_id, day) == fast[n] for n, item_id, day in later), \
+        "stock_at read movements older than the nearest snapshot"
+    print(f"{'method':<22}{'ms/lookup':>12}")
+    print(f"{'snapshot + ledger':<22}{snapshot_ms:>12.3f}")
+    print(f"{'full replay':<22}{replay_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Time of a delta sync between two devices as order history grows: one
+device records a number of sales and client edits, exports its changes
+and the other imports them. The time should follow the number of
+changes, not the size of the database.
+
+Run from the project root (builds or reuses datagen templates):
+    python -m benchmarks.bench_sync [--sizes 10000,100000,1000000] [--changes 10,100,1000]
+"""
+import argparse
+import os
+import shutil
+import time
+
+from benchmarks.datagen import DEFAULTS, fresh_copy
+from db_ops import DBOps
+from db_pool import get_pool
+import sync
+
+
+def make_changes(db, count, round_no):
+    """count changes: mostly sales of two lines, every fifth a client edit."""
+    with db.reader() as conn:
+        clients = conn.execute("SELECT id, name, contact_info, email FROM clients LIMIT ?", (count,)).fetchall()
+        items = [row[0] for row in conn.execute("SELECT id FROM items ORDER BY quantity DESC LIMIT 100")]
+    sales = []
+    for n in range(count):
+        client_id, name, contact, email = clients[n % len(clients)]
+        if n % 5 == 4:
+            db.update_client(client_id, f"{name.split(' #')[0]} #{round_no}", contact, email)
+        else:
+            sales.append({
+                "client_id": client_id,
+                "scoop_price": 150.0,
+                "items": [{"item_id": items[n % 100], "quantity": 1}, {"item_id": items[(n + 1) % 100], "quantity": 1}],
+            })
+    db.save_scoops(sales)
+
+
+def run(size, changes, clients, items):
+    path_a = fresh_copy(clients, items, size)
+    path_b = os.path.join(os.path.dirname(path_a), "device-b.db")
+    shutil.copyfile(path_a, path_b)
+    a, b = DBOps(path_a), DBOps(path_b)
+
+    # B starts as a copy of A, as if the two had just synced
+    with a.reader() as conn:
+        device_a, seq = sync.sync_state(conn)
+    device_b = sync.new_device(b)
+    for db, peer in ((a, device_b), (b, device_a)):
+        with db.writer() as conn:
+            conn.execute(
+                "INSERT INTO sync_peers (device_id, received_seq, acked_seq) VALUES (?, ?, ?)",
+                (peer, seq, seq)
+            )
+
+    results = {}
+    for round_no, count in enumerate(changes, start=1):
+        make_changes(a, count, round_no)
+        start = time.perf_counter()
+        payload = sync.export_changes(a, device_b)
+        exported = time.perf_counter()
+        report = sync.import_changes(b, payload)
+        done = time.perf_counter()
+        # Acknowledge, so the next round only carries its own changes
+        sync.import_changes(a, sync.export_changes(b, device_a))
+        rows = sum(len(t["rows"]) for t in payload["changes"].values())
+        results[count] = ((exported - start) * 1000, (done - exported) * 1000, rows, report["applied"])
+
+    for path in (path_a, path_b):
+        get_pool(path).close()
+    shutil.rmtree(os.path.dirname(path_a), ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="scoop counts to compare")
+    parser.add_argument("--changes", default="10,100,1000", help="changes per sync")
+    parser.add_argument("--clients", type=int, default=DEFAULTS["clients"])
+    parser.add_argument("--items", type=int, default=DEFAULTS["items"])
+    args = parser.parse_args()
+    changes = [int(n) for n in args.changes.split(",")]
+
+    print(f"{'scoops':>10}{'changes':>9}{'rows':>7}{'export':>10}{'import':>10}   (ms)")
+    for size in (int(n) for n in args.sizes.split(",")):
+        for count, (export_ms, import_ms, rows, applied) in run(size, changes, args.clients, args.items).items():
+            print(f"{size:>10}{count:>9}{rows:>7}{export_ms:>10.1f}{import_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
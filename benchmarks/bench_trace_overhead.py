@@ -0,0 +1,69 @@
+"""
+Cost of the query tracer on DBOps calls: tracing disabled (the shipped
+default), enabled, and the raw method without the @timed wrapper.
+
+Run from the project root:
+    python -m benchmarks.bench_trace_overhead [--clients 20000] [--calls 20000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_search import populate
+from db import init_db
+from db_ops import DBOps
+from db_trace import tracer
+from row_cache import get_cache
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20_000)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "bench.db")
+    init_db(db_path)
+    db = DBOps(db_path)
+    populate(db, args.clients)
+
+    def cached_page():
+        return db.fetch_clients_page("smith")
+
+    cache = get_cache(db_path, "clients")
+
+    def uncached_page():
+        cache.clear()
+        return db.fetch_clients_page("smith")
+
+    raw = DBOps.fetch_clients_page.__wrapped__
+    cases = [
+        ("cached page", cached_page, lambda: raw(db, "smith")),
+        ("uncached page", uncached_page, lambda: (cache.clear(), raw(db, "smith"))),
+    ]
+
+    print(f"{'case':<16}{'unwrapped':>12}{'disabled':>12}{'enabled':>12}   (us/call)")
+    for name, fn, unwrapped in cases:
+        calls = args.calls if name == "cached page" else args.calls // 10
+        fn()
+        base = per_call_us(unwrapped, calls)
+        disabled = per_call_us(fn, calls)
+        tracer.enable()
+        enabled = per_call_us(fn, calls)
+        tracer.disable()
+        print(f"{name:<16}{base:>12.2f}{disabled:>12.2f}{enabled:>12.2f}")
+
+    statements = tracer.snapshot()["statements"]
+    print(f"{len(statements)} distinct statements traced")
+
+
+if __name__ == "__main__":
+    main()
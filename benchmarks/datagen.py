@@ -0,0 +1,154 @@
+"""
+Seeded generator for realistic benchmark databases.
+
+The same parameters and seed always produce the same data. Building a
+large database takes a while, so generated files are kept as templates
+in the temp directory and copied for each run:
+
+    python -m benchmarks.datagen --clients 100000 --items 5000 --scoops 1000000 --out big.db
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_search import FIRST_NAMES, LAST_NAMES
+from db import init_db
+from db_ops import DBOps
+from db_pool import get_pool
+from migrations import MIGRATIONS, rebuild_daily_sales
+
+DEFAULTS = {"clients": 100_000, "items": 5_000, "scoops": 1_000_000}
+
+ITEM_WORDS = ["Teddy", "Bunny", "Unicorn", "Keyring", "Bracelet", "Sticker", "Slime",
+              "Plush", "Puzzle", "Yo-yo", "Squishy", "Badge", "Marble", "Bouncy Ball"]
+ITEM_COLOURS = ["Pink", "Blue", "Rainbow", "Glitter", "Mint", "Lilac", "Gold", "Neon"]
+SCOOP_PRICES = [150.0, 200.0, 300.0, 450.0]
+DAYS = 730           # scoops are spread over two years, ending today
+BATCH = 50_000       # rows per transaction while generating
+
+
+def _clients(rng, count):
+    for n in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        domain = rng.choice(["gmail.com", "mweb.co.za", "icloud.com", "outlook.com"])
+        yield (
+            f"{first} {last}",
+            f"0{rng.randint(60, 84)}{rng.randint(1000000, 9999999)}",
+            f"{first}.{last.replace(' ', '')}{n}@{domain}".lower(),
+        )
+
+
+def _items(rng, count, stock):
+    for n in range(count):
+        cost = round(rng.uniform(5, 60), 2)
+        yield (
+            f"{rng.choice(ITEM_COLOURS)} {rng.choice(ITEM_WORDS)} {n}",
+            stock,
+            cost,
+            round(cost * rng.uniform(1.5, 3), 2),
+        )
+
+
+def _batches(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(db_path, clients, items, scoops, seed=42):
+    """Fill a new database at db_path; scoops average three lines each."""
+    rng = random.Random(seed)
+    init_db(db_path)
+    db = DBOps(db_path)
+    start = datetime.now() - timedelta(days=DAYS)
+
+    with db.writer() as conn:
+        for batch in _batches(_clients(rng, clients)):
+            conn.executemany("INSERT INTO clients (name, contact_info, email) VALUES (?, ?, ?)", batch)
+        # Enough stock that no generated sale runs out
+        stock = scoops * 3 // max(items, 1) * 4 + 100
+        for batch in _batches(_items(rng, items, stock)):
+            conn.executemany(
+                "INSERT INTO items (name, quantity, cost_price, selling_price) VALUES (?, ?, ?, ?)", batch
+            )
+        # Opening balances predate the first sale so the ledger stays in time order
+        conn.execute("UPDATE stock_movements SET at = ?", (start.strftime("%Y-%m-%d %H:%M:%S"),))
+
+    step = DAYS * 86400 / max(scoops, 1)
+    next_id = 1
+    for first in range(0, scoops, BATCH):
+        scoop_rows, line_rows = [], []
+        for n in range(first, min(first + BATCH, scoops)):
+            date = (start + timedelta(seconds=(n + 1) * step)).strftime("%Y-%m-%d %H:%M:%S")
+            scoop_rows.append((next_id, rng.randint(1, clients), date, rng.choice(SCOOP_PRICES)))
+            for item_id in rng.sample(range(1, items + 1), rng.randint(1, 5)):
+                line_rows.append((next_id, item_id, rng.randint(1, 3)))
+            next_id += 1
+        with db.writer() as conn:
+            conn.executemany("INSERT INTO scoops (id, client_id, date, total_price) VALUES (?, ?, ?, ?)", scoop_rows)
+            conn.executemany("INSERT INTO scoop_items (scoop_id, item_id, quantity) VALUES (?, ?, ?)", line_rows)
+
+    with db.writer() as conn:
+        rebuild_daily_sales(conn.cursor())
+    db.take_stock_snapshots()
+    with db.writer() as conn:
+        conn.execute("ANALYZE")
+    return db_path
+
+
+def template_path(clients, items, scoops, seed=42):
+    # The schema version is part of the name so a migration never reuses an older template
+    name = f"kayscoops-bench-v{len(MIGRATIONS)}-{clients}-{items}-{scoops}-{seed}.db"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def fresh_copy(clients, items, scoops, seed=42):
+    """
+    Path to a private copy of the generated database, building the
+    template first if it does not exist yet.
+    """
+    template = template_path(clients, items, scoops, seed)
+    if not os.path.exists(template):
+        started = time.perf_counter()
+        partial = template + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate(partial, clients, items, scoops, seed)
+        get_pool(partial).close()
+        # Fold the WAL back in so the template is one self-contained file
+        conn = sqlite3.connect(partial)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+        os.replace(partial, template)
+        print(f"Generated {template} in {time.perf_counter() - started:.0f}s")
+    work = os.path.join(tempfile.mkdtemp(prefix="kayscoops-bench-"), "bench.db")
+    shutil.copyfile(template, work)
+    return work
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=DEFAULTS["clients"])
+    parser.add_argument("--items", type=int, default=DEFAULTS["items"])
+    parser.add_argument("--scoops", type=int, default=DEFAULTS["scoops"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    generate(args.out, args.clients, args.items, args.scoops, args.seed)
+    print(f"Generated {args.out} in {time.perf_counter() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
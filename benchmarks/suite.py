@@ -0,0 +1,372 @@
+"""
+Headless benchmark suite: every DBOps method, save_scoop throughput,
+generate_invoice latency and the main-thread cost of refreshing the
+client and item tables, on a seeded synthetic database. A run warns
+about any public DBOps method that no case times.
+
+Results are written as JSON so runs can be compared:
+
+    python -m benchmarks.suite run [--scale 0.1] [--out results/before.json]
+    python -m benchmarks.suite compare results/before.json results/after.json [--threshold 10]
+
+--scale shrinks the default dataset (100k clients, 5k items, 1M scoops)
+for quick runs. compare exits non-zero when a case got slower than the
+threshold (percent).
+"""
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KCFG_GRAPHICS_MAXFPS", "0")
+# No window: widgets are built against the mock GL backend
+os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.datagen import DEFAULTS, fresh_copy
+from bulk_io import EXPORTS
+from db_ops import DBOps
+from row_cache import get_cache
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# -----------------------------
+# Timing
+# -----------------------------
+def measure(fn, repeat, before=None):
+    """Run fn `repeat` times (after one warm-up) and summarize the timings in ms."""
+    if before:
+        before()
+    fn()
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "runs": repeat,
+        "median_ms": times[len(times) // 2],
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "min_ms": times[0],
+        "max_ms": times[-1],
+    }
+
+
+def throughput(fn, count):
+    """Call fn(i) count times; the per-operation median is the mean here."""
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return {"runs": count, "median_ms": elapsed * 1000 / count, "ops_per_s": count / elapsed}
+
+
+def skipped(reason):
+    return {"skipped": reason}
+
+
+# -----------------------------
+# Cases
+# -----------------------------
+def bench_reads(db, sizes, repeat):
+    def cold():
+        get_cache(db.db_path, "clients").clear()
+        get_cache(db.db_path, "items").clear()
+
+    rng = random.Random(1)
+    item_id = rng.randint(1, sizes["items"])
+    last_day = db.fetch_orders_page(limit=1)[0][2][:10]
+    # What the Orders screen asks for on return: orders newer than its top
+    # row (a few sales ago) and the names of the clients on its first page
+    shown = db.fetch_orders_page()
+    top = shown[min(5, len(shown) - 1)]
+    shown_clients = {order[4] for order in shown}
+    cases = {
+        "fetch_clients.all": (lambda: db.fetch_clients(), max(3, repeat // 10)),
+        "fetch_clients.search": (lambda: db.fetch_clients("smith"), repeat),
+        "fetch_clients.search_short": (lambda: db.fetch_clients("an"), max(3, repeat // 10)),
+        "fetch_clients_page.first": (lambda: db.fetch_clients_page(), repeat),
+        "fetch_clients_page.deep": (lambda: db.fetch_clients_page(after_id=sizes["clients"] // 2), repeat),
+        "fetch_clients_page.search": (lambda: db.fetch_clients_page("van w"), repeat),
+        "email_exists": (lambda: db.email_exists("ann.smith5@gmail.com"), repeat),
+        "fetch_items.all": (lambda: db.fetch_items(), max(3, repeat // 10)),
+        "fetch_items.search": (lambda: db.fetch_items("unicorn"), repeat),
+        "fetch_items_page.first": (lambda: db.fetch_items_page(), repeat),
+        "pick_clients.top": (lambda: db.pick_clients(), repeat),
+        "pick_clients.search": (lambda: db.pick_clients("smith"), repeat),
+        "pick_items.top": (lambda: db.pick_items(), repeat),
+        "pick_items.search": (lambda: db.pick_items("unicorn"), repeat),
+        "fetch_orders.search": (lambda: db.fetch_orders("dlamini"), max(3, repeat // 10)),
+        "fetch_orders_page.first": (lambda: db.fetch_orders_page(), repeat),
+        "fetch_orders_page.search": (lambda: db.fetch_orders_page("smith"), repeat),
+        "fetch_orders_since": (lambda: db.fetch_orders_since((top[2], top[0])), repeat),
+        "fetch_client_names.page": (lambda: db.fetch_client_names(shown_clients), repeat),
+        "sales_summary": (lambda: db.sales_summary(last_day), repeat),
+        "stock_at": (lambda: db.stock_at(item_id, last_day), repeat),
+        "fetch_stock_movements": (lambda: db.fetch_stock_movements(item_id), repeat),
+        "take_stock_snapshots": (lambda: db.take_stock_snapshots(), repeat),
+        "reconcile": (lambda: db.reconcile(), max(3, repeat // 10)),
+        # What bulk_io's export streams: every order line
+        "iter_rows.orders_export": (lambda: sum(1 for _ in db.iter_rows(EXPORTS["orders"][1])), 3),
+    }
+    results = {}
+    for name, (fn, runs) in cases.items():
+        results[name] = measure(fn, runs, before=cold)
+    results["fetch_clients.search.cached"] = measure(lambda: db.fetch_clients("smith"), repeat)
+    return results
+
+
+def bench_writes(db, sizes, count):
+    rng = random.Random(2)
+    stamp = int(time.time())
+    results = {}
+
+    def add_client(i):
+        db.add_client(f"Bench Client {i}", "0820000000", f"bench{stamp}.{i}@example.com")
+    results["add_client"] = throughput(add_client, count)
+    new_clients = [row[0] for row in db.fetch_clients(f"bench{stamp}.")]
+    results["update_client"] = throughput(
+        lambda i: db.update_client(new_clients[i], f"Bench Client {i}b", "0820000001",
+                                   f"bench{stamp}.{i}@example.com"), count)
+    results["add_clients.bulk_1000"] = throughput(
+        lambda i: db.add_clients([(f"Bulk {i}.{n}", "", f"bulk{stamp}.{i}.{n}@example.com") for n in range(1000)]),
+        max(1, count // 20))
+
+    results["add_item"] = throughput(lambda i: db.add_item(f"Bench Item {stamp}-{i}", 1000, 5.0, 12.0), count)
+    new_items = [row[0] for row in db.fetch_items(f"Bench Item {stamp}-")]
+    results["update_item"] = throughput(
+        lambda i: db.update_item(new_items[i], f"Bench Item {stamp}-{i}", 1000 + i, 5.0, 12.0), count)
+    results["add_items.bulk_1000"] = throughput(
+        lambda i: db.add_items([(f"Bulk Item {stamp}-{i}.{n}", 100, 5.0, 12.0) for n in range(1000)]),
+        max(1, count // 20))
+
+    def scoop(i):
+        return {
+            "client_id": rng.randint(1, sizes["clients"]),
+            "scoop_price": 300.0,
+            "items": [{"item_id": item_id, "quantity": 1} for item_id in rng.sample(new_items, 3)],
+        }
+
+    def save_scoop(i):
+        new = scoop(i)
+        db.save_scoop(new["client_id"], new["scoop_price"], new["items"])
+    results["save_scoop"] = throughput(save_scoop, count)
+    results["save_scoops.batch_100"] = throughput(
+        lambda i: db.save_scoops([scoop(n) for n in range(100)]), max(1, count // 20))
+    for key in ("add_clients.bulk_1000", "add_items.bulk_1000", "save_scoops.batch_100"):
+        results[key]["rows_per_s"] = results[key]["ops_per_s"] * (1000 if key.startswith("add") else 100)
+
+    # Deletes last: the clients above now have scoops, so use fresh ones
+    for i in range(count):
+        db.add_client(f"Bench Delete {i}", "", f"delete{stamp}.{i}@example.com")
+    doomed = [row[0] for row in db.fetch_clients(f"delete{stamp}.")]
+    results["delete_client"] = throughput(lambda i: db.delete_client(doomed[i]), count)
+    for i in range(count):
+        db.add_item(f"Bench Spare {stamp}-{i}", 1, 1.0, 2.0)
+    spare = [row[0] for row in db.fetch_items(f"Bench Spare {stamp}-")]
+    results["delete_item"] = throughput(lambda i: db.delete_item(spare[i]), len(spare))
+    return results
+
+
+def bench_invoices(db, sizes, repeat):
+    try:
+        import fpdf  # noqa: F401 -- invoice_generator only imports it when rendering
+        from invoice_generator import generate_invoice
+        from invoice_cache import get_invoice_cache
+    except ImportError as e:
+        return {"generate_invoice.cold": skipped(str(e)), "generate_invoice.cached": skipped(str(e))}
+
+    out_dir = tempfile.mkdtemp(prefix="kayscoops-invoices-")
+    rng = random.Random(3)
+    scoop_ids = [rng.randint(1, sizes["scoops"]) for _ in range(repeat)]
+    cache = get_invoice_cache(os.path.dirname(os.path.abspath(db.db_path)))
+
+    def clear():
+        for name in os.listdir(cache.directory):
+            os.remove(os.path.join(cache.directory, name))
+
+    def make(i):
+        generate_invoice(scoop_ids[i], os.path.join(out_dir, f"invoice_{i}.pdf"), db=db)
+
+    # Silence generate_invoice's own prints
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        clear()
+        cold = throughput(make, repeat)
+        cached = throughput(make, repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return {"generate_invoice.cold": cold, "generate_invoice.cached": cached}
+
+
+def bench_widgets(db, repeat):
+    """Main-thread cost of showing a fetched page: resetting the table, adding rows and laying out."""
+    results = {}
+    try:
+        from kivy.clock import Clock
+        from client_window import ClientScreen
+        from items_window import ItemsScreen
+        from db_executor import AsyncDBOps
+    except Exception as e:
+        return {"refresh_clients": skipped(repr(e)), "refresh_items": skipped(repr(e))}
+
+    for name, screen_class, fetch_page in (
+        ("refresh_clients", ClientScreen, db.fetch_clients_page),
+        ("refresh_items", ItemsScreen, db.fetch_items_page),
+    ):
+        try:
+            screen = screen_class(size=(1280, 800))
+            screen.db = db
+            screen.db_async = AsyncDBOps(db)
+            page = fetch_page()
+
+            def refresh():
+                screen._reset_table(None)
+                screen._append_page(page)
+                Clock.tick()  # RecycleView builds the visible rows
+                Clock.tick()
+
+            results[name] = measure(refresh, repeat)
+        except Exception as e:
+            results[name] = skipped(repr(e))
+    return results
+
+
+# -----------------------------
+# Run / compare
+# -----------------------------
+# Connection and cache helpers, not queries
+UNTIMED = {"reader", "writer", "cache_stats"}
+
+
+def untimed_methods(results):
+    """Public DBOps methods no case name starts with."""
+    timed = {name.split(".")[0] for name in results}
+    return sorted(
+        name for name, member in vars(DBOps).items()
+        if callable(member) and not name.startswith("_") and name not in UNTIMED | timed
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    sizes = {key: max(1, int(value * args.scale)) for key, value in DEFAULTS.items()}
+    db = DBOps(fresh_copy(sizes["clients"], sizes["items"], sizes["scoops"], args.seed))
+
+    results = {}
+    for label, step in (
+        ("reads", lambda: bench_reads(db, sizes, args.repeat)),
+        ("writes", lambda: bench_writes(db, sizes, args.writes)),
+        ("invoices", lambda: bench_invoices(db, sizes, args.invoices)),
+        ("widgets", lambda: bench_widgets(db, args.repeat)),
+    ):
+        started = time.perf_counter()
+        results.update(step())
+        print(f"{label} done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    missing = untimed_methods(results)
+    if missing:
+        print(f"Warning: no case times DBOps.{', DBOps.'.join(missing)}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "dataset": dict(sizes, seed=args.seed),
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    print(f"{'case':<32}{'median ms':>12}{'p95 ms':>10}{'ops/s':>12}")
+    for name, stats in sorted(results.items()):
+        if "skipped" in stats:
+            print(f"{name:<32}  skipped: {stats['skipped']}")
+            continue
+        p95 = f"{stats['p95_ms']:.3f}" if "p95_ms" in stats else "-"
+        ops = f"{stats['ops_per_s']:.0f}" if "ops_per_s" in stats else "-"
+        print(f"{name:<32}{stats['median_ms']:>12.3f}{p95:>10}{ops:>12}")
+    print(f"\nWrote {out}")
+
+
+def compare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old["meta"]["dataset"] != new["meta"]["dataset"]:
+        print("Warning: the runs used different datasets", old["meta"]["dataset"], new["meta"]["dataset"])
+
+    regressions = 0
+    print(f"{'case':<32}{'old ms':>12}{'new ms':>12}{'change':>10}")
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        before, after = old["results"].get(name, {}), new["results"].get(name, {})
+        if "median_ms" not in before or "median_ms" not in after:
+            print(f"{name:<32}{'only in one run or skipped':>34}")
+            continue
+        change = (after["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<32}{before['median_ms']:>12.3f}{after['median_ms']:>12.3f}{change:>+9.1f}%{flag}")
+    if regressions:
+        print(f"\n{regressions} case(s) slower than the {args.threshold:.0f}% threshold")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write a JSON report")
+    run_parser.add_argument("--scale", type=float, default=1.0, help="fraction of the default dataset size")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--repeat", type=int, default=50, help="timed runs per read case")
+    run_parser.add_argument("--writes", type=int, default=200, help="operations per write case")
+    run_parser.add_argument("--invoices", type=int, default=20)
+    run_parser.add_argument("--out", help="report path (default: benchmarks/results/<timestamp>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON reports")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percent slowdown to flag")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Bulk import and export of clients, items and orders.
+
+Imports stream CSV, JSON Lines or JSON files record by record, validate
+each one and insert them in chunked transactions. Client emails are
+checked against both the database and the rest of the file. Exports
+stream query results straight to disk.
+
+    python bulk_io.py import clients clients.csv --db kayscoops.db
+    python bulk_io.py import items supplier.jsonl --db kayscoops.db
+    python bulk_io.py export orders orders.csv --db kayscoops.db
+
+The format follows the file extension (.csv, .jsonl or .json). Plain .json
+files are parsed in one go; use CSV or JSON Lines for very large imports.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import time
+
+from db_ops import DBOps, normalize_email
+
+CHUNK_SIZE = 1000       # rows per import transaction
+MAX_ERRORS = 100        # invalid rows kept in the report
+
+# Accept the shorter labels used on the screens as column names too
+ALIASES = {
+    "contact": "contact_info",
+    "cost": "cost_price",
+    "selling": "selling_price",
+}
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def _format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".jsonl", ".json"):
+        raise ValueError(f"Unsupported file type '{ext}' (use .csv, .jsonl or .json)")
+    return ext[1:]
+
+
+def _normalize_keys(record):
+    if not isinstance(record, dict):
+        return ValueError(f"expected an object with named fields, got {type(record).__name__}")
+    keys = {}
+    for key, value in record.items():
+        key = (key or "").strip().lower().replace(" ", "_")
+        keys[ALIASES.get(key, key)] = value
+    return keys
+
+
+def _parse_line(line):
+    try:
+        return _normalize_keys(json.loads(line))
+    except json.JSONDecodeError as e:
+        return ValueError(f"not valid JSON ({e.msg} at column {e.colno})")
+
+
+def read_records(path):
+    """
+    Yield (line_number, record_dict) from a CSV, JSON Lines or JSON file.
+    A record that cannot be read (a malformed JSON line, or a value that
+    is not an object) is yielded as a ValueError instead of a dict, so
+    one bad line does not stop the rest of the file.
+    """
+    fmt = _format(path)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, _normalize_keys(record)
+        elif fmt == "jsonl":
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, _parse_line(line)
+        else:
+            for n, record in enumerate(json.load(f), 1):
+                yield n, _normalize_keys(record)
+
+
+# -----------------------------
+# Validation
+# -----------------------------
+def _text(record, field):
+    value = record.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def _number(record, field, cast, default=None):
+    text = _text(record, field)
+    if not text:
+        if default is None:
+            raise ValueError(f"{field} is required")
+        return default
+    try:
+        value = cast(text)
+    except ValueError:
+        raise ValueError(f"{field} '{text}' is not a number") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{field} '{text}' is not a number")
+    if value < 0:
+        raise ValueError(f"{field} cannot be negative")
+    return value
+
+
+def validate_client(record):
+    """Return a (name, contact, email) row or raise ValueError."""
+    name = _text(record, "name")
+    if not name:
+        raise ValueError("name is required")
+    email = _text(record, "email")
+    if email and "@" not in email:
+        raise ValueError(f"email '{email}' is not valid")
+    return name, _text(record, "contact_info"), email
+
+
+def validate_item(record):
+    """Return a (name, quantity, cost_price, selling_price) row or raise ValueError."""
+    name = _text(record, "name")
+    if not name:
+        raise ValueError("name is required")
+    return (
+        name,
+        _number(record, "quantity", int),
+        _number(record, "cost_price", float, 0.0),
+        _number(record, "selling_price", float, 0.0),
+    )
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _chunks(path, validate, report, unique_email=False):
+    """Validated rows from path in lists of CHUNK_SIZE; bad rows go to the report."""
+    seen = set()
+    chunk = []
+    for line_no, record in read_records(path):
+        report["read"] += 1
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            row = validate(record)
+        except ValueError as e:
+            report["invalid"] += 1
+            if len(report["errors"]) < MAX_ERRORS:
+                report["errors"].append((line_no, str(e)))
+            continue
+        if unique_email and row[2]:
+            email = normalize_email(row[2])
+            if email in seen:
+                report["duplicates"] += 1
+                continue
+            seen.add(email)
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _new_report():
+    return {"read": 0, "imported": 0, "duplicates": 0, "invalid": 0, "errors": [], "seconds": 0.0}
+
+
+def import_clients(db, path, progress=None):
+    """
+    Import clients from path. Rows with an email that is already registered,
+    or that appeared earlier in the file, are counted as duplicates and
+    skipped. progress(report) is called after every chunk.
+    """
+    report = _new_report()
+    start = time.perf_counter()
+    for chunk in _chunks(path, validate_client, report, unique_email=True):
+        inserted, skipped = db.add_clients(chunk)
+        report["imported"] += inserted
+        report["duplicates"] += len(skipped)
+        if progress:
+            progress(report)
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def import_items(db, path, progress=None):
+    """Import items from path; progress(report) is called after every chunk."""
+    report = _new_report()
+    start = time.perf_counter()
+    for chunk in _chunks(path, validate_item, report):
+        report["imported"] += db.add_items(chunk)
+        if progress:
+            progress(report)
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+# -----------------------------
+# Export
+# -----------------------------
+EXPORTS = {
+    "clients": (
+        ["id", "name", "contact_info", "email", "total_spent"],
+        "SELECT id, name, contact_info, email, total_spent FROM clients ORDER BY id",
+    ),
+    "items": (
+        ["id", "name", "quantity", "cost_price", "selling_price"],
+        "SELECT id, name, quantity, cost_price, selling_price FROM items ORDER BY id",
+    ),
+    # One row per order line; orders without lines still appear once
+    "orders": (
+        ["scoop_id", "date", "client_id", "client_name", "total_price", "video_url",
+         "item_id", "item_name", "quantity"],
+        """
+        SELECT s.id, s.date, s.client_id, c.name, s.total_price, s.video_url,
+               si.item_id, i.name, si.quantity
+        FROM scoops s
+        JOIN clients c ON s.client_id = c.id
+        LEFT JOIN scoop_items si ON si.scoop_id = s.id
+        LEFT JOIN items i ON si.item_id = i.id
+        ORDER BY s.id, si.id
+        """,
+    ),
+}
+
+
+def export(db, table, path):
+    """Stream a table (clients, items or orders) to path; returns the row count."""
+    columns, query = EXPORTS[table]
+    fmt = _format(path)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in db.iter_rows(query):
+                writer.writerow(row)
+                count += 1
+        else:
+            if fmt == "json":
+                f.write("[\n")
+            for row in db.iter_rows(query):
+                if fmt == "json" and count:
+                    f.write(",\n")
+                f.write(json.dumps(dict(zip(columns, row))))
+                if fmt == "jsonl":
+                    f.write("\n")
+                count += 1
+            if fmt == "json":
+                f.write("\n]\n")
+    return count
+
+
+# -----------------------------
+# Command line
+# -----------------------------
+def _print_progress(report):
+    print(f"\r{report['read']} read, {report['imported']} imported, "
+          f"{report['duplicates']} duplicates, {report['invalid']} invalid", end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export for KayScoops")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("table", choices=["clients", "items", "orders"])
+    parser.add_argument("path")
+    parser.add_argument("--db", required=True, help="path to kayscoops.db")
+    args = parser.parse_args()
+
+    from db import init_db
+    init_db(args.db)
+    db = DBOps(args.db)
+
+    if args.action == "export":
+        start = time.perf_counter()
+        count = export(db, args.table, args.path)
+        print(f"Exported {count} {args.table} rows to {args.path} in {time.perf_counter() - start:.2f}s")
+        return
+
+    if args.table == "orders":
+        parser.error("orders can only be exported")
+    importer = import_clients if args.table == "clients" else import_items
+    report = importer(db, args.path, progress=_print_progress)
+    _print_progress(report)
+    print(f"\nDone in {report['seconds']:.2f}s")
+    for line_no, error in report["errors"]:
+        print(f"  line {line_no}: {error}")
+
+
+if __name__ == "__main__":
+    main()
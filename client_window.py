@@ -2,7 +2,10 @@ from kivy.uix.screenmanager import Screen
 from kivy.properties import ObjectProperty
 from kivy.app import App
 from kivy.lang import Builder
-from db_ops import DBOps
+from db_ops import DBOps, PAGE_SIZE
+from db_executor import AsyncDBOps
+from search_controller import SearchController, text_matcher
+from widgets import scrolled_near_end
 import sqlite3
 
 # Load KV file
@@ -17,45 +20,42 @@ class ClientScreen(Screen):
 
     selected_client_id = None
     clients = []
+    search_term = None
+    has_more = False
+    loading = False
+    saving = False
 
     def on_pre_enter(self):
         """Refresh clients whenever screen is opened."""
         if not hasattr(self, 'db'):
             self.db = DBOps()  # safe lazy init
+            self.db_async = AsyncDBOps(self.db)
+            self.search = SearchController(
+                lambda term: self._fetch_page(term, None),
+                self._show_search_results,
+                matches=text_matcher(1, 2, 3),
+                key="clients_search",
+                page_size=PAGE_SIZE,
+            )
         self.refresh_clients()
 
     def refresh_clients(self, search_term=None):
-        """Fetch clients from DB and update table/list."""
-        try:
-            self.clients = self.db.fetch_clients(search_term)
-        except sqlite3.OperationalError as e:
-            if "no such table" in str(e):
-                from db import init_db
-                init_db()  # create tables
-                self.clients = self.db.fetch_clients(search_term)
-            else:
-                raise
-
-
-        self.client_list.clear_widgets()
-
-        # Add headings
-        headings = ["ID", "Name", "Contact", "Email", "Total Spent (R)"]
-        self.client_list.add_widget(ClientRow(*headings, is_heading=True))
-
-        # Add rows
-        for idx, client in enumerate(self.clients):
-            client_id, name, contact, email, total_spent = client
-            row = ClientRow(
-                str(client_id),
-                name,
-                contact,
-                email,
-                f"{total_spent:.2f}" if total_spent else "0.00",
-                index=idx,
-                on_select=lambda i=idx: self.select_client(i)
-            )
-            self.client_list.add_widget(row)
+        """Reset the table and load the first page of matching clients."""
+        # Data may have changed, so cached search results are stale
+        self.search.cancel()
+        self.search.invalidate()
+        self._reset_table(search_term)
+        self.load_more_clients()
+
+    def _reset_table(self, search_term):
+        # A page still loading belongs to the previous term
+        self.db_async.executor.cancel("clients_page")
+        self.search_term = search_term
+        self.clients = []
+        self.has_more = True
+        self.loading = False
+        # The heading row lives in the kv file; only data rows are recycled
+        self.client_list.data = []
 
         # Clear input fields and reset selection
         self.name_input.text = ""
@@ -63,8 +63,58 @@ class ClientScreen(Screen):
         self.email_input.text = ""
         self.selected_client_id = None
 
+    def load_more_clients(self):
+        """Request the next page of clients in the background."""
+        if not self.has_more or self.loading:
+            return
+        self.loading = True
+        after_id = self.clients[-1][0] if self.clients else None
+        self.db_async.run(
+            self._fetch_page, self.search_term, after_id,
+            callback=self._append_page, key="clients_page"
+        )
+
+    def _fetch_page(self, search_term, after_id):
+        """Runs on the DB worker thread."""
+        try:
+            return self.db.fetch_clients_page(search_term, after_id)
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                from db import init_db
+                init_db()  # create tables
+                return self.db.fetch_clients_page(search_term, after_id)
+            raise
+
+    def _append_page(self, page):
+        """Append a fetched page to the table (main thread)."""
+        self.loading = False
+        self.has_more = len(page) == PAGE_SIZE
+
+        # Add rows (RecycleView only builds widgets for the visible ones)
+        self.clients.extend(page)
+        self.client_list.data.extend([
+            {
+                "client_id": str(client_id),
+                "client_name": name,
+                "contact": contact or "",
+                "email": email or "",
+                "spent": f"{total_spent:.2f}" if total_spent else "0.00",
+                "screen": self,
+            }
+            for client_id, name, contact, email, total_spent in page
+        ])
+
+    def on_table_scroll(self, view):
+        """Load the next page once the user scrolls near the end of the table."""
+        if self.has_more and scrolled_near_end(view):
+            self.load_more_clients()
+
     def on_search(self, text):
-        self.refresh_clients(text.strip())
+        self.search.on_text(text.strip())
+
+    def _show_search_results(self, search_term, page):
+        self._reset_table(search_term)
+        self._append_page(page)
 
     def select_client(self, idx):
         """Populate input fields when a client is selected."""
@@ -75,6 +125,8 @@ class ClientScreen(Screen):
         self.email_input.text = client[3]
 
     def add_client(self):
+        if self.saving:
+            return  # previous write still running
         name = self.name_input.text.strip()
         contact = self.contact_input.text.strip()
         email = self.email_input.text.strip()
@@ -83,15 +135,31 @@ class ClientScreen(Screen):
             App.get_running_app().popup("Error", "Please enter a name!")
             return
 
+        self.saving = True
+        self.db_async.run(
+            self._add_client, name, contact, email,
+            callback=lambda added: self._client_added(added, name, email),
+            on_error=self._write_failed
+        )
+
+    def _add_client(self, name, contact, email):
+        """Runs on the DB worker thread; False if the email is taken."""
         if email and self.db.email_exists(email):
+            return False
+        self.db.add_client(name, contact, email)
+        return True
+
+    def _client_added(self, added, name, email):
+        self.saving = False
+        if not added:
             App.get_running_app().popup("Error", f"Email '{email}' is already registered!")
             return
-
-        self.db.add_client(name, contact, email)
         App.get_running_app().popup("Success", f"Client '{name}' added successfully!")
         self.refresh_clients()
 
     def update_client(self):
+        if self.saving:
+            return
         if not self.selected_client_id:
             App.get_running_app().popup("Error", "Please select a client to update!")
             return
@@ -104,82 +172,68 @@ class ClientScreen(Screen):
             App.get_running_app().popup("Error", "Please enter a name!")
             return
 
-        self.db.update_client(self.selected_client_id, name, contact, email)
-        App.get_running_app().popup("Success", f"Client '{name}' updated successfully!")
-        self.refresh_clients()
+        self.saving = True
+        self.db_async.update_client(
+            self.selected_client_id, name, contact, email,
+            callback=lambda _: self._client_written("Success", f"Client '{name}' updated successfully!"),
+            on_error=lambda error: self._write_failed(error, email)
+        )
 
     def delete_client(self):
+        if self.saving:
+            return
         if not self.selected_client_id:
             App.get_running_app().popup("Error", "Please select a client to delete!")
             return
 
-        def on_confirm(instance):
-            self.db.delete_client(self.selected_client_id)
-            self.selected_client_id = None
-            self.refresh_clients()
-            App.get_running_app().popup("Deleted", "Client deleted successfully!")
-            popup.dismiss()
-
-        def on_cancel(instance):
-            popup.dismiss()
-
-        # Build non-blocking confirm popup
-        from kivy.uix.popup import Popup
-        from kivy.uix.boxlayout import BoxLayout
-        from kivy.uix.button import Button
-        from kivy.uix.label import Label
-
-        content = BoxLayout(orientation='vertical', spacing=10)
-        content.add_widget(Label(text="Are you sure you want to delete this client?"))
+        def on_answer(confirmed):
+            if not confirmed:
+                return
+            self.saving = True
+            self.db_async.delete_client(
+                self.selected_client_id,
+                callback=lambda _: self._client_written("Deleted", "Client deleted successfully!"),
+                on_error=self._write_failed
+            )
 
-        buttons = BoxLayout(size_hint_y=None, height=40, spacing=10)
-        yes_btn = Button(text="Yes")
-        no_btn = Button(text="No")
-        buttons.add_widget(yes_btn)
-        buttons.add_widget(no_btn)
-        content.add_widget(buttons)
+        App.get_running_app().confirm("Confirm Delete", "Are you sure you want to delete this client?", on_answer)
 
-        popup = Popup(title="Confirm Delete", content=content, size_hint=(0.6, 0.4))
-        yes_btn.bind(on_release=on_confirm)
-        no_btn.bind(on_release=on_cancel)
-        popup.open()
+    def _client_written(self, title, message):
+        self.saving = False
+        App.get_running_app().popup(title, message)
+        self.refresh_clients()
 
+    def _write_failed(self, error, email=None):
+        self.saving = False
+        if isinstance(error, sqlite3.IntegrityError) and email:
+            App.get_running_app().popup("Error", f"Email '{email}' is already registered!")
+            return
+        App.get_running_app().popup("Error", f"Could not save client: {error}")
 
 
 # ---------- ClientRow for table ----------
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
-from kivy.uix.button import Button
-
-class ClientRow(BoxLayout):
-    def __init__(self, id_, name, contact, email, spent, index=0, on_select=None, is_heading=False, **kwargs):
-        super().__init__(orientation="horizontal", size_hint_y=None, height=40, spacing=5, **kwargs)
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.properties import BooleanProperty, NumericProperty, StringProperty
+
+class ClientRow(RecycleDataViewBehavior, BoxLayout):
+    """Recycled table row (layout in client_screen.kv); also used for the heading."""
+    index = NumericProperty(0)
+    client_id = StringProperty("")
+    client_name = StringProperty("")
+    contact = StringProperty("")
+    email = StringProperty("")
+    spent = StringProperty("")
+    is_heading = BooleanProperty(False)
+    screen = ObjectProperty(None, allownone=True)
+
+    def refresh_view_attrs(self, rv, index, data):
+        # index drives the alternating row colour
         self.index = index
-        bg_color = (0.9, 0.9, 0.95, 1) if index % 2 == 0 else (0.85, 0.85, 0.9, 1)
-        if is_heading:
-            bg_color = (0.65, 0.5, 0.9, 1)
-        with self.canvas.before:
-            from kivy.graphics import Color, Rectangle
-            Color(*bg_color)
-            self.rect = Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_rect, size=self.update_rect)
-
-        # Columns
-        self.add_widget(Label(text=id_, size_hint_x=0.1, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=name, size_hint_x=0.25, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=contact, size_hint_x=0.25, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=email, size_hint_x=0.25, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=spent, size_hint_x=0.15, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-
-        if not is_heading and on_select:
-            self.bind(on_touch_down=lambda widget, touch: self._on_touch(touch, on_select))
-
-    def update_rect(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
-
-    def _on_touch(self, touch, callback):
-        if self.collide_point(*touch.pos):
-            callback()
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_touch_down(self, touch):
+        if not self.is_heading and self.screen and self.collide_point(*touch.pos):
+            self.screen.select_client(self.index)
             return True
-        return False
+        return super().on_touch_down(touch)
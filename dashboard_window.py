@@ -1,6 +1,10 @@
 from kivy.uix.screenmanager import Screen
 from kivy.lang import Builder
 from kivy.app import App
+from kivy.properties import StringProperty
+
+from db_ops import DBOps
+from db_executor import AsyncDBOps
 
 # Load the KV file for this screen
 Builder.load_file("dashboard_screen.kv")
@@ -13,9 +17,29 @@ class DashboardScreen(Screen):
     This class handles logic, navigation, and callbacks.
     """
 
+    today_text = StringProperty("")
+    week_text = StringProperty("")
+    month_text = StringProperty("")
+
     def on_enter(self, *args):
         """Called when entering the dashboard screen."""
         print("Dashboard loaded")
+        if not hasattr(self, 'db'):
+            self.db = DBOps()  # safe lazy init
+            self.db_async = AsyncDBOps(self.db)
+        self.db_async.sales_summary(callback=self._show_summary, key="dashboard_summary")
+
+    # ---------- Sales Summary ----------
+    def _show_summary(self, summary):
+        self.today_text = self._format_period("Today", summary["today"])
+        self.week_text = self._format_period("This week", summary["week"])
+        self.month_text = self._format_period("This month", summary["month"])
+
+    def _format_period(self, title, totals):
+        return (f"[b]{title}[/b]\n"
+                f"{totals['scoops']} scoops\n"
+                f"Revenue R{totals['revenue']:.2f}\n"
+                f"Profit R{totals['profit']:.2f}")
 
     # ---------- Navigation Actions ----------
     def go_to_clients(self):
@@ -34,6 +58,10 @@ class DashboardScreen(Screen):
         """Navigate to Inventory screen (optional)."""
         self.manager.current = "items"
 
+    def go_to_diagnostics(self):
+        """Navigate to the query diagnostics screen."""
+        self.manager.current = "diagnostics"
+
     # ---------- General Actions ----------
     def exit_app(self):
         """Gracefully exit the app."""
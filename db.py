@@ -1,6 +1,8 @@
-import sqlite3
 import os
 from kivy.app import App
+from db_pool import connect, get_pool
+from db_trace import timed
+from migrations import migrate, rebuild_daily_sales
 
 # -----------------------------
 # Determine database path
@@ -12,14 +14,26 @@ def get_db_path():
     return os.path.join(app.user_data_dir, "kayscoops.db")
 
 def get_connection():
+    """Standalone connection for scripts; the app borrows from the pool instead."""
     # Very important for Android (ensures DB opens cleanly)
-    conn = sqlite3.connect(get_db_path(), check_same_thread=False)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    return connect(get_db_path())
 
-def init_db():
+@timed
+def init_db(db_path=None):
+    with get_pool(db_path).writer() as conn:
+        _create_tables(conn)
+        conn.commit()
+        migrate(conn)
+    print("Database and tables created successfully!")
+
+@timed
+def rebuild_sales(db_path=None):
+    """Recompute the daily sales summary tables from the order history."""
+    with get_pool(db_path).writer(immediate=True) as conn:
+        rebuild_daily_sales(conn.cursor())
+    print("Daily sales summary rebuilt.")
 
-    conn = get_connection()
+def _create_tables(conn):
     cursor = conn.cursor()
 
     # Clients table
@@ -68,10 +82,15 @@ def init_db():
     )
     """)
 
-    conn.commit()
-    conn.close()
-    print("Database and tables created successfully!")
-
 if __name__ == "__main__":
-    print("DB Path:", get_db_path())
-    init_db()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="KayScoops database maintenance")
+    parser.add_argument("command", nargs="?", default="init", choices=["init", "rebuild-sales"])
+    parser.add_argument("--db", required=True, help="path to kayscoops.db (the app's lives in its user_data_dir)")
+    args = parser.parse_args()
+
+    print("DB Path:", args.db)
+    init_db(args.db)
+    if args.command == "rebuild-sales":
+        rebuild_sales(args.db)
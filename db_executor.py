@@ -0,0 +1,157 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+from db_ops import DBOps
+
+
+class DBExecutor:
+    """
+    Runs database calls on one dedicated worker thread.
+
+    submit() returns a concurrent.futures.Future straight away; when a
+    callback is given the result is handed back on the Kivy main thread via
+    Clock.schedule_once, so callbacks may touch widgets freely.
+
+    Requests submitted with the same key supersede each other: a pending
+    request is cancelled outright and the result of one that was already
+    running is dropped, so a stale search never overwrites a newer one.
+    """
+
+    def __init__(self, name="db-worker"):
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, callback=None, on_error=None, key=None, **kwargs):
+        future = Future()
+        if key is not None:
+            with self._lock:
+                previous = self._latest.get(key)
+                self._latest[key] = future
+            if previous is not None:
+                previous.cancel()
+        if callback is not None or on_error is not None:
+            future.add_done_callback(
+                lambda f: Clock.schedule_once(lambda dt: self._deliver(f, callback, on_error, key))
+            )
+        elif key is not None:
+            future.add_done_callback(lambda f: self._forget(f, key))
+        self._ensure_started()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def cancel(self, key):
+        """Cancel (or drop the result of) the latest request submitted under key."""
+        with self._lock:
+            future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self, wait=True):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+        self._thread = None
+
+    # ---------- Worker thread ----------
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    # ---------- Main thread ----------
+    def _forget(self, future, key):
+        """Drop the bookkeeping for future; True if it was still the latest for key."""
+        if key is None:
+            return True
+        with self._lock:
+            if self._latest.get(key) is not future:
+                return False
+            del self._latest[key]
+        return True
+
+    def _deliver(self, future, callback, on_error, key):
+        if future.cancelled() or not self._forget(future, key):
+            return  # superseded by a newer request
+        error = future.exception()
+        if error is None:
+            if callback is not None:
+                callback(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            Logger.error(f"{self.name}: {error!r}")
+            raise error
+
+
+class AsyncDBOps:
+    """
+    DBOps facade whose methods run on the executor instead of blocking.
+
+    Every DBOps method is available with the same arguments plus the
+    keyword-only callback, on_error and key of DBExecutor.submit, e.g.
+        db.fetch_clients("ann", callback=self.show_clients, key="clients")
+    """
+
+    def __init__(self, db=None, executor=None):
+        self.db = db or DBOps()
+        self.executor = executor or get_executor()
+
+    def __getattr__(self, name):
+        method = getattr(self.db, name)
+
+        def call(*args, callback=None, on_error=None, key=None, **kwargs):
+            return self.executor.submit(
+                method, *args, callback=callback, on_error=on_error, key=key, **kwargs
+            )
+
+        return call
+
+    def run(self, fn, *args, callback=None, on_error=None, key=None, **kwargs):
+        """Run any callable (e.g. a screen's fetch-with-retry helper) on the executor."""
+        return self.executor.submit(fn, *args, callback=callback, on_error=on_error, key=key, **kwargs)
+
+
+# -----------------------------
+# Shared executors for the app
+# -----------------------------
+DB_WORKER = "db-worker"
+INVOICE_WORKER = "invoice-worker"   # PDF rendering, kept off the query thread
+
+_executors = {}
+
+
+def get_executor(name=DB_WORKER):
+    executor = _executors.get(name)
+    if executor is None:
+        executor = _executors[name] = DBExecutor(name=name)
+    return executor
+
+
+def shutdown_executor():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
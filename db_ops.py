@@ -1,168 +1,752 @@
-import sqlite3
 from db import get_db_path
+from db_pool import get_pool
+from db_trace import timed
+from row_cache import get_cache
+
+# Trigram tokens need at least three characters; shorter terms use LIKE
+FTS_MIN_TERM = 3
+
+# Rows per page for the keyset-paginated list screens
+PAGE_SIZE = 50
+
+# Matches offered by the New Scoop pickers
+PICK_LIMIT = 30
+
+# Picker rank: purchase count, discounted by the days since the last one
+# (halved after RECENCY_DAYS). Never-bought rows rank last, newest first.
+RECENCY_DAYS = 30
+PICK_RANK = f"COALESCE(s.{{count}} * {RECENCY_DAYS}.0 / ({RECENCY_DAYS} + julianday(?) - julianday(s.last_at)), 0)"
+
+# Above any stock movement id (SQLite's largest integer)
+MAX_ID = 2 ** 63 - 1
+
+# Seconds between stock snapshots while the app runs (startup's reconcile takes one too)
+SNAPSHOT_INTERVAL = 24 * 60 * 60
+
+
+class InsufficientStockError(Exception):
+    """A scoop asked for more of an item than is in stock."""
+
+    def __init__(self, shortfall):
+        self.shortfall = shortfall  # [(name, available, requested), ...]
+        super().__init__("; ".join(
+            f"Not enough stock for {name}! Only {available} available, {requested} requested."
+            for name, available, requested in shortfall
+        ))
+
+
+def local_now_str():
+    from datetime import datetime, timedelta
+
+    # UTC now
+    utc_now = datetime.utcnow()
+    # Johannesburg offset is +2 hours
+    local_dt = utc_now + timedelta(hours=2)
+    # Format as string
+    return local_dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _select_by_ids(cursor, select, ids, chunk=500):
+    """Run `select WHERE id IN (...)` over ids in chunks (SQLite caps bound variables)."""
+    rows = []
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        cursor.execute(f"{select} WHERE id IN ({','.join('?' * len(part))})", part)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def normalize_email(email):
+    """The form idx_clients_email compares emails in."""
+    return (email or "").strip().lower()
+
+
+def _existing_emails(cursor, emails, chunk=500):
+    """Normalized emails from `emails` that are already registered."""
+    emails = sorted({normalize_email(e) for e in emails} - {""})
+    taken = set()
+    for start in range(0, len(emails), chunk):
+        part = emails[start:start + chunk]
+        cursor.execute(f"""
+            SELECT LOWER(TRIM(email)) FROM clients
+            WHERE LOWER(TRIM(email)) IN ({','.join('?' * len(part))})
+              AND email IS NOT NULL AND TRIM(email) != ''
+        """, part)
+        taken.update(row[0] for row in cursor.fetchall())
+    return taken
+
+
+def _data_version(conn):
+    """
+    (device id, change number) from sync_state. The sync triggers move it
+    on every change to clients, items and orders, whichever process makes
+    it, and a restore changes the device.
+    """
+    return tuple(conn.execute("SELECT device_id, seq FROM sync_state WHERE id = 1").fetchone())
+
+
+def _fts_phrase(term):
+    """Quote a user search term as a single FTS5 phrase (substring match)."""
+    return '"' + term.replace('"', '""') + '"'
+
 
 class DBOps:
-    def __init__(self):
-        self.db_path = None
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self.pool = None
+        self._fts = None
 
     def _ensure_db_path(self):
         if self.db_path is None:
             self.db_path = get_db_path()
 
-    def get_connection(self):
+    def _get_pool(self):
+        if self.pool is None:
+            self._ensure_db_path()
+            self.pool = get_pool(self.db_path)
+        return self.pool
+
+    def reader(self):
+        """Borrow a pooled read-only connection (use as a context manager)."""
+        return self._get_pool().reader()
+
+    def writer(self, immediate=False):
+        """Borrow the shared writer connection; commits when the block exits."""
+        return self._get_pool().writer(immediate=immediate)
+
+    # ---------- Row cache ----------
+    def _cache(self, table):
         self._ensure_db_path()
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
-    
+        return get_cache(self.db_path, table)
+
+    def _cached(self, table, key, query):
+        """Serve key from the table's cache, running query() on a miss."""
+        cache = self._cache(table)
+        # Another process may have written since the cache was filled
+        with self.reader() as conn:
+            cache.check_version(_data_version(conn))
+        rows = cache.get(key)
+        if rows is None:
+            generation = cache.generation
+            rows = query()
+            cache.put(key, rows, generation)
+        return rows
+
+    def cache_stats(self):
+        """Hit/miss counters of the client and item caches."""
+        return {table: self._cache(table).stats() for table in ("clients", "items")}
+
+    def _use_fts(self, conn, search_term):
+        """True when the trigram index exists and can serve this term."""
+        if len(search_term) < FTS_MIN_TERM:
+            return False
+        if self._fts is None:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts'"
+            ).fetchone()
+            self._fts = row is not None
+        return self._fts
 
     # ---------- Client Functions ----------
+    @timed
     def add_client(self, name, contact, email):
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO clients (name, contact_info, email) VALUES (?, ?, ?)",
                 (name, contact, email),
             )
-            conn.commit()
+        self._cache("clients").invalidate_searches()
 
+    @timed
     def update_client(self,client_id, name, contact, email):
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE clients SET name=?, contact_info=?, email=? WHERE id=?",
                 (name, contact, email, client_id),
             )
-            conn.commit()
+        # Searchable text changed, so cached result membership may too
+        self._cache("clients").invalidate_searches()
 
+    @timed
     def delete_client(self, client_id):
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM clients WHERE id=?", (client_id,))
-            conn.commit()
+        self._cache("clients").invalidate_searches()
 
+    def _client_filter(self, conn, search_term):
+        """WHERE clause and parameters matching clients against a search term."""
+        if not search_term:
+            return "1", ()
+        if self._use_fts(conn, search_term):
+            return (
+                "id IN (SELECT rowid FROM clients_fts WHERE clients_fts MATCH ?)",
+                (_fts_phrase(search_term),),
+            )
+        like_term = f"%{search_term}%"
+        return "(name LIKE ? OR contact_info LIKE ? OR email LIKE ?)", (like_term, like_term, like_term)
+
+    @timed
     def fetch_clients(self, search_term=None):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            if search_term:
-                query = """
+        def query():
+            with self.reader() as conn:
+                where, params = self._client_filter(conn, search_term)
+                cursor = conn.cursor()
+                cursor.execute(f"""
                     SELECT id, name, contact_info, email, total_spent
                     FROM clients
-                    WHERE name LIKE ? OR contact_info LIKE ? OR email LIKE ?
-                """
-                like_term = f"%{search_term}%"
-                cursor.execute(query, (like_term, like_term, like_term))
-            else:
-                cursor.execute("SELECT id, name, contact_info, email, total_spent FROM clients")
-            rows = cursor.fetchall()
-            return rows
+                    WHERE {where}
+                """, params)
+                rows = cursor.fetchall()
+                return rows
+        return self._cached("clients", ("all", search_term or ""), query)
 
+    @timed
+    def fetch_clients_page(self, search_term=None, after_id=None, limit=PAGE_SIZE):
+        """One page of clients ordered by id; pass the last id seen as after_id."""
+        def query():
+            with self.reader() as conn:
+                where, params = self._client_filter(conn, search_term)
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT id, name, contact_info, email, total_spent
+                    FROM clients
+                    WHERE {where} AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, params + (after_id or 0, limit))
+                return cursor.fetchall()
+        return self._cached("clients", ("page", search_term or "", after_id or 0, limit), query)
+
+    @timed
     def email_exists(self, email):
         if not email:
             return False  # empty email is allowed, or you could make it mandatory
         
-        with self.get_connection() as conn:
+        with self.reader() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM clients WHERE email = ?", (email,))
-            count = cursor.fetchone()[0]
-            return count > 0
+            # Matches the normalized expression of idx_clients_email so the
+            # lookup is a single index probe instead of a table scan
+            cursor.execute("""
+                SELECT 1 FROM clients
+                WHERE LOWER(TRIM(email)) = LOWER(TRIM(?))
+                  AND email IS NOT NULL AND TRIM(email) != ''
+                LIMIT 1
+            """, (email,))
+            return cursor.fetchone() is not None
         
 
     # ---------- Item Functions ----------
+    @timed
     def add_item(self, name, quantity, cost_price, selling_price):
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO items (name, quantity, cost_price, selling_price) VALUES (?, ?, ?, ?)",
                 (name, quantity, cost_price, selling_price)
             )
-            conn.commit()
+        self._cache("items").invalidate_searches()
 
+    @timed
     def update_item(self, item_id, name, quantity, cost_price, selling_price):
-        with self.get_connection() as conn:
+        with self.writer(immediate=True) as conn:
             cursor = conn.cursor()
+            before = _data_version(cursor)
+            old = cursor.execute("SELECT name, quantity FROM items WHERE id=?", (item_id,)).fetchone()
             cursor.execute(
                 "UPDATE items SET name=?, quantity=?, cost_price=?, selling_price=? WHERE id=?",
                 (name, quantity, cost_price, selling_price, item_id)
             )
-            conn.commit()
+            if old and quantity != old[1]:
+                # More stock is a delivery; less is shrinkage found at a count
+                change = quantity - old[1]
+                self._record_movement(cursor, item_id, "restock" if change > 0 else "adjustment", change)
+            after = _data_version(cursor)
+        if old and old[0] == name:
+            # Only numbers changed: patch the row in place, cached searches stay valid
+            self._cache("items").patch([(item_id, name, quantity, cost_price, selling_price)], (before, after))
+        else:
+            self._cache("items").invalidate_searches()
 
+    @timed
     def delete_item(self, item_id):
-        with self.get_connection() as conn:
+        with self.writer() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM items WHERE id=?", (item_id,))
-            conn.commit()
+        self._cache("items").invalidate_searches()
+
+    def _item_filter(self, conn, search_term):
+        """WHERE clause and parameters matching items against a search term."""
+        if not search_term:
+            return "1", ()
+        if self._use_fts(conn, search_term):
+            return (
+                "id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)",
+                (_fts_phrase(search_term),),
+            )
+        return "name LIKE ?", (f"%{search_term}%",)
 
+    @timed
     def fetch_items(self, search_term=None):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            if search_term:
+        def query():
+            with self.reader() as conn:
+                where, params = self._item_filter(conn, search_term)
+                cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT id, name, quantity, cost_price, selling_price FROM items WHERE name LIKE ?",
-                    (f"%{search_term}%",)
+                    f"SELECT id, name, quantity, cost_price, selling_price FROM items WHERE {where}",
+                    params
                 )
-            else:
-                cursor.execute("SELECT id, name, quantity, cost_price, selling_price FROM items")
-            
-            rows = cursor.fetchall()
-            return rows
 
-    # ---------- Scoop Functions ----------     
-    def save_scoop(self, client_id, scoop_price, items, video_url=None):
-        from datetime import datetime, timedelta
+                rows = cursor.fetchall()
+                return rows
+        return self._cached("items", ("all", search_term or ""), query)
 
-        # UTC now
-        utc_now = datetime.utcnow()
-        # Johannesburg offset is +2 hours
-        local_dt = utc_now + timedelta(hours=2)
-        # Format as string
-        local_dt_str = local_dt.strftime("%Y-%m-%d %H:%M:%S")
+    @timed
+    def fetch_items_page(self, search_term=None, after_id=None, limit=PAGE_SIZE):
+        """One page of items ordered by id; pass the last id seen as after_id."""
+        def query():
+            with self.reader() as conn:
+                where, params = self._item_filter(conn, search_term)
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT id, name, quantity, cost_price, selling_price
+                    FROM items
+                    WHERE {where} AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, params + (after_id or 0, limit))
+                return cursor.fetchall()
+        return self._cached("items", ("page", search_term or "", after_id or 0, limit), query)
 
-        with self.get_connection() as conn:
+    # ---------- Pickers ----------
+    @timed
+    def pick_clients(self, search_term=None, limit=PICK_LIMIT):
+        """
+        The top `limit` clients matching search_term, most likely pick first
+        (ranked by how often and how recently they bought, see PICK_RANK).
+        Rows are (id, name, contact_info, email).
+        """
+        with self.reader() as conn:
+            where, params = self._client_filter(conn, search_term)
             cursor = conn.cursor()
-            # Insert scoop
-            cursor.execute(
-                "INSERT INTO scoops (client_id, date, total_price, video_url) VALUES (?, ?, ?, ?)",
-                (client_id, local_dt_str, scoop_price, video_url)
+            cursor.execute(f"""
+                SELECT id, name, contact_info, email
+                FROM clients
+                LEFT JOIN client_stats s ON s.client_id = id
+                WHERE {where}
+                ORDER BY {PICK_RANK.format(count="scoops")} DESC, id DESC
+                LIMIT ?
+            """, params + (local_now_str(), limit))
+            return cursor.fetchall()
+
+    @timed
+    def pick_items(self, search_term=None, limit=PICK_LIMIT):
+        """
+        The top `limit` items matching search_term, ranked like pick_clients
+        by how often and how recently they were sold.
+        Rows are (id, name, quantity, cost_price, selling_price).
+        """
+        with self.reader() as conn:
+            where, params = self._item_filter(conn, search_term)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, name, quantity, cost_price, selling_price
+                FROM items
+                LEFT JOIN item_stats s ON s.item_id = id
+                WHERE {where}
+                ORDER BY {PICK_RANK.format(count="picks")} DESC, id DESC
+                LIMIT ?
+            """, params + (local_now_str(), limit))
+            return cursor.fetchall()
+
+    # ---------- Bulk Import / Export ----------
+    @timed
+    def add_clients(self, rows):
+        """
+        Insert many (name, contact, email) rows in one transaction.
+        Rows whose email is already registered are skipped; returns
+        (inserted_count, skipped_rows).
+        """
+        with self.writer(immediate=True) as conn:
+            cursor = conn.cursor()
+            taken = _existing_emails(cursor, [row[2] for row in rows])
+            fresh = [row for row in rows if normalize_email(row[2]) not in taken]
+            skipped = [row for row in rows if normalize_email(row[2]) in taken]
+            cursor.executemany(
+                "INSERT INTO clients (name, contact_info, email) VALUES (?, ?, ?)", fresh
+            )
+        if fresh:
+            self._cache("clients").invalidate_searches()
+        return len(fresh), skipped
+
+    @timed
+    def add_items(self, rows):
+        """Insert many (name, quantity, cost_price, selling_price) rows in one transaction."""
+        with self.writer() as conn:
+            conn.executemany(
+                "INSERT INTO items (name, quantity, cost_price, selling_price) VALUES (?, ?, ?, ?)",
+                rows
             )
-            scoop_id = cursor.lastrowid
+        if rows:
+            self._cache("items").invalidate_searches()
+        return len(rows)
+
+    def iter_rows(self, query, params=(), batch=1000):
+        """
+        Yield the rows of a read query, fetching `batch` at a time so the
+        full result set is never held in memory. The reader connection is
+        borrowed until the generator is exhausted or closed.
+        """
+        with self.reader() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    return
+                yield from rows
 
-            # Insert scoop items and deduct stock
-            for i in items:
+    # ---------- Scoop Functions ----------
+    @timed
+    def save_scoop(self, client_id, scoop_price, items, video_url=None):
+        """Save one scoop; returns its id. Raises InsufficientStockError."""
+        scoop = {"client_id": client_id, "scoop_price": scoop_price, "items": items, "video_url": video_url}
+        return self.save_scoops([scoop])[0]
+
+    @timed
+    def save_scoops(self, scoops):
+        """
+        Save many scoops (dicts with client_id, scoop_price, items and an
+        optional video_url) in one transaction and return their ids.
+
+        Triggers on scoops and scoop_items update total_spent and stock as
+        the rows go in; the transaction runs under BEGIN IMMEDIATE and if
+        any item ends up below zero nothing is saved and
+        InsufficientStockError is raised.
+        """
+        if not scoops:
+            return []
+
+        with self.writer(immediate=True) as conn:
+            cursor = conn.cursor()
+            before = _data_version(cursor)
+            # Stamped under the write lock, so no snapshot can be taken after
+            # this sale's movements but with a later time
+            date = local_now_str()
+            # Insert scoops (ids are consecutive inside the write lock)
+            scoop_ids = []
+            for scoop in scoops:
                 cursor.execute(
-                    "INSERT INTO scoop_items (scoop_id, item_id, quantity) VALUES (?, ?, ?)",
-                    (scoop_id, i["item_id"], i["quantity"])
+                    "INSERT INTO scoops (client_id, date, total_price, video_url) VALUES (?, ?, ?, ?)",
+                    (scoop["client_id"], date, scoop["scoop_price"], scoop.get("video_url"))
                 )
-                cursor.execute("UPDATE items SET quantity = quantity - ? WHERE id = ?", (i["quantity"], i["item_id"]))
+                scoop_ids.append(cursor.lastrowid)
 
-            # Update total_spent for client
-            cursor.execute(
-                "UPDATE clients SET total_spent = total_spent + ? WHERE id = ?",
-                (scoop_price, client_id)
+            # Insert all scoop items at once (triggers deduct the stock)
+            cursor.executemany(
+                "INSERT INTO scoop_items (scoop_id, item_id, quantity) VALUES (?, ?, ?)",
+                [
+                    (scoop_id, i["item_id"], i["quantity"])
+                    for scoop_id, scoop in zip(scoop_ids, scoops)
+                    for i in scoop["items"]
+                ]
+            )
+
+            # Fresh copies of the touched rows, for the stock check and the caches
+            needed = {}
+            for scoop in scoops:
+                for i in scoop["items"]:
+                    needed[i["item_id"]] = needed.get(i["item_id"], 0) + i["quantity"]
+            item_rows = _select_by_ids(
+                cursor, "SELECT id, name, quantity, cost_price, selling_price FROM items", sorted(needed)
+            )
+            shortfall = [
+                (name, quantity + needed[item_id], needed[item_id])
+                for item_id, name, quantity, _, _ in item_rows if quantity < 0
+            ]
+            if shortfall:
+                # Leaving the with-block via the exception rolls everything back
+                raise InsufficientStockError(shortfall)
+
+            client_rows = _select_by_ids(
+                cursor, "SELECT id, name, contact_info, email, total_spent FROM clients",
+                sorted({scoop["client_id"] for scoop in scoops})
+            )
+
+            # Roll the sale into today's summary rows
+            cost_price = {row[0]: row[3] or 0 for row in item_rows}
+            self._record_daily_sales(cursor, date[:10], scoops, needed, cost_price)
+            after = _data_version(cursor)
+
+        # Only totals and stock changed, so cached searches stay valid
+        self._cache("clients").patch(client_rows, (before, after))
+        self._cache("items").patch(item_rows, (before, after))
+        return scoop_ids
+
+    def _record_daily_sales(self, cursor, day, scoops, needed, cost_price):
+        """Add a batch of scoops to daily_sales / daily_item_sales (caller's transaction)."""
+        cursor.execute("""
+            INSERT INTO daily_sales (day, scoops, revenue, cost, units)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                scoops = scoops + excluded.scoops,
+                revenue = revenue + excluded.revenue,
+                cost = cost + excluded.cost,
+                units = units + excluded.units
+        """, (
+            day,
+            len(scoops),
+            sum(scoop["scoop_price"] for scoop in scoops),
+            sum(qty * cost_price[item_id] for item_id, qty in needed.items()),
+            sum(needed.values()),
+        ))
+        cursor.executemany("""
+            INSERT INTO daily_item_sales (day, item_id, units, cost)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(day, item_id) DO UPDATE SET
+                units = units + excluded.units,
+                cost = cost + excluded.cost
+        """, [(day, item_id, qty, qty * cost_price[item_id]) for item_id, qty in needed.items()])
+
+    # ---------- Reconciliation ----------
+    @timed
+    def reconcile(self):
+        """
+        Find clients whose total_spent drifted from the sum of their scoops
+        with one grouped aggregate and repair them in bulk, take the
+        periodic stock snapshot, and compare every item's quantity with
+        its ledger. Stock is not rewritten: the ledger may be the one that
+        is wrong. Returns {"clients": rows fixed, "stock_drift": [(item_id,
+        name, quantity, ledger quantity), ...]}.
+        """
+        with self.writer(immediate=True) as conn:
+            cursor = conn.cursor()
+            before = _data_version(cursor)
+            self._take_stock_snapshots(cursor)
+            cursor.execute("""
+                SELECT i.id, i.name, i.quantity, s.quantity
+                FROM items i
+                JOIN stock_snapshots s ON s.item_id = i.id
+                 AND s.movement_id = (SELECT MAX(movement_id) FROM stock_snapshots WHERE item_id = i.id)
+                WHERE i.quantity != s.quantity
+            """)
+            stock_drift = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT c.id, COALESCE(s.spent, 0)
+                FROM clients c
+                LEFT JOIN (
+                    SELECT client_id, SUM(total_price) AS spent FROM scoops GROUP BY client_id
+                ) s ON s.client_id = c.id
+                WHERE ABS(c.total_spent - COALESCE(s.spent, 0)) > 0.005
+            """)
+            drift = cursor.fetchall()
+            cursor.executemany(
+                "UPDATE clients SET total_spent = ? WHERE id = ?",
+                [(spent, client_id) for client_id, spent in drift]
+            )
+            client_rows = _select_by_ids(
+                cursor, "SELECT id, name, contact_info, email, total_spent FROM clients",
+                [client_id for client_id, _ in drift]
             )
+            after = _data_version(cursor)
+        self._cache("clients").patch(client_rows, (before, after))
+        self._cache("items").patch([], (before, after))
+        return {"clients": len(drift), "stock_drift": stock_drift}
+
+    # ---------- Stock Ledger ----------
+    def _record_movement(self, cursor, item_id, kind, change):
+        cursor.execute(
+            "INSERT INTO stock_movements (item_id, at, kind, change) VALUES (?, ?, ?, ?)",
+            (item_id, local_now_str(), kind, change)
+        )
+
+    def _take_stock_snapshots(self, cursor):
+        """
+        Snapshot every item with movements since its last snapshot. A
+        snapshot holds the sum of all movements up to its movement id,
+        whatever their timestamps; its `at` is the latest of them, and
+        from_id / first_at give the id range it added and its earliest time.
+        """
+        cursor.execute("""
+            INSERT INTO stock_snapshots (item_id, movement_id, at, quantity, from_id, first_at)
+            SELECT base.item_id, MAX(m.id), MAX(base.at, MAX(m.at)), base.quantity + SUM(m.change),
+                   base.movement_id, MIN(m.at)
+            FROM (
+                SELECT i.id AS item_id,
+                       COALESCE(s.movement_id, 0) AS movement_id,
+                       COALESCE(s.at, '') AS at,
+                       COALESCE(s.quantity, 0) AS quantity
+                FROM items i
+                LEFT JOIN stock_snapshots s ON s.item_id = i.id
+                 AND s.movement_id = (SELECT MAX(movement_id) FROM stock_snapshots WHERE item_id = i.id)
+            ) base
+            JOIN stock_movements m
+              ON m.item_id = base.item_id AND m.id > base.movement_id
+            GROUP BY base.item_id
+        """)
+        return cursor.rowcount
+
+    @timed
+    def take_stock_snapshots(self):
+        with self.writer(immediate=True) as conn:
+            return self._take_stock_snapshots(conn.cursor())
+
+    @timed
+    def stock_at(self, item_id, when):
+        """
+        Stock of an item at `when` (a date means the end of that day): the
+        latest snapshot at or before it plus the later movements (by id)
+        stamped no later than `when`, read only from the id ranges that
+        can hold them.
+        """
+        if len(when) == 10:
+            when += " 23:59:59"
+        with self.reader() as conn:
+            snapshot = conn.execute("""
+                SELECT movement_id, quantity FROM stock_snapshots
+                WHERE item_id = ? AND at <= ?
+                ORDER BY at DESC, movement_id DESC
+                LIMIT 1
+            """, (item_id, when)).fetchone()
+            base_id, quantity = snapshot or (0, 0)
+            # Later movements stamped no later than `when`: those after the
+            # newest snapshot, and any in a later snapshot's range that
+            # starts by then (only out-of-order stamps, so usually none)
+            newest = conn.execute(
+                "SELECT MAX(movement_id) FROM stock_snapshots WHERE item_id = ?", (item_id,)
+            ).fetchone()[0]
+            ranges = conn.execute("""
+                SELECT from_id, movement_id FROM stock_snapshots
+                WHERE item_id = ? AND movement_id > ? AND first_at <= ?
+            """, (item_id, base_id, when)).fetchall()
+            ranges.append((max(newest or 0, base_id), MAX_ID))
+            change = sum(conn.execute("""
+                SELECT COALESCE(SUM(change), 0) FROM stock_movements
+                WHERE item_id = ? AND id > ? AND id <= ? AND at <= ?
+            """, (item_id, low, high, when)).fetchone()[0] for low, high in ranges)
+        return quantity + change
+
+    @timed
+    def fetch_stock_movements(self, item_id, until=None, limit=20):
+        """The latest movements of an item up to `until`, newest first."""
+        until = until + " 23:59:59" if until and len(until) == 10 else until
+        with self.reader() as conn:
+            return conn.execute("""
+                SELECT at, kind, change, scoop_id FROM stock_movements
+                WHERE item_id = ? AND at <= ?
+                ORDER BY at DESC, id DESC
+                LIMIT ?
+            """, (item_id, until or "9999", limit)).fetchall()
+
+    # ---------- Sales Summary ----------
+    @timed
+    def sales_summary(self, today=None):
+        """
+        Scoops, revenue, cost and units for today, this week (from Monday)
+        and this month, read from daily_sales: at most 31 rows whatever
+        the size of the order history.
+        """
+        from datetime import date, timedelta
 
-            conn.commit()
+        today = date.fromisoformat(today or local_now_str()[:10])
+        week_start = today - timedelta(days=today.weekday())
+        month_start = today.replace(day=1)
+        periods = {"today": today, "week": week_start, "month": month_start}
+
+        with self.reader() as conn:
+            rows = conn.execute(
+                "SELECT day, scoops, revenue, cost, units FROM daily_sales WHERE day BETWEEN ? AND ?",
+                (min(week_start, month_start).isoformat(), today.isoformat())
+            ).fetchall()
+
+        summary = {}
+        for period, start in periods.items():
+            totals = {"scoops": 0, "revenue": 0.0, "cost": 0.0, "units": 0}
+            for day, scoops, revenue, cost, units in rows:
+                if day >= start.isoformat():
+                    totals["scoops"] += scoops
+                    totals["revenue"] += revenue
+                    totals["cost"] += cost
+                    totals["units"] += units
+            totals["profit"] = totals["revenue"] - totals["cost"]
+            summary[period] = totals
+        return summary
 
     # ---------- Fetch Orders ----------
+    def _order_filter(self, conn, search_term):
+        """WHERE clause and parameters matching orders by client name."""
+        if not search_term:
+            return "1", ()
+        if self._use_fts(conn, search_term):
+            return (
+                "s.client_id IN (SELECT rowid FROM clients_fts WHERE clients_fts MATCH ?)",
+                ("name : " + _fts_phrase(search_term),),
+            )
+        return "LOWER(c.name) LIKE ?", (f"%{search_term.lower()}%",)
+
+    @timed
     def fetch_orders(self, search_term=""):
-        with self.get_connection() as conn: 
+        with self.reader() as conn:
+            where, params = self._order_filter(conn, search_term)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT s.id, c.name, s.date, s.total_price, s.client_id
+                FROM scoops s
+                JOIN clients c ON s.client_id = c.id
+                WHERE {where}
+                ORDER BY s.date DESC, s.id DESC
+            """, params)
+            return cursor.fetchall()
+
+    @timed
+    def fetch_orders_page(self, search_term="", before=None, limit=PAGE_SIZE):
+        """
+        One page of orders, newest first, as (id, client name, date, total,
+        client_id). before is the (date, id) of the last order already shown.
+        """
+        with self.reader() as conn:
+            where, params = self._order_filter(conn, search_term)
+            if before is not None:
+                where += " AND (s.date, s.id) < (?, ?)"
+                params += tuple(before)
             cursor = conn.cursor()
-            if search_term:
-                query = """
-                    SELECT s.id, c.name, s.date, s.total_price
-                    FROM scoops s
-                    JOIN clients c ON s.client_id = c.id
-                    WHERE LOWER(c.name) LIKE ?
-                    ORDER BY s.date DESC
-                """
-                cursor.execute(query, (f"%{search_term.lower()}%",))
-            else:
-                query = """
-                    SELECT s.id, c.name, s.date, s.total_price
-                    FROM scoops s
-                    JOIN clients c ON s.client_id = c.id
-                    ORDER BY s.date DESC
-                """
-                cursor.execute(query)
-
-        return cursor.fetchall()
+            cursor.execute(f"""
+                SELECT s.id, c.name, s.date, s.total_price, s.client_id
+                FROM scoops s
+                JOIN clients c ON s.client_id = c.id
+                WHERE {where}
+                ORDER BY s.date DESC, s.id DESC
+                LIMIT ?
+            """, params + (limit,))
+            return cursor.fetchall()
+
+    @timed
+    def fetch_orders_since(self, after, limit=PAGE_SIZE):
+        """
+        Orders newer than after, the (date, id) of the newest order already
+        shown, newest first and in the same shape as fetch_orders_page.
+
+        Not filtered by search term: there are only a few new orders, and a
+        client filter here makes SQLite scan every client first, so callers
+        filter the rows themselves.
+        """
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT s.id, c.name, s.date, s.total_price, s.client_id
+                FROM scoops s
+                JOIN clients c ON s.client_id = c.id
+                WHERE (s.date, s.id) > (?, ?)
+                ORDER BY s.date DESC, s.id DESC
+                LIMIT ?
+            """, tuple(after) + (limit,))
+            return cursor.fetchall()
+
+    @timed
+    def fetch_client_names(self, client_ids):
+        """{client_id: name} for the given ids (missing ids are left out)."""
+        with self.reader() as conn:
+            rows = _select_by_ids(conn.cursor(), "SELECT id, name FROM clients", sorted(set(client_ids)))
+        return dict(rows)
@@ -0,0 +1,163 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from db_trace import tracer
+
+# -----------------------------
+# Connection tuning
+# -----------------------------
+READER_COUNT = 3                 # size of the reader pool
+CACHE_SIZE_KB = 8192             # page cache per connection (negative PRAGMA value = KiB)
+MMAP_SIZE = 64 * 1024 * 1024     # memory-map the first 64 MiB of the file
+STATEMENT_CACHE = 256            # prepared statements kept per connection
+BUSY_TIMEOUT = 10.0              # seconds to wait on a locked database
+
+
+def configure(conn, read_only=False):
+    """Apply the per-connection PRAGMAs every pooled connection needs."""
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def connect(db_path, read_only=False):
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        timeout=BUSY_TIMEOUT,
+        cached_statements=STATEMENT_CACHE,
+    )
+    if tracer.enabled:
+        conn.set_trace_callback(tracer.on_statement)
+    return configure(conn, read_only=read_only)
+
+
+class ConnectionPool:
+    """
+    Long-lived connections for one database file.
+
+    A single writer connection is shared behind a lock (SQLite only allows
+    one writer at a time anyway) and a small pool of read-only connections
+    serves queries concurrently thanks to WAL journaling.
+    """
+
+    def __init__(self, db_path, readers=READER_COUNT):
+        self.db_path = db_path
+        self.max_readers = readers
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._all_readers = []
+        self._lock = threading.Lock()
+
+    # ---------- Writer ----------
+    def _get_writer(self):
+        if self._writer is None:
+            conn = connect(self.db_path)
+            # WAL is persistent in the file, so it only needs setting once
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._writer = conn
+        return self._writer
+
+    @contextmanager
+    def writer(self, immediate=False):
+        """
+        Borrow the writer; commits on success and rolls back on error.
+        immediate=True takes SQLite's write lock up front (BEGIN IMMEDIATE),
+        so read-check-write sequences cannot race other processes.
+        """
+        with self._write_lock:
+            conn = self._get_writer()
+            with conn:
+                if immediate:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+
+    # ---------- Readers ----------
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all_readers) < self.max_readers:
+                # Make sure the file is in WAL mode before readers attach
+                with self._write_lock:
+                    self._get_writer()
+                conn = connect(self.db_path, read_only=True)
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get()
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection from the pool."""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    # ---------- Tracing ----------
+    def set_trace_callback(self, callback):
+        """Install (or with None remove) a statement trace callback on every open connection."""
+        with self._lock:
+            readers = list(self._all_readers)
+        for conn in readers:
+            conn.set_trace_callback(callback)
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.set_trace_callback(callback)
+
+    # ---------- Shutdown ----------
+    def close(self):
+        with self._lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self._readers = queue.LifoQueue()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+# -----------------------------
+# One pool per database file
+# -----------------------------
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    if db_path is None:
+        from db import get_db_path
+        db_path = get_db_path()
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[db_path] = pool
+        return pool
+
+
+def set_trace_callback(callback):
+    """Apply a trace callback to the connections of every pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.set_trace_callback(callback)
+
+
+def close_all():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,245 @@
+"""
+Opt-in query tracing for the database layer.
+
+When enabled, every pooled connection reports its statements through
+sqlite3's set_trace_callback and each @timed call (the DBOps methods,
+init_db...) is timed. Both feed latency histograms kept in memory, and
+statements slower than the threshold are printed and kept in a short
+slow-query log. When disabled, a timed call costs one flag check and
+connections carry no trace callback at all.
+
+Turn it on by setting KAYSCOOPS_TRACE=1 (and optionally
+KAYSCOOPS_TRACE_SLOW_MS) in the environment, or from the diagnostics
+screen.
+"""
+import bisect
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+SLOW_MS = 100           # statements slower than this go to the slow-query log
+SLOW_LOG_SIZE = 100     # slow statements kept in memory
+MAX_SQL_LENGTH = 300    # longer statements are cut before being used as a key
+
+# Upper bounds of the histogram buckets in ms; slower samples land in a final open bucket
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Statements are traced with their bound values inlined; strip them so
+# statements group by shape and no client data ends up in a dump
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_VALUE_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Statement text with literals replaced by ? and whitespace collapsed."""
+    sql = _LITERAL.sub("?", sql)
+    sql = _VALUE_LIST.sub("?, ...", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    if len(sql) > MAX_SQL_LENGTH:
+        sql = sql[:MAX_SQL_LENGTH] + "..."
+    return sql
+
+
+class LatencyHistogram:
+    """Call count, total/max time and rows of one method or statement, bucketed by latency."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, ms, rows=None):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.calls += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        if rows:
+            self.rows += rows
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (max_ms for the open bucket)."""
+        if not self.calls:
+            return 0.0
+        wanted = self.calls * p / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= wanted:
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "buckets": dict(zip([f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"], self.counts)),
+        }
+
+
+class QueryTracer:
+    """
+    Collects the histograms. A statement is timed from the moment SQLite
+    starts it until the next statement on the same thread or the end of
+    the enclosing timed call, so the time includes fetching its rows.
+    Statements run outside any timed call are counted but not timed.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = SLOW_MS
+        self.methods = {}
+        self.statements = {}
+        self.untimed = {}
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+        self.started = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # ---------- Switching ----------
+    def enable(self, slow_ms=None):
+        from db_pool import set_trace_callback
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if not self.enabled:
+            self.enabled = True
+            self.started = time.time()
+            set_trace_callback(self.on_statement)
+
+    def disable(self):
+        from db_pool import set_trace_callback
+        self.enabled = False
+        set_trace_callback(None)
+
+    def reset(self):
+        with self._lock:
+            self.methods = {}
+            self.statements = {}
+            self.untimed = {}
+            self.slow.clear()
+            self.started = time.time() if self.enabled else None
+
+    # ---------- Recording ----------
+    def call(self, name, fn, args, kwargs):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        start = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            now = time.perf_counter()
+            self._finish_statement(now)
+            local.depth = depth
+            rows = len(result) if isinstance(result, list) else None
+            with self._lock:
+                histogram = self.methods.get(name)
+                if histogram is None:
+                    histogram = self.methods[name] = LatencyHistogram()
+                histogram.add((now - start) * 1000, rows)
+
+    def on_statement(self, sql):
+        """set_trace_callback hook; runs on the thread executing the statement."""
+        if not self.enabled or sql.startswith("--"):
+            # "--" marks statements SQLite runs inside another one (triggers,
+            # FTS5 internals); their time belongs to the outer statement
+            return
+        pending = getattr(self._local, "pending", None)
+        if pending is not None and pending[0] == sql:
+            return  # the same statement reported again as it enters a trigger
+        now = time.perf_counter()
+        self._finish_statement(now)
+        if getattr(self._local, "depth", 0):
+            self._local.pending = (sql, now)
+        else:
+            key = normalize_sql(sql)
+            with self._lock:
+                self.untimed[key] = self.untimed.get(key, 0) + 1
+
+    def _finish_statement(self, now):
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            return
+        self._local.pending = None
+        sql, start = pending
+        ms = (now - start) * 1000
+        key = normalize_sql(sql)
+        with self._lock:
+            histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = LatencyHistogram()
+            histogram.add(ms)
+            slow = ms >= self.slow_ms
+            if slow:
+                self.slow.append({
+                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "ms": round(ms, 3),
+                    "thread": threading.current_thread().name,
+                    "sql": key,
+                })
+        if slow:
+            print(f"[db_trace] slow query {ms:.1f} ms: {key}")
+
+    # ---------- Reporting ----------
+    def snapshot(self):
+        """Plain-data copy of everything recorded, slowest totals first."""
+        def ranked(histograms):
+            items = sorted(histograms.items(), key=lambda kv: kv[1].total_ms, reverse=True)
+            return [dict(h.as_dict(), name=name) for name, h in items]
+
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "started": self.started,
+                "slow_ms": self.slow_ms,
+                "methods": ranked(self.methods),
+                "statements": ranked(self.statements),
+                "untimed": dict(self.untimed),
+                "slow": list(self.slow),
+            }
+
+    def dump(self, directory):
+        """Write snapshot() as JSON into directory and return the file path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("db_trace-%Y%m%d-%H%M%S.json"))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(self.snapshot(), dumped=time.time()), f, indent=2)
+        return path
+
+
+tracer = QueryTracer()
+
+
+def timed(fn):
+    """Record the duration of fn (and the length of a returned list) while tracing is enabled."""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not tracer.enabled:
+            return fn(*args, **kwargs)
+        return tracer.call(name, fn, args, kwargs)
+    return wrapper
+
+
+def enable_from_env(environ=os.environ):
+    """Enable tracing when KAYSCOOPS_TRACE is set; KAYSCOOPS_TRACE_SLOW_MS overrides the threshold."""
+    if environ.get("KAYSCOOPS_TRACE", "0").strip() in ("", "0"):
+        return False
+    slow_ms = environ.get("KAYSCOOPS_TRACE_SLOW_MS")
+    tracer.enable(float(slow_ms) if slow_ms else None)
+    return True
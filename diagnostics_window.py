@@ -0,0 +1,91 @@
+from kivy.uix.screenmanager import Screen
+from kivy.lang import Builder
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.properties import BooleanProperty, StringProperty
+
+from db_trace import tracer
+
+# Load the KV file for this screen
+Builder.load_file("diagnostics_screen.kv")
+
+REFRESH_SECONDS = 1.0   # how often the tables update while the screen is shown
+TOP_ROWS = 15           # rows shown per table
+
+
+class DiagnosticsScreen(Screen):
+    """
+    Shows the query tracer's latency histograms: the slowest DBOps
+    methods, the slowest statements and the recent slow-query log.
+    Tracing can be switched on and off here and dumped to user_data_dir.
+    """
+
+    tracing = BooleanProperty(False)
+    report_text = StringProperty("")
+    status_text = StringProperty("")
+    _refresh_event = None
+
+    def on_pre_enter(self, *args):
+        self.refresh()
+        self._refresh_event = Clock.schedule_interval(lambda dt: self.refresh(), REFRESH_SECONDS)
+
+    def on_leave(self, *args):
+        if self._refresh_event is not None:
+            self._refresh_event.cancel()
+            self._refresh_event = None
+
+    # ---------- Actions ----------
+    def toggle_tracing(self):
+        if tracer.enabled:
+            tracer.disable()
+            self.status_text = "Tracing off"
+        else:
+            tracer.enable()
+            self.status_text = f"Tracing on, slow queries over {tracer.slow_ms:g} ms are logged"
+        self.refresh()
+
+    def reset(self):
+        tracer.reset()
+        self.status_text = "Histograms cleared"
+        self.refresh()
+
+    def dump(self):
+        path = tracer.dump(App.get_running_app().user_data_dir)
+        self.status_text = f"Saved {path}"
+
+    # ---------- Report ----------
+    def refresh(self):
+        self.tracing = tracer.enabled
+        snapshot = tracer.snapshot()
+        if not snapshot["methods"] and not snapshot["statements"]:
+            self.report_text = "Nothing recorded yet." if tracer.enabled else "Tracing is off."
+            return
+        sections = [
+            self._table("Methods", snapshot["methods"], 28),
+            self._table("Statements", snapshot["statements"], 60),
+            self._slow_log(snapshot["slow"]),
+        ]
+        self.report_text = "\n\n".join(sections)
+
+    def _table(self, title, rows, width):
+        lines = [f"[b]{title}[/b]",
+                 f"{'name':<{width}} {'calls':>7} {'p50':>8} {'p95':>8} {'max':>9} {'total':>10}"]
+        for row in rows[:TOP_ROWS]:
+            name = row["name"]
+            if len(name) > width:
+                name = name[:width - 3] + "..."
+            lines.append(f"{self._escape(f'{name:<{width}}')} {row['calls']:>7} {row['p50_ms']:>8g} "
+                         f"{row['p95_ms']:>8g} {row['max_ms']:>9.1f} {row['total_ms']:>10.1f}")
+        return "\n".join(lines)
+
+    def _slow_log(self, entries):
+        lines = [f"[b]Slow queries (over {tracer.slow_ms:g} ms)[/b]"]
+        for entry in reversed(entries[-TOP_ROWS:]):
+            lines.append(f"{entry['at']} {entry['ms']:>9.1f} ms  {self._escape(entry['sql'][:80])}")
+        if len(lines) == 1:
+            lines.append("none")
+        return "\n".join(lines)
+
+    def _escape(self, text):
+        # Keep SQL like "[x]" from being read as Label markup
+        return text.replace("&", "&amp;").replace("[", "&bl;").replace("]", "&br;")
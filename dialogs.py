@@ -0,0 +1,133 @@
+"""
+Non-blocking message and confirm dialogs.
+
+Nothing here waits on the main thread: show_message() returns at once
+and confirm() reports the answer to a callback, or can be awaited with
+ask() when the app runs under Kivy's asyncio support (App.async_run).
+
+Popups are pooled: a dialog that has closed is reconfigured and opened
+again instead of building a new widget tree for every message.
+"""
+import asyncio
+
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+
+MAX_POOLED = 4           # idle dialogs of each kind kept for reuse
+DIALOG_SIZE = (0.6, 0.4)
+
+
+class MessageDialog(Popup):
+    """A message with an OK button."""
+
+    def __init__(self, **kwargs):
+        super().__init__(size_hint=DIALOG_SIZE, **kwargs)
+        content = BoxLayout(orientation="vertical", spacing=10)
+        self.message_label = Label()
+        content.add_widget(self.message_label)
+        ok_btn = Button(text="OK", size_hint_y=None, height=40)
+        ok_btn.bind(on_release=lambda btn: self.dismiss())
+        content.add_widget(ok_btn)
+        self.content = content
+
+    def show(self, title, message):
+        self.title = title
+        self.message_label.text = message
+        self.open()
+        return self
+
+
+class ConfirmDialog(Popup):
+    """
+    A yes/no question. The callback gets True for yes and False for no,
+    including when the dialog is dismissed by tapping outside it.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(size_hint=DIALOG_SIZE, **kwargs)
+        self._callback = None
+        content = BoxLayout(orientation="vertical", spacing=10)
+        self.message_label = Label()
+        content.add_widget(self.message_label)
+        buttons = BoxLayout(size_hint_y=None, height=40, spacing=10)
+        self.yes_btn = Button()
+        self.no_btn = Button()
+        self.yes_btn.bind(on_release=lambda btn: self._answer(True))
+        self.no_btn.bind(on_release=lambda btn: self._answer(False))
+        buttons.add_widget(self.yes_btn)
+        buttons.add_widget(self.no_btn)
+        content.add_widget(buttons)
+        self.content = content
+
+    def show(self, title, message, callback, yes_text="Yes", no_text="No"):
+        self.title = title
+        self.message_label.text = message
+        self.yes_btn.text = yes_text
+        self.no_btn.text = no_text
+        self._callback = callback
+        self.open()
+        return self
+
+    def _answer(self, confirmed):
+        callback, self._callback = self._callback, None
+        self.dismiss()
+        # After dismiss, so the callback can open another dialog straight away
+        if callback is not None:
+            callback(confirmed)
+
+    def on_dismiss(self):
+        # Closed without pressing a button (tapped outside): that is a no
+        callback, self._callback = self._callback, None
+        if callback is not None:
+            callback(False)
+
+
+# -----------------------------
+# Pools
+# -----------------------------
+_pools = {MessageDialog: [], ConfirmDialog: []}
+
+
+def _acquire(dialog_class):
+    """A closed dialog of this class from the pool, or a new one."""
+    pool = _pools[dialog_class]
+    for dialog in pool:
+        # A dialog is attached to the window from open() until its closing animation ends
+        if dialog.parent is None:
+            return dialog
+    dialog = dialog_class()
+    if len(pool) < MAX_POOLED:
+        pool.append(dialog)
+    return dialog
+
+
+def show_message(title, message):
+    """Show a message with an OK button; returns immediately."""
+    return _acquire(MessageDialog).show(title, message)
+
+
+def confirm(title, message, callback, yes_text="Yes", no_text="No"):
+    """
+    Ask a yes/no question without blocking. callback(confirmed) runs on
+    the main thread once the user answers.
+    """
+    return _acquire(ConfirmDialog).show(title, message, callback, yes_text, no_text)
+
+
+async def ask(title, message, yes_text="Yes", no_text="No"):
+    """
+    Awaitable confirm() for code running under App.async_run:
+
+        if await ask("Confirm Delete", "Delete this client?"):
+            ...
+    """
+    future = asyncio.get_running_loop().create_future()
+
+    def answered(confirmed):
+        if not future.done():
+            future.set_result(confirmed)
+
+    confirm(title, message, answered, yes_text, no_text)
+    return await future
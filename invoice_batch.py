@@ -0,0 +1,119 @@
+"""
+Generate invoices in bulk, e.g. at month end.
+
+All scoops for a date range and/or client are fetched in two set-based
+queries, then the PDFs are rendered in parallel on a process pool.
+
+    python invoice_batch.py --db kayscoops.db --from 2025-01-01 --to 2025-01-31 --out invoices/
+    python invoice_batch.py --db kayscoops.db --client 12 --workers 4 --out invoices/
+
+workers=1 renders in-process, which is what to use where multiprocessing
+is not available (e.g. on Android).
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from invoice_generator import fetch_invoices, render_invoice
+
+
+def invoice_filter(start=None, end=None, client_id=None):
+    """
+    WHERE clause and parameters on scoops s for the batch. start and end
+    are YYYY-MM-DD dates, both inclusive.
+    """
+    clauses, params = [], []
+    if start:
+        clauses.append("s.date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("s.date < date(?, '+1 day')")
+        params.append(end)
+    if client_id is not None:
+        clauses.append("s.client_id = ?")
+        params.append(client_id)
+    return " AND ".join(clauses) or "1", tuple(params)
+
+
+def _render_job(invoice, filepath):
+    """Runs in a worker process; returns (scoop_id, filepath, seconds)."""
+    start = time.perf_counter()
+    render_invoice(invoice, filepath)
+    return invoice["scoop_id"], filepath, time.perf_counter() - start
+
+
+def generate_invoices(db, out_dir, start=None, end=None, client_id=None, workers=None, progress=None):
+    """
+    Render an invoice_<id>.pdf into out_dir for every matching scoop.
+
+    workers defaults to the CPU count. progress(done, total) is called as
+    each invoice finishes. Returns a report with per-invoice timings
+    [(scoop_id, path, seconds)] and overall throughput.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    where, params = invoice_filter(start, end, client_id)
+    with db.reader() as conn:
+        invoices = fetch_invoices(conn, where, params)
+    fetched = time.perf_counter()
+
+    jobs = [(invoice, os.path.join(out_dir, f"invoice_{invoice['scoop_id']}.pdf")) for invoice in invoices]
+    timings = []
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(jobs) <= 1:
+        for invoice, path in jobs:
+            timings.append(_render_job(invoice, path))
+            if progress:
+                progress(len(timings), len(jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = [pool.submit(_render_job, invoice, path) for invoice, path in jobs]
+            for future in as_completed(futures):
+                timings.append(future.result())
+                if progress:
+                    progress(len(timings), len(jobs))
+
+    finished = time.perf_counter()
+    render_seconds = finished - fetched
+    timings.sort()
+    return {
+        "count": len(jobs),
+        "workers": workers,
+        "fetch_seconds": fetched - started,
+        "render_seconds": render_seconds,
+        "total_seconds": finished - started,
+        "invoices_per_second": len(jobs) / render_seconds if jobs and render_seconds else 0.0,
+        "timings": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate invoices for a date range or client")
+    parser.add_argument("--db", required=True, help="path to kayscoops.db")
+    parser.add_argument("--out", required=True, help="directory to write the PDFs to")
+    parser.add_argument("--from", dest="start", help="first date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last date, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--client", type=int, help="only this client id")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args()
+
+    from db_ops import DBOps
+    report = generate_invoices(
+        DBOps(args.db), args.out, args.start, args.end, args.client, args.workers,
+        progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True),
+    )
+
+    print()
+    for scoop_id, path, seconds in report["timings"]:
+        print(f"  #{scoop_id:<8}{seconds * 1000:>8.1f} ms  {path}")
+    print(f"{report['count']} invoices with {report['workers']} workers: "
+          f"fetch {report['fetch_seconds'] * 1000:.0f} ms, "
+          f"render {report['render_seconds']:.2f}s "
+          f"({report['invoices_per_second']:.1f} invoices/s)")
+
+
+if __name__ == "__main__":
+    main()
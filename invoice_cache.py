@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+
+MAX_BYTES = 50 * 1024 * 1024     # total size of cached PDFs before eviction
+CACHE_DIR = "invoice_cache"      # created next to kayscoops.db in user_data_dir
+
+# Bump when the invoice layout changes so old PDFs are not served again
+RENDER_VERSION = 1
+
+
+def invoice_key(invoice):
+    """
+    Content hash of everything printed on an invoice: the scoop row, the
+    client details and each line with its item name and prices. Any change
+    to one of them gives a different key, so stale entries are never hit.
+    """
+    payload = json.dumps([RENDER_VERSION, invoice], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InvoiceCache:
+    """
+    Rendered invoice PDFs on disk, named by invoice_key().
+
+    A hit refreshes the file's mtime, and once the directory grows past
+    max_bytes the least recently used files are deleted first.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """Path of the cached PDF for key, or None."""
+        path = self.path(key)
+        with self._lock:
+            try:
+                os.utime(path)  # mark as recently used
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return path
+
+    def put(self, key, data):
+        """Store PDF bytes under key and return the cached path."""
+        path = self.path(key)
+        tmp = f"{path}.tmp"
+        with self._lock:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)  # readers never see a half-written PDF
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+# -----------------------------
+# One cache per data directory
+# -----------------------------
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_invoice_cache(data_dir):
+    """The cache living in data_dir (the app's user_data_dir)."""
+    with _caches_lock:
+        cache = _caches.get(data_dir)
+        if cache is None:
+            cache = InvoiceCache(os.path.join(data_dir, CACHE_DIR))
+            _caches[data_dir] = cache
+        return cache
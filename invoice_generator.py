@@ -1,43 +1,68 @@
-from fpdf import FPDF
+import filecmp
 import sqlite3
+import shutil
 import os
-from db_ops import DBOps
 
-class InvoicePDF(FPDF):
-    def header(self):
-        # Optional global header override (we'll build manually instead)
-        pass
+from db_trace import timed
+from invoice_cache import get_invoice_cache, invoice_key
 
-def generate_invoice(scoop_id, filepath):
-    db = DBOps()
-    conn = db.get_connection()
-    cursor = conn.cursor()
+# -----------------------------
+# Data
+# -----------------------------
+INVOICE_QUERY = """
+    SELECT s.id, s.date, s.total_price, c.name, c.contact_info, c.email
+    FROM scoops s
+    JOIN clients c ON s.client_id = c.id
+    WHERE {where}
+    ORDER BY s.id
+"""
 
-    try:
-        # Fetch scoop + client info
-        cursor.execute("""
-            SELECT s.id, s.date, s.total_price, c.name, c.contact_info, c.email
-            FROM scoops s
-            JOIN clients c ON s.client_id = c.id
-            WHERE s.id = ?
-        """, (scoop_id,))
-        scoop = cursor.fetchone()
-
-        if not scoop:
-            print("Scoop not found!")
-            return
+LINES_QUERY = """
+    SELECT si.scoop_id, i.name, si.quantity, i.cost_price, i.selling_price
+    FROM scoop_items si
+    JOIN scoops s ON si.scoop_id = s.id
+    JOIN items i ON si.item_id = i.id
+    WHERE {where}
+    ORDER BY si.scoop_id, si.id
+"""
+
+
+@timed
+def fetch_invoices(conn, where, params=()):
+    """
+    Everything needed to render the invoices of scoops matching `where`
+    (a condition on scoops s), in two queries whatever the number of scoops.
+    Returns a list of dicts ordered by scoop id.
+    """
+    cursor = conn.cursor()
+    cursor.execute(INVOICE_QUERY.format(where=where), params)
+    invoices = {}
+    for scoop_id, date, total_price, client_name, phone, email in cursor.fetchall():
+        invoices[scoop_id] = {
+            "scoop_id": scoop_id,
+            "date": date,
+            "total_price": total_price,
+            "client_name": client_name,
+            "phone": phone,
+            "email": email,
+            "items": [],
+        }
+    cursor.execute(LINES_QUERY.format(where=where), params)
+    for scoop_id, name, qty, cost, sell in cursor.fetchall():
+        if scoop_id in invoices:
+            invoices[scoop_id]["items"].append((name, qty, cost, sell))
+    return list(invoices.values())
 
-        scoop_id, date, total_price, client_name, phone, email = scoop
 
-        # Fetch items linked to this scoop
-        cursor.execute("""
-            SELECT i.name, si.quantity, i.cost_price, i.selling_price
-            FROM scoop_items si
-            JOIN items i ON si.item_id = i.id
-            WHERE si.scoop_id = ?
-        """, (scoop_id,))
-        items = cursor.fetchall()
+def generate_invoice(scoop_id, filepath, db=None):
+    if db is None:
+        # Imported here so batch render workers don't pull in Kivy via db_ops
+        from db_ops import DBOps
+        db = DBOps()
 
+    try:
+        with db.reader() as conn:
+            invoices = fetch_invoices(conn, "s.id = ?", (scoop_id,))
     except Exception as e:
         if isinstance(e, sqlite3.OperationalError) and "no such table" in str(e):
             from db import init_db
@@ -46,85 +71,207 @@ def generate_invoice(scoop_id, filepath):
             return
         else:
             raise
-    finally:
-        conn.close()
 
-    # Calculate total cost price
-    total_cost_price = sum(qty * cost for _, qty, cost, _ in items)
+    if not invoices:
+        print("Scoop not found!")
+        return
+
+    # Reuse the PDF rendered last time unless something on the invoice changed
+    invoice = invoices[0]
+    cache = get_invoice_cache(os.path.dirname(os.path.abspath(db.db_path)))
+    key = invoice_key(invoice)
+    cached = cache.get(key)
+    if cached is None:
+        cached = cache.put(key, get_renderer().render(invoice))
+    try:
+        _copy_if_changed(cached, filepath)
+    except FileNotFoundError:
+        if os.path.exists(cached):
+            raise  # the target directory is missing, not the cached PDF
+        # Evicted by another process (an invoice_batch worker) since get()
+        _copy_if_changed(cache.put(key, get_renderer().render(invoice)), filepath)
+    print(f"Invoice generated: {filepath}")
+    return filepath
+
+
+def _copy_if_changed(source, filepath):
+    if not (os.path.exists(filepath) and filecmp.cmp(source, filepath, shallow=False)):
+        shutil.copyfile(source, filepath)
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "kay.png")
+
+ROW_HEIGHT = 10
+COLUMNS = [(60, "Item"), (20, "Qty"), (40, "Cost Price (R)"), (40, "Selling Price (R)")]
+
+_fpdf = None
+
+
+def _load_fpdf():
+    """
+    Import fpdf on first use rather than with this module, so screens
+    that only might print an invoice do not pay for it at startup.
+    Returns (InvoicePDF class, legacy flag).
+    """
+    global _fpdf
+    if _fpdf is None:
+        import fpdf
+
+        class InvoicePDF(fpdf.FPDF):
+            def header(self):
+                # Optional global header override (we'll build manually instead)
+                pass
+
+        # PyFPDF 1.x returns the document as a latin-1 str, fpdf2 as a bytearray
+        legacy = str(getattr(fpdf, "FPDF_VERSION", "1")).startswith("1.")
+        _fpdf = (InvoicePDF, legacy)
+    return _fpdf
+
+
+class InvoiceRenderer:
+    """
+    Renders invoices to PDF bytes and keeps what can be shared between
+    documents: the logo is located once and, after the first invoice, its
+    parsed image data is reused instead of decoding the PNG again. The
+    fonts are FPDF's built-in Helvetica, so there is nothing to load.
 
-    # Prepare PDF
-    filename = f"invoice_{scoop_id}.pdf"
-    pdf = InvoicePDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
+    One renderer can be reused for any number of invoices (not from
+    several threads at once).
+    """
 
-    # Logo
-    if os.path.exists("assets/kay.png"):
-        pdf.image("assets/kay.png", x=10, y=10, w=30)
+    def __init__(self, logo_path=LOGO_PATH):
+        self.logo_path = logo_path if logo_path and os.path.exists(logo_path) else None
+        self._logo_info = None
+
+    # ---------- Output ----------
+    def render(self, invoice):
+        """PDF bytes for one invoice (a dict from fetch_invoices)."""
+        pdf = self._build(invoice)
+        if _load_fpdf()[1]:
+            return pdf.output(dest="S").encode("latin-1")
+        return bytes(pdf.output())
+
+    def render_to(self, invoice, fileobj):
+        """Write the PDF to a binary file object (a file, BytesIO, a socket...)."""
+        fileobj.write(self.render(invoice))
+
+    def write(self, invoice, filepath):
+        with open(filepath, "wb") as f:
+            self.render_to(invoice, f)
+
+    # ---------- Drawing ----------
+    def _logo(self, pdf):
+        if self.logo_path is None:
+            return
+        images = getattr(pdf, "images", None)
+        cacheable = isinstance(images, dict)
+        if cacheable and self._logo_info is not None:
+            # Seed the document with the already parsed PNG (PyFPDF keys images by path)
+            images[self.logo_path] = dict(self._logo_info, i=len(images) + 1)
+        pdf.image(self.logo_path, x=10, y=10, w=30)
+        if cacheable and self._logo_info is None and self.logo_path in images:
+            self._logo_info = dict(images[self.logo_path])
         pdf.ln(25)
 
-    # Title
-    pdf.set_text_color(120, 60, 60)   # soft warm reddish-brown
-    pdf.set_font("Helvetica", "B", 20)
-    pdf.cell(0, 10, "Kay Scoops - Sweet Surprises", ln=True)
-    pdf.set_text_color(0, 0, 0)  # reset
-    
-    pdf.set_font("Helvetica", "", 12)
-    pdf.ln(3)
-    pdf.cell(0, 8, f"Invoice #{scoop_id}", ln=True)
-    pdf.cell(0, 6, f"Date: {date}", ln=True)
-    pdf.ln(4)
-
-    # Client info
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.cell(0, 6, "Client Information:", ln=True)
-
-    pdf.set_font("Helvetica", "", 12)
-    pdf.cell(0, 6, f"Name: {client_name}", ln=True)
-    if phone:
-        pdf.cell(0, 6, f"Phone: {phone}", ln=True)
-    if email:
-        pdf.cell(0, 6, f"Email: {email}", ln=True)
-    pdf.ln(5)
-
-    # TABLE HEADER
-    pdf.set_fill_color(242, 196, 196)  # #f2c4c4
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Helvetica", "B", 12)
-
-    pdf.cell(60, 10, "Item", border=1, align="C", fill=True)
-    pdf.cell(20, 10, "Qty", border=1, align="C", fill=True)
-    pdf.cell(40, 10, "Cost Price (R)", border=1, align="C", fill=True)
-    pdf.cell(40, 10, "Selling Price (R)", border=1, align="C", fill=True)
-    pdf.ln()
-
-    # TABLE ROWS
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_font("Helvetica", "", 12)
-
-    for name, qty, cost, sell in items:
-        pdf.cell(60, 10, name, border=1, align="C")
-        pdf.cell(20, 10, str(qty), border=1, align="C")
-        pdf.cell(40, 10, f"{cost:.2f}", border=1, align="C")
-        pdf.cell(40, 10, f"{sell:.2f}", border=1, align="C")
+    def _table_header(self, pdf):
+        pdf.set_fill_color(242, 196, 196)  # #f2c4c4
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font("Helvetica", "B", 12)
+        for width, title in COLUMNS:
+            pdf.cell(width, ROW_HEIGHT, title, border=1, align="C", fill=True)
         pdf.ln()
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font("Helvetica", "", 12)
 
-    pdf.ln(5)
+    def _build(self, invoice):
+        scoop_id = invoice["scoop_id"]
+        date = invoice["date"]
+        total_price = invoice["total_price"]
+        client_name = invoice["client_name"]
+        phone = invoice["phone"]
+        email = invoice["email"]
+        items = invoice["items"]
 
-    # TOTALS SECTION
-    pdf.set_font("Helvetica", "B", 14)
-    pdf.cell(0, 8, f"Total Selling Price: R{total_price:.2f}", ln=True)
+        # Calculate total cost price
+        total_cost_price = sum(qty * cost for _, qty, cost, _ in items)
 
-    pdf.set_font("Helvetica", "B", 14)
-    pdf.cell(0, 8, f"Total Cost Price: R{total_cost_price:.2f}", ln=True)
+        # Prepare PDF
+        pdf = _load_fpdf()[0]()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.add_page()
 
-    pdf.ln(8)
-    pdf.set_font("Helvetica", "", 12)
-    pdf.cell(0, 8, "Thank you for choosing Kay Scoops!", ln=True)
+        # Logo
+        self._logo(pdf)
+
+        # Title
+        pdf.set_text_color(120, 60, 60)   # soft warm reddish-brown
+        pdf.set_font("Helvetica", "B", 20)
+        pdf.cell(0, 10, "Kay Scoops - Sweet Surprises", ln=True)
+        pdf.set_text_color(0, 0, 0)  # reset
+
+        pdf.set_font("Helvetica", "", 12)
+        pdf.ln(3)
+        pdf.cell(0, 8, f"Invoice #{scoop_id}", ln=True)
+        pdf.cell(0, 6, f"Date: {date}", ln=True)
+        pdf.ln(4)
+
+        # Client info
+        pdf.set_font("Helvetica", "B", 12)
+        pdf.cell(0, 6, "Client Information:", ln=True)
+
+        pdf.set_font("Helvetica", "", 12)
+        pdf.cell(0, 6, f"Name: {client_name}", ln=True)
+        if phone:
+            pdf.cell(0, 6, f"Phone: {phone}", ln=True)
+        if email:
+            pdf.cell(0, 6, f"Email: {email}", ln=True)
+        pdf.ln(5)
+
+        # TABLE
+        self._table_header(pdf)
+        for name, qty, cost, sell in items:
+            # Break before a row would cross the margin and repeat the header,
+            # rather than letting auto page break split the table headerless
+            if pdf.get_y() + ROW_HEIGHT > pdf.page_break_trigger:
+                pdf.add_page()
+                self._table_header(pdf)
+            for (width, _), text in zip(COLUMNS, (name, str(qty), f"{cost:.2f}", f"{sell:.2f}")):
+                pdf.cell(width, ROW_HEIGHT, text, border=1, align="C")
+            pdf.ln()
+
+        pdf.ln(5)
+
+        # TOTALS SECTION
+        pdf.set_font("Helvetica", "B", 14)
+        pdf.cell(0, 8, f"Total Selling Price: R{total_price:.2f}", ln=True)
+
+        pdf.set_font("Helvetica", "B", 14)
+        pdf.cell(0, 8, f"Total Cost Price: R{total_cost_price:.2f}", ln=True)
+
+        pdf.ln(8)
+        pdf.set_font("Helvetica", "", 12)
+        pdf.cell(0, 8, "Thank you for choosing Kay Scoops!", ln=True)
+        return pdf
+
+
+_renderer = None
+
+
+def get_renderer():
+    """The shared renderer of this process (each batch worker gets its own)."""
+    global _renderer
+    if _renderer is None:
+        _renderer = InvoiceRenderer()
+    return _renderer
+
+
+def render_invoice(invoice, filepath):
+    """Write one invoice (a dict from fetch_invoices) to filepath as PDF."""
+    get_renderer().write(invoice, filepath)
 
-    # Save PDF
-    pdf.output(filepath)
-    print(f"Invoice generated: {filepath}")
 
 if __name__ == "__main__":
     generate_invoice(1, "invoice_1.pdf")
\ No newline at end of file
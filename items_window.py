@@ -1,50 +1,41 @@
 from kivy.uix.screenmanager import Screen
-from kivy.properties import ObjectProperty
+from kivy.properties import ObjectProperty, BooleanProperty, NumericProperty, StringProperty
 from kivy.app import App
 from kivy.lang import Builder
-from db_ops import DBOps
+from db_ops import DBOps, PAGE_SIZE
+from db_executor import AsyncDBOps
+from search_controller import SearchController, text_matcher
+from widgets import scrolled_near_end
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
-from kivy.graphics import Color, Rectangle
-from kivy.uix.button import Button
-from kivy.uix.popup import Popup
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 import sqlite3
+from datetime import datetime
 
 # Load KV file
 Builder.load_file("items_screen.kv")
 
 
-class ItemRow(BoxLayout):
-    def __init__(self, id_, name, quantity, cost, selling, index=0, on_select=None, is_heading=False, **kwargs):
-        super().__init__(orientation="horizontal", size_hint_y=None, height=40, spacing=5, **kwargs)
+class ItemRow(RecycleDataViewBehavior, BoxLayout):
+    """Recycled table row (layout in items_screen.kv); also used for the heading."""
+    index = NumericProperty(0)
+    item_id = StringProperty("")
+    item_name = StringProperty("")
+    quantity = StringProperty("")
+    cost = StringProperty("")
+    selling = StringProperty("")
+    is_heading = BooleanProperty(False)
+    screen = ObjectProperty(None, allownone=True)
+
+    def refresh_view_attrs(self, rv, index, data):
+        # index drives the alternating row colour
         self.index = index
-        bg_color = (0.9, 0.9, 0.95, 1) if index % 2 == 0 else (0.85, 0.85, 0.9, 1)
-        if is_heading:
-            bg_color = (0.65, 0.5, 0.9, 1)
-        with self.canvas.before:
-            Color(*bg_color)
-            self.rect = Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_rect, size=self.update_rect)
-
-        # Columns
-        self.add_widget(Label(text=id_, size_hint_x=0.1, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=name, size_hint_x=0.3, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=quantity, size_hint_x=0.15, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=cost, size_hint_x=0.2, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-        self.add_widget(Label(text=selling, size_hint_x=0.25, bold=is_heading, color=(1,1,1,1) if is_heading else (0,0,0,1)))
-
-        if not is_heading and on_select:
-            self.bind(on_touch_down=lambda widget, touch: self._on_touch(touch, on_select))
-
-    def update_rect(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
-
-    def _on_touch(self, touch, callback):
-        if self.collide_point(*touch.pos):
-            callback()
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_touch_down(self, touch):
+        if not self.is_heading and self.screen and self.collide_point(*touch.pos):
+            self.screen.load_item(self.index)
             return True
-        return False
+        return super().on_touch_down(touch)
 
 
 class ItemsScreen(Screen):
@@ -57,43 +48,42 @@ class ItemsScreen(Screen):
 
     selected_item_id = None
     items = []
+    search_term = None
+    has_more = False
+    loading = False
+    saving = False
 
     def on_pre_enter(self):
         """Refresh clients whenever screen is opened."""
         if not hasattr(self, 'db'):
             self.db = DBOps()  # safe lazy init
+            self.db_async = AsyncDBOps(self.db)
+            self.search = SearchController(
+                lambda term: self._fetch_page(term, None),
+                self._show_search_results,
+                matches=text_matcher(1),
+                key="items_search",
+                page_size=PAGE_SIZE,
+            )
         self.refresh_items()
 
     def refresh_items(self, search_term=None):
-        """Fetch clients from DB and update table/list."""
-        try:
-            self.items = self.db.fetch_items(search_term)
-        except sqlite3.OperationalError as e:
-            if "no such table" in str(e):
-                from db import init_db
-                init_db()  # create tables
-                self.items = self.db.fetch_items(search_term)
-            else:
-                raise
-        
-        self.items_list.clear_widgets()
-
-        # Headings
-        headings = ["ID", "Name", "Quantity", "Cost (R)", "Selling (R)"]
-        self.items_list.add_widget(ItemRow(*headings, is_heading=True))
-
-        # Rows
-        for idx, item in enumerate(self.items):
-            item_id, name, quantity, cost_price, selling_price = item
-            self.items_list.add_widget(ItemRow(
-                str(item_id),
-                name,
-                str(quantity),
-                f"{cost_price:.2f}" if cost_price else "0.00",
-                f"{selling_price:.2f}" if selling_price else "0.00",
-                index=idx,
-                on_select=lambda i=idx: self.load_item(i)
-            ))
+        """Reset the table and load the first page of matching items."""
+        # Data may have changed, so cached search results are stale
+        self.search.cancel()
+        self.search.invalidate()
+        self._reset_table(search_term)
+        self.load_more_items()
+
+    def _reset_table(self, search_term):
+        # A page still loading belongs to the previous term
+        self.db_async.executor.cancel("items_page")
+        self.search_term = search_term
+        self.items = []
+        self.has_more = True
+        self.loading = False
+        # The heading row lives in the kv file; only data rows are recycled
+        self.items_list.data = []
 
         # Clear inputs
         self.name_input.text = ""
@@ -102,6 +92,52 @@ class ItemsScreen(Screen):
         self.selling_input.text = ""
         self.selected_item_id = None
 
+    def load_more_items(self):
+        """Request the next page of items in the background."""
+        if not self.has_more or self.loading:
+            return
+        self.loading = True
+        after_id = self.items[-1][0] if self.items else None
+        self.db_async.run(
+            self._fetch_page, self.search_term, after_id,
+            callback=self._append_page, key="items_page"
+        )
+
+    def _fetch_page(self, search_term, after_id):
+        """Runs on the DB worker thread."""
+        try:
+            return self.db.fetch_items_page(search_term, after_id)
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                from db import init_db
+                init_db()  # create tables
+                return self.db.fetch_items_page(search_term, after_id)
+            raise
+
+    def _append_page(self, page):
+        """Append a fetched page to the table (main thread)."""
+        self.loading = False
+        self.has_more = len(page) == PAGE_SIZE
+
+        # Rows (RecycleView only builds widgets for the visible ones)
+        self.items.extend(page)
+        self.items_list.data.extend([
+            {
+                "item_id": str(item_id),
+                "item_name": name,
+                "quantity": str(quantity),
+                "cost": f"{cost_price:.2f}" if cost_price else "0.00",
+                "selling": f"{selling_price:.2f}" if selling_price else "0.00",
+                "screen": self,
+            }
+            for item_id, name, quantity, cost_price, selling_price in page
+        ])
+
+    def on_table_scroll(self, view):
+        """Load the next page once the user scrolls near the end of the table."""
+        if self.has_more and scrolled_near_end(view):
+            self.load_more_items()
+
     def load_item(self, idx):
         """Populate input fields when an item is selected."""
         item = self.items[idx]
@@ -112,9 +148,15 @@ class ItemsScreen(Screen):
         self.selling_input.text = str(item[4]) if item[4] else "0.00"
 
     def on_search(self, text):
-        self.refresh_items(text.strip())
+        self.search.on_text(text.strip())
+
+    def _show_search_results(self, search_term, page):
+        self._reset_table(search_term)
+        self._append_page(page)
 
     def add_item(self):
+        if self.saving:
+            return  # previous write still running
         name = self.name_input.text.strip()
         quantity = self.quantity_input.text.strip()
         cost = self.cost_input.text.strip()
@@ -124,11 +166,16 @@ class ItemsScreen(Screen):
             App.get_running_app().popup("Error", "Please enter name and quantity!")
             return
 
-        self.db.add_item(name, int(quantity), float(cost) if cost else 0, float(selling) if selling else 0)
-        App.get_running_app().popup("Success", f"Item '{name}' added successfully!")
-        self.refresh_items()
+        self.saving = True
+        self.db_async.add_item(
+            name, int(quantity), float(cost) if cost else 0, float(selling) if selling else 0,
+            callback=lambda _: self._item_written("Success", f"Item '{name}' added successfully!"),
+            on_error=self._write_failed
+        )
 
     def update_item(self):
+        if self.saving:
+            return
         if not self.selected_item_id:
             App.get_running_app().popup("Error", "Please select an item to update!")
             return
@@ -142,40 +189,76 @@ class ItemsScreen(Screen):
             App.get_running_app().popup("Error", "Please enter name and quantity!")
             return
 
-        self.db.update_item(self.selected_item_id, name, int(quantity), float(cost) if cost else 0, float(selling) if selling else 0)
-        App.get_running_app().popup("Success", f"Item '{name}' updated successfully!")
+        self.saving = True
+        self.db_async.update_item(
+            self.selected_item_id, name, int(quantity), float(cost) if cost else 0, float(selling) if selling else 0,
+            callback=lambda _: self._item_written("Success", f"Item '{name}' updated successfully!"),
+            on_error=self._write_failed
+        )
+
+    def _item_written(self, title, message):
+        self.saving = False
+        App.get_running_app().popup(title, message)
         self.refresh_items()
 
+    def _write_failed(self, error):
+        self.saving = False
+        App.get_running_app().popup("Error", f"Could not save item: {error}")
+
+    # ---------- Stock History ----------
+    def show_stock_on_date(self, day):
+        """Show the selected item's stock at the end of `day` and its movements up to then."""
+        if not self.selected_item_id:
+            App.get_running_app().popup("Error", "Please select an item first!")
+            return
+        day = day.strip()
+        try:
+            datetime.strptime(day, "%Y-%m-%d")
+        except ValueError:
+            App.get_running_app().popup("Error", "Please enter a date as YYYY-MM-DD!")
+            return
+
+        name = self.name_input.text.strip()
+        self.db_async.run(
+            self._stock_history, self.selected_item_id, day,
+            callback=lambda result: self._show_stock_history(name, day, *result),
+            key="items_stock"
+        )
+
+    def _stock_history(self, item_id, day):
+        """Runs on the DB worker thread."""
+        return self.db.stock_at(item_id, day), self.db.fetch_stock_movements(item_id, day, limit=10)
+
+    def _show_stock_history(self, name, day, quantity, movements):
+        lines = [f"{name}: {quantity} in stock at the end of {day}", "", "Latest movements:"]
+        lines += [
+            f"{at}  {kind}  {change:+d}" + (f"  (scoop #{scoop_id})" if scoop_id else "")
+            for at, kind, change, scoop_id in movements
+        ] or ["none"]
+        App.get_running_app().popup("Stock History", "\n".join(lines))
+
     def delete_item(self):
+        if self.saving:
+            return
         if not self.selected_item_id:
             App.get_running_app().popup("Error", "Please select an item to delete!")
             return
 
-        content = BoxLayout(orientation='vertical', spacing=10)
-        content.add_widget(Label(text="Are you sure you want to delete this item?"))
-
-        buttons = BoxLayout(size_hint_y=None, height=40, spacing=10)
-        yes_btn = Button(text="Yes")
-        no_btn = Button(text="No")
-        buttons.add_widget(yes_btn)
-        buttons.add_widget(no_btn)
-        content.add_widget(buttons)
-
-        popup = Popup(title="Confirm Delete", content=content, size_hint=(0.6, 0.4))
-
-        def on_confirm(instance):
-            try:
-                self.db.delete_item(self.selected_item_id)
-                App.get_running_app().popup("Deleted", "Item deleted successfully!")
-                self.selected_item_id = None
-                self.refresh_items()
-            except sqlite3.IntegrityError:
-                App.get_running_app().popup("Error", "Cannot delete this item because it is referenced in another table.")
-            popup.dismiss()
-
-        def on_cancel(instance):
-            popup.dismiss()
-
-        yes_btn.bind(on_release=on_confirm)
-        no_btn.bind(on_release=on_cancel)
-        popup.open()
+        def on_answer(confirmed):
+            if not confirmed:
+                return
+            self.saving = True
+            self.db_async.delete_item(
+                self.selected_item_id,
+                callback=lambda _: self._item_written("Deleted", "Item deleted successfully!"),
+                on_error=self._delete_failed
+            )
+
+        App.get_running_app().confirm("Confirm Delete", "Are you sure you want to delete this item?", on_answer)
+
+    def _delete_failed(self, error):
+        self.saving = False
+        if isinstance(error, sqlite3.IntegrityError):
+            App.get_running_app().popup("Error", "Cannot delete this item because it is referenced in another table.")
+            return
+        App.get_running_app().popup("Error", f"Could not delete item: {error}")
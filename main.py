@@ -1,75 +1,107 @@
+import time
+
+# Taken before Kivy and the screens are imported, for the startup report
+_STARTED = time.perf_counter()
+
 from kivy.app import App
-from kivy.lang import Builder
-from kivy.uix.screenmanager import ScreenManager
-from dashboard_window import DashboardScreen
-from client_window import ClientScreen
-from items_window import ItemsScreen
-from new_scoop_window import NewScoopScreen
-from orders_window import OrdersScreen
+from kivy.clock import Clock
 
 from db import init_db
+from db_pool import close_all
+from db_trace import enable_from_env
+from db_executor import get_executor, shutdown_executor
+from db_ops import DBOps, SNAPSHOT_INTERVAL
+from widgets import LazyScreenManager
+
+# Screens are imported and built the first time they are shown; each
+# *_window module loads its own kv file when imported
+SCREENS = {
+    "dashboard": "dashboard_window:DashboardScreen",
+    "clients": "client_window:ClientScreen",
+    "items": "items_window:ItemsScreen",
+    "newscoop": "new_scoop_window:NewScoopScreen",
+    "orders": "orders_window:OrdersScreen",
+    "diagnostics": "diagnostics_window:DiagnosticsScreen",
+}
+
 
 class KayScoopsApp(App):
     def build(self):
+        self._startup = [("imports", time.perf_counter())]
+        # KAYSCOOPS_TRACE=1 records query latencies from the first statement on
+        enable_from_env()
         init_db()
-        
-        Builder.load_file("dashboard_screen.kv")
-        Builder.load_file("client_screen.kv")
-        Builder.load_file("items_screen.kv")
-        Builder.load_file("new_scoop_screen.kv")
-        Builder.load_file("orders_screen.kv")
-        
-        sm = ScreenManager()
-
-        # Add screens with consistent names
-        sm.add_widget(DashboardScreen(name="dashboard"))
-        sm.add_widget(ClientScreen(name="clients"))  # <-- use 'clients'
-        sm.add_widget(ItemsScreen(name="items"))
-        sm.add_widget(NewScoopScreen(name="newscoop"))
-        sm.add_widget(OrdersScreen(name="orders"))
+        self._startup.append(("init_db", time.perf_counter()))
 
+        sm = LazyScreenManager(SCREENS)
+        sm.current = "dashboard"
+        self._startup.append(("dashboard screen", time.perf_counter()))
         return sm
 
-    # Optional helper for popups
+    def on_start(self):
+        from kivy.core.window import Window
+        self._startup.append(("window and on_start", time.perf_counter()))
+        Window.fbind("on_flip", self._first_frame)
+        # Repair client totals and check stock against its ledger once the UI is up, off the main thread
+        Clock.schedule_once(self._reconcile, 1)
+        # Snapshots on a background thread while the app runs; see backup.py
+        from backup import BACKUP_INTERVAL, FIRST_BACKUP_DELAY
+        Clock.schedule_once(self._backup, FIRST_BACKUP_DELAY)
+        Clock.schedule_interval(self._backup, BACKUP_INTERVAL)
+        # Keep stock_at lookups short for an app that stays open for days
+        Clock.schedule_interval(self._snapshot_stock, SNAPSHOT_INTERVAL)
+
+    def _first_frame(self, window):
+        window.funbind("on_flip", self._first_frame)
+        self._startup.append(("first frame", time.perf_counter()))
+        self._report_startup()
+
+    def _report_startup(self):
+        """Print how long each startup phase took up to the first frame."""
+        print(f"Startup: {(self._startup[-1][1] - _STARTED) * 1000:.0f} ms to first frame")
+        previous = _STARTED
+        for phase, at in self._startup:
+            print(f"  {phase:<22}{(at - previous) * 1000:>8.0f} ms")
+            previous = at
+
+    def _reconcile(self, dt):
+        get_executor().submit(DBOps().reconcile, callback=self._reconciled)
+
+    def _reconciled(self, report):
+        if report["clients"]:
+            print(f"Reconciled {report['clients']} client totals")
+        # Reported, not repaired: either the stock or its ledger may be wrong
+        for item_id, name, quantity, ledger in report["stock_drift"]:
+            print(f"Warning: {name} (#{item_id}) has {quantity} in stock but {ledger} in the ledger")
+
+    def _snapshot_stock(self, dt):
+        get_executor().submit(
+            DBOps().take_stock_snapshots,
+            callback=lambda taken: taken and print(f"Stock snapshots taken for {taken} items"),
+        )
+
+    def _backup(self, dt):
+        from backup import backup_in_background, default_directory
+        from db import get_db_path
+        backup_in_background(
+            get_db_path(), default_directory(self.user_data_dir),
+            callback=lambda path: path and print(f"Backup written to {path}"),
+        )
+
+    def on_stop(self):
+        # Let queued DB work finish, then release the pooled connections
+        shutdown_executor()
+        close_all()
+
+    # Optional helpers for dialogs; see dialogs.py
     def popup(self, title, message):
-        from kivy.uix.popup import Popup
-        from kivy.uix.boxlayout import BoxLayout
-        from kivy.uix.label import Label
-        from kivy.uix.button import Button
-
-        content = BoxLayout(orientation='vertical', spacing=10)
-        content.add_widget(Label(text=message))
-        btn = Button(text="OK", size_hint_y=None, height=40)
-        content.add_widget(btn)
-        p = Popup(title=title, content=content, size_hint=(0.6, 0.4))
-        btn.bind(on_release=p.dismiss)
-        p.open()
-
-    def confirm(self, title, message):
-        from kivy.uix.popup import Popup
-        from kivy.uix.boxlayout import BoxLayout
-        from kivy.uix.label import Label
-        from kivy.uix.button import Button
-        result = {'confirmed': False}
-        content = BoxLayout(orientation='vertical', spacing=10)
-        content.add_widget(Label(text=message))
-        btn_layout = BoxLayout(size_hint_y=None, height=40, spacing=10)
-        yes_btn = Button(text="Yes")
-        no_btn = Button(text="No")
-        btn_layout.add_widget(yes_btn)
-        btn_layout.add_widget(no_btn)
-        content.add_widget(btn_layout)
-
-        popup_obj = Popup(title=title, content=content, size_hint=(0.6, 0.4))
-        yes_btn.bind(on_release=lambda x: (popup_obj.dismiss(), result.update({'confirmed': True})))
-        no_btn.bind(on_release=lambda x: popup_obj.dismiss())
-        popup_obj.open()
-
-        from kivy.clock import Clock
-        import time
-        while popup_obj._window:
-            time.sleep(0.05)
-        return result['confirmed']
+        from dialogs import show_message
+        return show_message(title, message)
+
+    def confirm(self, title, message, callback):
+        """Ask a yes/no question; callback(confirmed) runs when the user answers."""
+        from dialogs import confirm
+        return confirm(title, message, callback)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,587 @@
+import sqlite3
+
+# -----------------------------
+# Schema migrations
+# -----------------------------
+# Each migration upgrades the schema by one version and is recorded in
+# PRAGMA user_version, so existing databases are upgraded in place the next
+# time init_db() runs. Append new migrations to the end; never edit old ones.
+
+
+def _add_hot_path_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scoops_client_id ON scoops(client_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scoops_date ON scoops(date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scoop_items_scoop_id ON scoop_items(scoop_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scoop_items_item_id ON scoop_items(item_id)")
+
+    # Emails are compared case- and whitespace-insensitively; blanks are allowed
+    try:
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_email
+            ON clients(LOWER(TRIM(email)))
+            WHERE email IS NOT NULL AND TRIM(email) != ''
+        """)
+    except sqlite3.IntegrityError:
+        # Older databases may already hold duplicates; keep the lookup fast
+        # without refusing to open them.
+        print("Warning: duplicate client emails found, email index is not unique")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_clients_email
+            ON clients(LOWER(TRIM(email)))
+            WHERE email IS NOT NULL AND TRIM(email) != ''
+        """)
+
+
+def _add_search_indexes(cursor):
+    # Trigram FTS5 tables give indexed substring search. They use the base
+    # tables as external content, so triggers only keep the index in sync.
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+                name, contact_info, email,
+                content='clients', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                name,
+                content='items', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        # Some Android builds ship SQLite without FTS5 (or trigram, < 3.34);
+        # DBOps then keeps using LIKE searches.
+        print(f"Warning: full-text search unavailable ({e})")
+        return
+
+    for statement in _SEARCH_TRIGGERS:
+        cursor.execute(statement)
+
+    cursor.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+
+_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts(rowid, name, contact_info, email)
+        VALUES (new.id, new.name, new.contact_info, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name, contact_info, email)
+        VALUES ('delete', old.id, old.name, old.contact_info, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE OF name, contact_info, email ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name, contact_info, email)
+        VALUES ('delete', old.id, old.name, old.contact_info, old.email);
+        INSERT INTO clients_fts(rowid, name, contact_info, email)
+        VALUES (new.id, new.name, new.contact_info, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO items_fts(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+]
+
+
+def _add_daily_sales(cursor):
+    # Per-day totals kept up to date by DBOps.save_scoops, so the dashboard
+    # reads a handful of rows instead of scanning every scoop.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT PRIMARY KEY,
+            scoops INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_item_sales (
+            day TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            units INTEGER NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, item_id)
+        ) WITHOUT ROWID
+    """)
+    rebuild_daily_sales(cursor)
+
+
+def rebuild_daily_sales(cursor, days=None):
+    """
+    Recompute daily_sales and daily_item_sales from scoops and scoop_items,
+    or only the given days ("YYYY-MM-DD"). Cost of goods uses each item's
+    current cost_price, as the price at the time of sale is not stored.
+    """
+    if days is None:
+        # (condition on the summary tables, condition on scoops s, parameters of each)
+        scopes = [("1", "1", (), ())]
+    else:
+        # A date range rather than substr() so idx_scoops_date is used
+        scopes = [("day = ?", "s.date >= ? AND s.date < ?", (day,), (day, day + "~")) for day in days]
+    for day_where, scoop_where, day_params, scoop_params in scopes:
+        cursor.execute(f"DELETE FROM daily_sales WHERE {day_where}", day_params)
+        cursor.execute(f"DELETE FROM daily_item_sales WHERE {day_where}", day_params)
+        cursor.execute(f"""
+            INSERT INTO daily_item_sales (day, item_id, units, cost)
+            SELECT substr(s.date, 1, 10), si.item_id, SUM(si.quantity),
+                   SUM(si.quantity * COALESCE(i.cost_price, 0))
+            FROM scoop_items si
+            JOIN scoops s ON si.scoop_id = s.id
+            JOIN items i ON si.item_id = i.id
+            WHERE {scoop_where}
+            GROUP BY substr(s.date, 1, 10), si.item_id
+        """, scoop_params)
+        # Units and cost per day are the sums of the item rows just written
+        cursor.execute(f"""
+            INSERT INTO daily_sales (day, scoops, revenue, cost, units)
+            SELECT d.day, d.scoops, d.revenue,
+                   (SELECT COALESCE(SUM(cost), 0) FROM daily_item_sales WHERE day = d.day),
+                   (SELECT COALESCE(SUM(units), 0) FROM daily_item_sales WHERE day = d.day)
+            FROM (
+                SELECT substr(s.date, 1, 10) AS day, COUNT(*) AS scoops,
+                       COALESCE(SUM(s.total_price), 0) AS revenue
+                FROM scoops s
+                WHERE {scoop_where}
+                GROUP BY substr(s.date, 1, 10)
+            ) d
+        """, scoop_params)
+
+
+def _add_bookkeeping_triggers(cursor):
+    # clients.total_spent and items.quantity follow every write to scoops and
+    # scoop_items, whichever code path makes it.
+    for statement in _BOOKKEEPING_TRIGGERS:
+        cursor.execute(statement)
+
+    # Covering index so reconciliation sums total_spent without touching the
+    # table; it also serves every lookup idx_scoops_client_id did.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scoops_client_spent ON scoops(client_id, total_price)")
+    cursor.execute("DROP INDEX IF EXISTS idx_scoops_client_id")
+
+
+_BOOKKEEPING_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS scoops_spent_ai AFTER INSERT ON scoops BEGIN
+        UPDATE clients SET total_spent = total_spent + COALESCE(new.total_price, 0)
+        WHERE id = new.client_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoops_spent_ad AFTER DELETE ON scoops BEGIN
+        UPDATE clients SET total_spent = total_spent - COALESCE(old.total_price, 0)
+        WHERE id = old.client_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoops_spent_au AFTER UPDATE OF client_id, total_price ON scoops BEGIN
+        UPDATE clients SET total_spent = total_spent - COALESCE(old.total_price, 0)
+        WHERE id = old.client_id;
+        UPDATE clients SET total_spent = total_spent + COALESCE(new.total_price, 0)
+        WHERE id = new.client_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoop_items_stock_ai AFTER INSERT ON scoop_items BEGIN
+        UPDATE items SET quantity = quantity - new.quantity WHERE id = new.item_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoop_items_stock_ad AFTER DELETE ON scoop_items BEGIN
+        UPDATE items SET quantity = quantity + old.quantity WHERE id = old.item_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoop_items_stock_au AFTER UPDATE OF item_id, quantity ON scoop_items BEGIN
+        UPDATE items SET quantity = quantity + old.quantity WHERE id = old.item_id;
+        UPDATE items SET quantity = quantity - new.quantity WHERE id = new.item_id;
+    END
+    """,
+]
+
+
+def _add_stock_ledger(cursor):
+    # Append-only record of every stock change. Movement ids grow with time,
+    # so a snapshot at movement N plus the rows after it gives the stock at
+    # any later moment without replaying the whole history.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY,
+            item_id INTEGER NOT NULL,
+            at TEXT NOT NULL,
+            kind TEXT NOT NULL,          -- opening, restock, sale, adjustment
+            change INTEGER NOT NULL,
+            scoop_id INTEGER
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_item_at ON stock_movements(item_id, at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            item_id INTEGER NOT NULL,
+            movement_id INTEGER NOT NULL,    -- last movement included
+            at TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (item_id, movement_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_snapshots_item_at ON stock_snapshots(item_id, at)")
+
+    # Current stock becomes the opening balance of the ledger
+    cursor.execute(f"""
+        INSERT INTO stock_movements (item_id, at, kind, change)
+        SELECT id, {LOCAL_NOW}, 'opening', quantity FROM items
+    """)
+
+    for statement in _LEDGER_TRIGGERS:
+        cursor.execute(statement)
+
+
+# Same clock as db_ops.local_now_str() (Johannesburg, UTC+2)
+LOCAL_NOW = "datetime('now', '+2 hours')"
+
+_LEDGER_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_ledger_ai AFTER INSERT ON items BEGIN
+        INSERT INTO stock_movements (item_id, at, kind, change)
+        VALUES (new.id, {LOCAL_NOW}, 'opening', new.quantity);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoop_items_ledger_ai AFTER INSERT ON scoop_items BEGIN
+        INSERT INTO stock_movements (item_id, at, kind, change, scoop_id)
+        VALUES (new.item_id, (SELECT date FROM scoops WHERE id = new.scoop_id), 'sale', -new.quantity, new.scoop_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS scoop_items_ledger_ad AFTER DELETE ON scoop_items BEGIN
+        INSERT INTO stock_movements (item_id, at, kind, change, scoop_id)
+        VALUES (old.item_id, {LOCAL_NOW}, 'adjustment', old.quantity, old.scoop_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS scoop_items_ledger_au AFTER UPDATE OF item_id, quantity ON scoop_items BEGIN
+        INSERT INTO stock_movements (item_id, at, kind, change, scoop_id)
+        VALUES (old.item_id, {LOCAL_NOW}, 'adjustment', old.quantity, old.scoop_id);
+        INSERT INTO stock_movements (item_id, at, kind, change, scoop_id)
+        VALUES (new.item_id, {LOCAL_NOW}, 'adjustment', -new.quantity, new.scoop_id);
+    END
+    """,
+]
+
+
+def _add_pick_stats(cursor):
+    # Per-client and per-item purchase counts with the latest purchase time,
+    # so the New Scoop pickers can rank matches by frequency and recency
+    # without aggregating the order history on every search.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS client_stats (
+            client_id INTEGER PRIMARY KEY,
+            scoops INTEGER NOT NULL DEFAULT 0,
+            last_at TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS item_stats (
+            item_id INTEGER PRIMARY KEY,
+            picks INTEGER NOT NULL DEFAULT 0,    -- scoop lines
+            units INTEGER NOT NULL DEFAULT 0,
+            last_at TEXT
+        )
+    """)
+    rebuild_pick_stats(cursor)
+
+    for statement in _PICK_STATS_TRIGGERS:
+        cursor.execute(statement)
+
+
+def rebuild_pick_stats(cursor):
+    """Recompute client_stats and item_stats from the order history."""
+    cursor.execute("DELETE FROM client_stats")
+    cursor.execute("DELETE FROM item_stats")
+    cursor.execute("""
+        INSERT INTO client_stats (client_id, scoops, last_at)
+        SELECT client_id, COUNT(*), MAX(date) FROM scoops GROUP BY client_id
+    """)
+    cursor.execute("""
+        INSERT INTO item_stats (item_id, picks, units, last_at)
+        SELECT si.item_id, COUNT(*), SUM(si.quantity), MAX(s.date)
+        FROM scoop_items si
+        JOIN scoops s ON s.id = si.scoop_id
+        GROUP BY si.item_id
+    """)
+
+
+# Deletes and edits of past orders are rare, so those triggers simply
+# recount the affected client or item instead of adjusting in place.
+_CLIENT_RECOUNT = """
+    UPDATE client_stats SET
+        scoops = (SELECT COUNT(*) FROM scoops WHERE client_id = client_stats.client_id),
+        last_at = (SELECT MAX(date) FROM scoops WHERE client_id = client_stats.client_id)
+    WHERE client_id IN ({ids});
+"""
+_ITEM_RECOUNT = """
+    UPDATE item_stats SET
+        picks = (SELECT COUNT(*) FROM scoop_items WHERE item_id = item_stats.item_id),
+        units = (SELECT COALESCE(SUM(quantity), 0) FROM scoop_items WHERE item_id = item_stats.item_id),
+        last_at = (
+            SELECT MAX(s.date) FROM scoop_items si JOIN scoops s ON s.id = si.scoop_id
+            WHERE si.item_id = item_stats.item_id
+        )
+    WHERE item_id IN ({ids});
+"""
+
+_PICK_STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS scoops_stats_ai AFTER INSERT ON scoops BEGIN
+        INSERT INTO client_stats (client_id, scoops, last_at) VALUES (new.client_id, 1, new.date)
+        ON CONFLICT(client_id) DO UPDATE SET
+            scoops = scoops + 1,
+            last_at = MAX(COALESCE(last_at, ''), excluded.last_at);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS scoops_stats_ad AFTER DELETE ON scoops BEGIN
+        {_CLIENT_RECOUNT.format(ids="old.client_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS scoops_stats_au AFTER UPDATE OF client_id, date ON scoops BEGIN
+        INSERT OR IGNORE INTO client_stats (client_id) VALUES (new.client_id);
+        {_CLIENT_RECOUNT.format(ids="old.client_id, new.client_id")}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS scoop_items_stats_ai AFTER INSERT ON scoop_items BEGIN
+        INSERT INTO item_stats (item_id, picks, units, last_at)
+        VALUES (new.item_id, 1, new.quantity, (SELECT date FROM scoops WHERE id = new.scoop_id))
+        ON CONFLICT(item_id) DO UPDATE SET
+            picks = picks + 1,
+            units = units + excluded.units,
+            last_at = MAX(COALESCE(last_at, ''), COALESCE(excluded.last_at, ''));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS scoop_items_stats_ad AFTER DELETE ON scoop_items BEGIN
+        {_ITEM_RECOUNT.format(ids="old.item_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS scoop_items_stats_au AFTER UPDATE OF item_id, quantity ON scoop_items BEGIN
+        INSERT OR IGNORE INTO item_stats (item_id) VALUES (new.item_id);
+        {_ITEM_RECOUNT.format(ids="old.item_id, new.item_id")}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clients_stats_ad AFTER DELETE ON clients BEGIN
+        DELETE FROM client_stats WHERE client_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_stats_ad AFTER DELETE ON items BEGIN
+        DELETE FROM item_stats WHERE item_id = old.id;
+    END
+    """,
+]
+
+
+def _add_sync_tracking(cursor):
+    # Change tracking for sync between devices (see sync.py). Every synced
+    # row gets a global id, the time and device of its last change and the
+    # value of a per-database change counter, so "everything changed since
+    # N" is an index range whatever the size of the database.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            device_id TEXT NOT NULL,
+            seq INTEGER NOT NULL DEFAULT 0      -- last change number handed out
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO sync_state (id, device_id, seq)
+        VALUES (1, lower(hex(randomblob(16))), 1)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_tombstones (
+            gid TEXT PRIMARY KEY,
+            tbl TEXT NOT NULL,
+            deleted_at TEXT NOT NULL,
+            deleted_by TEXT NOT NULL,
+            seq INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_tombstones_seq ON sync_tombstones(seq)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            device_id TEXT PRIMARY KEY,
+            received_seq INTEGER NOT NULL DEFAULT 0,    -- their changes applied here
+            acked_seq INTEGER NOT NULL DEFAULT 0,       -- our changes they have applied
+            synced_at TEXT
+        )
+    """)
+    # Clients registered on two devices with the same email become one row;
+    # the other device's gid is kept here and resolves to it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_aliases (
+            gid TEXT PRIMARY KEY,
+            tbl TEXT NOT NULL,
+            target_gid TEXT NOT NULL
+        )
+    """)
+
+    for table in SYNC_TABLES:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN gid TEXT")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TEXT")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_by TEXT")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        # Existing rows count as change 1, so a first sync sends everything
+        cursor.execute(f"""
+            UPDATE {table} SET
+                gid = lower(hex(randomblob(16))),
+                updated_at = {UTC_NOW},
+                updated_by = {DEVICE_ID},
+                seq = 1
+        """)
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_gid ON {table}(gid)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_seq ON {table}(seq)")
+
+    # Stock changes not tied to an order (opening stock, restocks, counts)
+    # are synced as append-only rows; sales follow from the synced scoop lines
+    cursor.execute("ALTER TABLE stock_movements ADD COLUMN gid TEXT")
+    cursor.execute("ALTER TABLE stock_movements ADD COLUMN updated_by TEXT")
+    cursor.execute("ALTER TABLE stock_movements ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+    cursor.execute(f"""
+        UPDATE stock_movements SET gid = lower(hex(randomblob(16))), updated_by = {DEVICE_ID}, seq = 1
+        WHERE scoop_id IS NULL AND change != 0
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_stock_movements_gid ON stock_movements(gid)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_seq ON stock_movements(seq)")
+
+    for statement in _sync_triggers():
+        cursor.execute(statement)
+
+
+# Synced tables and the columns whose changes are sent; total_spent and
+# quantity are derived from the synced rows by the bookkeeping triggers
+SYNC_TABLES = {
+    "clients": ("name", "contact_info", "email"),
+    "items": ("name", "cost_price", "selling_price"),
+    "scoops": ("client_id", "date", "total_price", "video_url"),
+    "scoop_items": ("scoop_id", "item_id", "quantity"),
+}
+
+# UTC with milliseconds, so timestamps from different devices compare
+UTC_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+DEVICE_ID = "(SELECT device_id FROM sync_state WHERE id = 1)"
+_NEXT_SEQ = "UPDATE sync_state SET seq = seq + 1 WHERE id = 1;"
+_SEQ = "(SELECT seq FROM sync_state WHERE id = 1)"
+
+
+def _sync_triggers():
+    # Rows written by the sync engine carry their gid and seq already, which
+    # the WHEN clauses use to tell them from local changes. Screens save
+    # every field at once, so updates only count when a value differs.
+    statements = []
+    for table, columns in SYNC_TABLES.items():
+        statements += [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table}
+            WHEN new.gid IS NULL BEGIN
+                {_NEXT_SEQ}
+                UPDATE {table} SET
+                    gid = lower(hex(randomblob(16))), updated_at = {UTC_NOW},
+                    updated_by = {DEVICE_ID}, seq = {_SEQ}
+                WHERE id = new.id;
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE OF {", ".join(columns)} ON {table}
+            WHEN new.seq IS old.seq AND ({" OR ".join(f"new.{c} IS NOT old.{c}" for c in columns)}) BEGIN
+                {_NEXT_SEQ}
+                UPDATE {table} SET updated_at = {UTC_NOW}, updated_by = {DEVICE_ID}, seq = {_SEQ}
+                WHERE id = new.id;
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table}
+            WHEN old.gid IS NOT NULL BEGIN
+                {_NEXT_SEQ}
+                INSERT OR REPLACE INTO sync_tombstones (gid, tbl, deleted_at, deleted_by, seq)
+                VALUES (old.gid, '{table}', {UTC_NOW}, {DEVICE_ID}, {_SEQ});
+            END
+            """,
+        ]
+    statements.append(f"""
+        CREATE TRIGGER IF NOT EXISTS stock_movements_sync_ai AFTER INSERT ON stock_movements
+        WHEN new.gid IS NULL AND new.scoop_id IS NULL AND new.change != 0 BEGIN
+            {_NEXT_SEQ}
+            UPDATE stock_movements SET
+                gid = lower(hex(randomblob(16))), updated_by = {DEVICE_ID}, seq = {_SEQ}
+            WHERE id = new.id;
+        END
+    """)
+    return statements
+
+
+def _snapshot_by_movement_id(cursor):
+    # Movement timestamps are not in id order (clock corrections, rows from
+    # other devices), and snapshots that skipped older-stamped movements
+    # are wrong. Snapshots now follow ids alone and record the id range
+    # they added and its earliest time, so stock_at can tell which later
+    # ranges hold movements it must count. The old ones are dropped; the
+    # next snapshot starts from the full ledger.
+    cursor.execute("DELETE FROM stock_snapshots")
+    cursor.execute("ALTER TABLE stock_snapshots ADD COLUMN from_id INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE stock_snapshots ADD COLUMN first_at TEXT NOT NULL DEFAULT ''")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_item_id ON stock_movements(item_id, id)")
+
+
+MIGRATIONS = [
+    _add_hot_path_indexes,        # 1
+    _add_search_indexes,          # 2
+    _add_daily_sales,             # 3
+    _add_bookkeeping_triggers,    # 4
+    _add_stock_ledger,            # 5
+    _add_pick_stats,              # 6
+    _add_sync_tracking,           # 7
+    _snapshot_by_movement_id,     # 8
+]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply every pending migration, one transaction per version."""
+    version = get_version(conn)
+    for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            step(cursor)
+            # PRAGMA cannot take parameters; target is always an int we control
+            cursor.execute(f"PRAGMA user_version = {target}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        print(f"Database migrated to version {target}")
+    return get_version(conn)
@@ -2,7 +2,9 @@ from kivy.uix.screenmanager import Screen
 from kivy.properties import ObjectProperty, ListProperty
 from kivy.app import App
 from kivy.lang import Builder
-from db_ops import DBOps
+from db_ops import DBOps, InsufficientStockError, PICK_LIMIT
+from db_executor import AsyncDBOps
+from search_controller import SearchController, text_matcher
 import sqlite3
 
 # Load KV file
@@ -11,24 +13,19 @@ Builder.load_file("new_scoop_screen.kv")
 
 # ---------- Scoop Item Row ----------
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.properties import NumericProperty, StringProperty
 
-class ScoopItemRow(BoxLayout):
-    def __init__(self, name, quantity, index=0, **kwargs):
-        super().__init__(orientation="horizontal", size_hint_y=None, height=40, spacing=5, **kwargs)
-        bg_color = (0.9, 0.9, 0.95, 1) if index % 2 == 0 else (0.85, 0.85, 0.9, 1)
-        with self.canvas.before:
-            from kivy.graphics import Color, Rectangle
-            Color(*bg_color)
-            self.rect = Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_rect, size=self.update_rect)
+class ScoopItemRow(RecycleDataViewBehavior, BoxLayout):
+    """Recycled scoop line row (layout in new_scoop_screen.kv)."""
+    index = NumericProperty(0)
+    item_name = StringProperty("")
+    quantity = StringProperty("")
 
-        self.add_widget(Label(text=name, size_hint_x=0.7, color=(0,0,0,1)))
-        self.add_widget(Label(text=str(quantity), size_hint_x=0.3, color=(0,0,0,1)))
-
-    def update_rect(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
+    def refresh_view_attrs(self, rv, index, data):
+        # index drives the alternating row colour
+        self.index = index
+        return super().refresh_view_attrs(rv, index, data)
 
 
 # ---------- New Scoop Screen ----------
@@ -44,72 +41,125 @@ class NewScoopScreen(Screen):
     clients = ListProperty([])
     items = ListProperty([])
     current_scoop_items = ListProperty([])
-    selected_client_id = None
+    client_labels = {}      # Spinner label -> client row
+    item_labels = {}        # Spinner label -> item row
+    selected_client = None  # Row of the picked client, kept across searches
+    selected_item = None    # Row of the picked item
+    saving = False
 
     def on_pre_enter(self):
         """Bind search inputs and refresh data."""
         if not hasattr(self, 'db'):
             self.db = DBOps()
-        self.client_search.bind(text=self.client_search_changed)
-        self.item_search.bind(text=self.item_search_changed)
+            self.db_async = AsyncDBOps(self.db)
+            # Same keys as refresh_*: whichever request is newer wins
+            self.client_searcher = SearchController(
+                lambda term: self._fetch(self.db.pick_clients, term),
+                lambda term, rows: self._show_clients(rows),
+                matches=text_matcher(1, 2, 3),
+                key="newscoop_clients",
+                page_size=PICK_LIMIT,
+            )
+            self.item_searcher = SearchController(
+                lambda term: self._fetch(self.db.pick_items, term),
+                lambda term, rows: self._show_items(rows),
+                matches=text_matcher(1),
+                key="newscoop_items",
+                page_size=PICK_LIMIT,
+            )
+            # Bind once; binding on every visit stacked duplicate handlers
+            self.client_search.bind(text=self.client_search_changed)
+            self.item_search.bind(text=self.item_search_changed)
+            self.client_dropdown.bind(text=self.client_picked)
+            self.item_dropdown.bind(text=self.item_picked)
         self.refresh_clients()
         self.refresh_items()
         self.refresh_table()
 
-    # ---------- Client ----------
-    def refresh_clients(self, search_term=""):
+    def _fetch(self, fetch, search_term):
+        """Runs on the DB worker thread."""
         try:
-            self.clients = self.db.fetch_clients(search_term)
+            return fetch(search_term)
         except sqlite3.OperationalError as e:
             if "no such table" in str(e):
                 from db import init_db
                 init_db()  # create tables
-                self.clients = self.db.fetch_clients(search_term)
-            else:
-                raise
-        self.client_dropdown.values = [f"{c[1]} (ID:{c[0]})" for c in self.clients]
+                return fetch(search_term)
+            raise
+
+    # ---------- Client ----------
+    def refresh_clients(self, search_term=""):
+        self.client_searcher.cancel()
+        self.client_searcher.invalidate()
+        self.db_async.run(
+            self._fetch, self.db.pick_clients, search_term,
+            callback=self._show_clients, key="newscoop_clients"
+        )
+
+    def _show_clients(self, clients):
+        """Top matches, most likely first; labels map back to the rows."""
+        self.clients = clients
+        self.client_labels = {f"{c[1]} (ID:{c[0]})": c for c in clients}
+        self.client_dropdown.values = list(self.client_labels)
+
+    def client_picked(self, spinner, label):
+        if label in self.client_labels:
+            self.selected_client = self.client_labels[label]
+        elif not label:
+            self.selected_client = None
 
     def client_search_changed(self, instance, value):
-        self.refresh_clients(value.strip())
+        self.client_searcher.on_text(value.strip())
 
     # ---------- Items ----------
     def refresh_items(self, search_term=""):
-        try:
-            self.items = self.db.fetch_items(search_term)
-        except sqlite3.OperationalError as e:
-            if "no such table" in str(e):
-                from db import init_db
-                init_db()  # create tables
-                self.items = self.db.fetch_items(search_term)
-            else:
-                raise
-        self.item_dropdown.values = [f"{i[1]} (Stock:{i[2]})" for i in self.items]
+        self.item_searcher.cancel()
+        self.item_searcher.invalidate()
+        self.db_async.run(
+            self._fetch, self.db.pick_items, search_term,
+            callback=self._show_items, key="newscoop_items"
+        )
+
+    def _show_items(self, items):
+        self.items = items
+        labels = {}
+        for item in items:
+            label = f"{item[1]} (Stock:{item[2]})"
+            if label in labels:
+                # Two items with the same name and stock: tell them apart by id
+                label = f"{item[1]} (Stock:{item[2]}, ID:{item[0]})"
+            labels[label] = item
+        self.item_labels = labels
+        self.item_dropdown.values = list(labels)
+
+    def item_picked(self, spinner, label):
+        if label in self.item_labels:
+            self.selected_item = self.item_labels[label]
+        elif not label:
+            self.selected_item = None
 
     def item_search_changed(self, instance, value):
-        self.refresh_items(value.strip())
+        self.item_searcher.on_text(value.strip())
 
     # ---------- Table ----------
     def refresh_table(self):
         if not self.scoop_items_container:
             return
-        self.scoop_items_container.clear_widgets()
-        for idx, item in enumerate(self.current_scoop_items):
-            row = ScoopItemRow(item["name"], item["quantity"], index=idx)
-            self.scoop_items_container.add_widget(row)
+        self.scoop_items_container.data = [
+            {"item_name": item["name"], "quantity": str(item["quantity"])}
+            for item in self.current_scoop_items
+        ]
 
     def add_item_to_scoop(self):
-        item_name = self.item_dropdown.text
+        item_data = self.selected_item
         qty_text = self.quantity_input.text.strip()
-        if not item_name or not qty_text.isdigit() or int(qty_text) < 1:
+        if not item_data or not qty_text.isdigit() or int(qty_text) < 1:
             App.get_running_app().popup("Error", "Select an item and enter a valid quantity!")
             return
 
         qty = int(qty_text)
-        item_data = next((i for i in self.items if f"{i[1]} (Stock:{i[2]})" == item_name), None)
-        if not item_data:
-            App.get_running_app().popup("Error", "Selected item not found!")
-            return
-        if qty > item_data[2]:
+        already = sum(i["quantity"] for i in self.current_scoop_items if i["item_id"] == item_data[0])
+        if qty + already > item_data[2]:
             App.get_running_app().popup("Error", f"Not enough stock for {item_data[1]}! Only {item_data[2]} available.")
             return
 
@@ -126,14 +176,16 @@ class NewScoopScreen(Screen):
             self.refresh_table()
 
     def remove_last_item(self):
-        if self.scoop_items_container.children:
-            self.remove_item_from_scoop(len(self.scoop_items_container.children)-1)
+        if self.current_scoop_items:
+            self.remove_item_from_scoop(len(self.current_scoop_items) - 1)
 
 
     # ---------- Finalize Scoop ----------
     def finalize_scoop(self):
-        client_text = self.client_dropdown.text
-        if not client_text:
+        if self.saving:
+            return  # previous save still running
+        client = self.selected_client
+        if not client:
             App.get_running_app().popup("Error", "Select a client!")
             return
         if not self.current_scoop_items:
@@ -145,9 +197,25 @@ class NewScoopScreen(Screen):
             App.get_running_app().popup("Error", "Enter a valid price!")
             return
 
-        client_id = int(client_text.split("ID:")[1].strip(")"))
-        self.db.save_scoop(client_id, price, self.current_scoop_items)
-        App.get_running_app().popup("Success", f"Scoop for {client_text.split(' (')[0]} saved!")
+        self.saving = True
+        self.db_async.save_scoop(
+            client[0], price, list(self.current_scoop_items),
+            callback=lambda _: self._scoop_saved(client[1]),
+            on_error=self._scoop_failed
+        )
+
+    def _scoop_failed(self, error):
+        self.saving = False
+        if isinstance(error, InsufficientStockError):
+            # Someone else sold the stock in the meantime; show current levels
+            self.refresh_items()
+            App.get_running_app().popup("Error", str(error))
+            return
+        App.get_running_app().popup("Error", f"Could not save scoop: {error}")
+
+    def _scoop_saved(self, client_name):
+        self.saving = False
+        App.get_running_app().popup("Success", f"Scoop for {client_name} saved!")
 
         # Reset
         self.current_scoop_items.clear()
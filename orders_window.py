@@ -1,18 +1,24 @@
 from kivy.uix.screenmanager import Screen
-from kivy.properties import ListProperty, StringProperty, ObjectProperty
-from kivy.clock import mainthread
+from kivy.properties import NumericProperty, StringProperty, ObjectProperty
 from kivy.lang import Builder
 import os
 import sqlite3
 import sys
 
-from db_ops import DBOps
+from db_ops import DBOps, PAGE_SIZE
+from db_executor import AsyncDBOps, INVOICE_WORKER, get_executor
+from search_controller import SearchController, text_matcher
+from widgets import scrolled_near_end
 from invoice_generator import generate_invoice
 
 # Custom Button for list items
 from kivy.uix.button import Button
 
 def get_invoice_path(scoop_id):
+    """
+    Where the invoice for scoop_id is saved for the user (Downloads).
+    The rendered PDF comes from the invoice cache inside generate_invoice.
+    """
     ANDROID = False
     downloads = os.path.expanduser("~/Downloads")  # default desktop path
 
@@ -32,7 +38,13 @@ def get_invoice_path(scoop_id):
     return os.path.join(downloads, f"invoice_{scoop_id}.pdf"), ANDROID
 
 class OrderLabel(Button):
+    """One order row; the label text is formatted in orders_screen.kv."""
     parent_screen = ObjectProperty()
+    scoop_id = NumericProperty(0)
+    client_id = NumericProperty(0)
+    client = StringProperty("")
+    date = StringProperty("")
+    total = NumericProperty(0)
 
 # Load KV file
 Builder.load_file("orders_screen.kv")
@@ -40,63 +52,205 @@ Builder.load_file("orders_screen.kv")
 
 class OrdersScreen(Screen):
     search_term = StringProperty("")
-    orders_display = ListProperty([])   # Display strings
-    orders_raw = []                     # Raw tuples from DB
-    selected_order = None               # Selected order string
+    selected_id = NumericProperty(0)    # Scoop id of the selected order (0 = none)
+    loaded = False                      # The list holds the first page(s) for search_term
+    has_more = False                    # More pages left to load
+    loading = False                     # A page request is in flight
+    invoice_queue = None                # Scoop ids queued for invoicing, rendering first
 
     def on_pre_enter(self):
-        """Refresh clients whenever screen is opened."""
+        """Show orders saved since the last visit, or load the list the first time."""
         if not hasattr(self, 'db'):
             self.db = DBOps()  # safe lazy init
-        self.refresh_orders()
+            self.db_async = AsyncDBOps(self.db)
+            self.matches = text_matcher(1)
+            self.search = SearchController(
+                lambda term: self._fetch_page(term, None),
+                self._show_search_results,
+                matches=self.matches,
+                key="orders_search",
+                page_size=PAGE_SIZE,
+            )
+            self.invoice_queue = []
+        if self.loaded and self.orders:
+            self.update_orders()
+        else:
+            self.refresh_orders(self.search_term)
+
+    @property
+    def orders(self):
+        """The RecycleView rows: dicts with scoop_id, client_id, client, date and total."""
+        return self.ids.rv_orders.data
+
+    def _order_row(self, order):
+        scoop_id, client, date, total, client_id = order
+        return {
+            "scoop_id": scoop_id,
+            "client_id": client_id,
+            "client": client,
+            "date": date,
+            "total": total or 0,
+            "parent_screen": self,
+        }
 
     # ---------- Refresh Orders ----------
     def refresh_orders(self, search=""):
+        """Reset the list and load the first page of matching orders."""
+        # Data may have changed, so cached search results are stale
+        self.search.cancel()
+        self.search.invalidate()
+        self._reset_list(search)
+        self.load_more_orders()
+
+    def _reset_list(self, search):
+        # A page still loading belongs to the previous term
+        self.db_async.executor.cancel("orders_page")
+        self.db_async.executor.cancel("orders_update")
+        self.search_term = search
+        self.ids.rv_orders.data = []
+        self.loaded = False
+        self.has_more = True
+        self.loading = False
+
+    def load_more_orders(self):
+        """Request the next (older) page of orders in the background."""
+        if not self.has_more or self.loading:
+            return
+        self.loading = True
+        last = self.orders[-1] if self.orders else None
+        before = (last["date"], last["scoop_id"]) if last else None
+        self.db_async.run(
+            self._fetch_page, self.search_term, before,
+            callback=self._append_page, key="orders_page"
+        )
+
+    def _fetch_page(self, search_term, before):
+        """Runs on the DB worker thread."""
         try:
-            self.orders_raw = self.db.fetch_orders(search)
+            return self.db.fetch_orders_page(search_term, before)
         except sqlite3.OperationalError as e:
             if "no such table" in str(e):
                 from db import init_db
                 init_db()  # create tables
-                self.orders_raw = self.db.fetch_orders(search)
-            else:
-                raise
+                return self.db.fetch_orders_page(search_term, before)
+            raise
+
+    def _append_page(self, page):
+        """Append a fetched page to the list (main thread)."""
+        self.loading = False
+        self.loaded = True
+        self.has_more = len(page) == PAGE_SIZE
+        self.orders.extend(self._order_row(order) for order in page)
+
+    # ---------- Incremental Update ----------
+    def update_orders(self):
+        """
+        Fetch only what changed since the list was loaded: orders newer than
+        the top row, and the current names of the clients on screen.
+        """
+        newest = self.orders[0]
+        client_ids = {row["client_id"] for row in self.orders}
+        self.db_async.run(
+            self._fetch_updates, (newest["date"], newest["scoop_id"]), client_ids,
+            callback=self._apply_updates, key="orders_update"
+        )
+
+    def _fetch_updates(self, after, client_ids):
+        """Runs on the DB worker thread."""
+        return self.db.fetch_orders_since(after, PAGE_SIZE), self.db.fetch_client_names(client_ids)
 
-        self.orders_display = [
-            f"ID: {o[0]} | Client: {o[1]} | Date: {o[2]} | Total: R{o[3]:.2f}"
-            for o in self.orders_raw
-        ]
+    def _apply_updates(self, updates):
+        new_orders, names = updates
+        if len(new_orders) == PAGE_SIZE:
+            # Too much happened since the last visit; start from the top again
+            self.refresh_orders(self.search_term)
+            return
+        if self.search_term:
+            new_orders = [o for o in new_orders if self.matches(o, self.search_term)]
+
+        data = self.orders
+        # Patch rows whose client was renamed in the meantime
+        for index, row in enumerate(data):
+            name = names.get(row["client_id"], row["client"])
+            if name != row["client"]:
+                data[index] = dict(row, client=name)
+        if new_orders:
+            # Assign a new list: RecycleView does not track slice inserts
+            # (data[0:0] = ...) and fails its next layout pass
+            self.ids.rv_orders.data = [self._order_row(order) for order in new_orders] + list(data)
+            self.search.invalidate()
+
+    def on_orders_scroll(self, view):
+        """Load the next page once the user scrolls near the end of the list."""
+        if self.has_more and scrolled_near_end(view):
+            self.load_more_orders()
 
     # Called from KV when typing in search box
     def on_search_changed(self, instance, value):
-        self.refresh_orders(value.strip())
+        self.search.on_text(value.strip())
+
+    def _show_search_results(self, search, page):
+        self._reset_list(search)
+        self._append_page(page)
 
     # ---------- Select Order ----------
-    def select_order(self, text):
-        self.selected_order = text
+    def select_order(self, scoop_id, text):
+        self.selected_id = scoop_id
         self.ids.status_label.text = f"Selected: {text}"
 
     # ---------- Generate Invoice ----------
-    @mainthread
     def generate_invoice_action(self):
-        if not self.selected_order:
+        """Queue an invoice for the selected order; rendering runs on the invoice worker."""
+        if not self.selected_id:
             self.ids.status_label.text = "Please select an order first."
             return
 
-        try:
-            scoop_id = int(self.selected_order.split("ID: ")[1].split(" ")[0])
-            filepath, ANDROID = get_invoice_path(scoop_id)
-            generate_invoice(scoop_id, filepath)
-
-            if os.path.exists(filepath):
-                if not ANDROID:  # desktop
-                    if os.name == "nt":
-                        os.startfile(filepath)
-                    else:
-                        os.system(f"open '{filepath}'")
-                self.ids.status_label.text = f"Invoice generated: {filepath}"
+        scoop_id = self.selected_id
+        if scoop_id in self.invoice_queue:
+            self.ids.status_label.text = f"Invoice #{scoop_id} is already queued."
+            return
+
+        self.invoice_queue.append(scoop_id)
+        get_executor(INVOICE_WORKER).submit(
+            self._make_invoice, scoop_id,
+            callback=lambda filepath: self._invoice_finished(scoop_id, filepath),
+            on_error=lambda e: self._invoice_finished(scoop_id, None, e),
+        )
+        self._show_invoice_status()
+
+    def _make_invoice(self, scoop_id):
+        """Runs on the invoice worker thread; returns the PDF path or None."""
+        filepath, ANDROID = get_invoice_path(scoop_id)
+        generate_invoice(scoop_id, filepath, db=self.db)
+
+        if not os.path.exists(filepath):
+            return None
+        if not ANDROID:  # desktop
+            if os.name == "nt":
+                os.startfile(filepath)
             else:
-                self.ids.status_label.text = "Failed to generate invoice."
+                os.system(f"open '{filepath}'")
+        return filepath
+
+    def _invoice_finished(self, scoop_id, filepath, error=None):
+        """The only update sent back to the main thread, once per invoice."""
+        self.invoice_queue.remove(scoop_id)
+        if error is not None:
+            result = f"Error: {error}"
+        elif filepath:
+            result = f"Invoice generated: {filepath}"
+        else:
+            result = "Failed to generate invoice."
+        self._show_invoice_status(result)
 
-        except Exception as e:
-            self.ids.status_label.text = f"Error: {e}"
+    def _show_invoice_status(self, result=None):
+        """
+        The worker handles jobs in order, so the head of invoice_queue is the
+        one rendering and the rest are waiting; no progress messages needed.
+        """
+        parts = [result] if result else []
+        if self.invoice_queue:
+            rendering, waiting = self.invoice_queue[0], len(self.invoice_queue) - 1
+            parts.append(f"Rendering invoice #{rendering}"
+                         + (f", {waiting} queued" if waiting else "") + "...")
+        self.ids.status_label.text = " | ".join(parts)
@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+
+MAX_SEARCHES = 64       # cached search/page results per table (LRU)
+MAX_ROWS = 20000        # cached rows per table before unreferenced ones are pruned
+
+
+class RowCache:
+    """
+    Read-through cache for one table.
+
+    Rows are held once, keyed by id. Each cached query result (a full
+    fetch, a search or a page) only stores the list of ids it returned, so
+    patching a row after a write updates every cached result that contains
+    it. Results are evicted least-recently-used beyond max_searches.
+
+    Every change bumps a generation counter. A reader records the
+    generation before querying and put() refuses the result if a write
+    landed in between, so a slow read can never re-cache stale rows.
+
+    Writes from other processes (the bulk_io, sync and backup command
+    lines) never reach this object, so the cache also remembers the
+    database version its contents match: check_version() empties it when
+    the version has moved, and patch() carries it along over writes made
+    here.
+    """
+
+    def __init__(self, max_searches=MAX_SEARCHES, max_rows=MAX_ROWS):
+        self.max_searches = max_searches
+        self.max_rows = max_rows
+        self.rows = {}
+        self.searches = OrderedDict()
+        self.generation = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    # ---------- Reads ----------
+    def get(self, key):
+        with self._lock:
+            ids = self.searches.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self.searches.move_to_end(key)
+            self.hits += 1
+            return [self.rows[i] for i in ids]
+
+    def put(self, key, rows, generation):
+        with self._lock:
+            if generation != self.generation:
+                return  # a write happened while the query ran
+            for row in rows:
+                self.rows[row[0]] = row
+            self.searches[key] = [row[0] for row in rows]
+            self.searches.move_to_end(key)
+            while len(self.searches) > self.max_searches:
+                self.searches.popitem(last=False)
+            if len(self.rows) > self.max_rows:
+                self._prune_rows()
+
+    def check_version(self, version):
+        """Empty the cache if the database changed since its contents were read."""
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self.generation += 1
+                    self.searches.clear()
+                    self.rows.clear()
+                self.version = version
+
+    # ---------- Writes ----------
+    def patch(self, rows, versions=None):
+        """
+        Replace cached copies of rows whose searchable text did not change.
+        versions is the (before, after) database version of the write; if
+        the cache was not at `before`, something else wrote too and it is
+        emptied instead.
+        """
+        with self._lock:
+            self.generation += 1
+            if versions is not None:
+                before, after = versions
+                if before != self.version:
+                    self.searches.clear()
+                    self.rows.clear()
+                    return
+                self.version = after
+            for row in rows:
+                if row[0] in self.rows:
+                    self.rows[row[0]] = row
+
+    def invalidate_searches(self):
+        """Drop cached results (row membership may have changed); keep rows."""
+        with self._lock:
+            self.generation += 1
+            self.searches.clear()
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.searches.clear()
+            self.rows.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "searches": len(self.searches),
+                "rows": len(self.rows),
+            }
+
+    def _prune_rows(self):
+        referenced = set()
+        for ids in self.searches.values():
+            referenced.update(ids)
+        self.rows = {i: row for i, row in self.rows.items() if i in referenced}
+
+
+# -----------------------------
+# Shared caches per database file
+# -----------------------------
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(db_path, table):
+    with _caches_lock:
+        cache = _caches.get((db_path, table))
+        if cache is None:
+            cache = RowCache()
+            _caches[(db_path, table)] = cache
+        return cache
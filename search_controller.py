@@ -0,0 +1,122 @@
+import time
+from collections import deque
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+from db_executor import get_executor
+
+DEBOUNCE_SECONDS = 0.25
+
+
+def text_matcher(*columns):
+    """Build an in-memory matcher doing the same case-insensitive substring
+    test as the SQL search over the given row columns."""
+    def matches(row, term):
+        term = term.lower()
+        return any(term in (row[c] or "").lower() for c in columns)
+    return matches
+
+
+class SearchController:
+    """
+    Debounced, cancellable search-as-you-type for one search box.
+
+    Screens call on_text() from their on_text handlers. The query only runs
+    once typing pauses for `delay` seconds, it runs on the DB executor, and
+    results of superseded queries are dropped. When the new term extends
+    the previous one and the previous result set was complete (shorter than
+    page_size), the previous rows are filtered in memory instead of going
+    back to SQLite.
+
+    fetch(term) runs on the worker thread and returns rows;
+    on_results(term, rows) runs on the main thread.
+    """
+
+    def __init__(self, fetch, on_results, matches, key, page_size=None, delay=DEBOUNCE_SECONDS):
+        self.fetch = fetch
+        self.on_results = on_results
+        self.matches = matches
+        self.key = key
+        self.page_size = page_size
+        self.executor = get_executor()
+        self._trigger = Clock.create_trigger(self._run, delay)
+        self._pending = None
+        self._typed_at = None
+        self._last_term = None
+        self._last_rows = None
+
+        # Stats
+        self.keystrokes = 0
+        self.queries = 0
+        self.reused = 0
+        self.latencies = deque(maxlen=200)
+
+    def on_text(self, term):
+        """Called for every keystroke."""
+        self.keystrokes += 1
+        self._pending = term
+        self._typed_at = time.perf_counter()
+        # Restart the debounce window
+        self._trigger.cancel()
+        self._trigger()
+
+    def cancel(self):
+        """Drop a pending keystroke and any query still in flight."""
+        self._trigger.cancel()
+        self._pending = None
+        self.executor.cancel(self.key)
+
+    def invalidate(self):
+        """Forget the cached result set (call after the underlying data changes)."""
+        self._last_term = None
+        self._last_rows = None
+
+    # ---------- Internals ----------
+    def _complete(self, rows):
+        return self.page_size is None or len(rows) < self.page_size
+
+    def _run(self, *args):
+        term, typed_at = self._pending, self._typed_at
+        if term is None:
+            return
+        self._pending = None
+
+        if (self._last_rows is not None and term.startswith(self._last_term)
+                and self._complete(self._last_rows)):
+            self.reused += 1
+            # A newer in-memory result also supersedes a query still in flight
+            self.executor.cancel(self.key)
+            rows = [row for row in self._last_rows if self.matches(row, term)]
+            self._deliver(term, rows, typed_at)
+            return
+
+        self.queries += 1
+        self.executor.submit(
+            self.fetch, term,
+            callback=lambda rows: self._deliver(term, rows, typed_at),
+            key=self.key
+        )
+
+    def _deliver(self, term, rows, typed_at):
+        self._last_term, self._last_rows = term, rows
+        self.latencies.append((time.perf_counter() - typed_at) * 1000)
+        self.on_results(term, rows)
+        Logger.debug(f"Search[{self.key}]: {self.report()}")
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "keystrokes": self.keystrokes,
+            "queries": self.queries,
+            "reused": self.reused,
+            "saved": self.keystrokes - self.queries,
+            "latency_ms_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        return (f"{s['keystrokes']} keystrokes, {s['queries']} queries "
+                f"({s['saved']} saved, {s['reused']} served from memory), "
+                f"latency avg {s['latency_ms_avg']:.1f} ms / p95 {s['latency_ms_p95']:.1f} ms")
@@ -0,0 +1,449 @@
+"""
+Delta sync between devices.
+
+Every synced row carries a global id (gid), the UTC time and device of its
+last change and a change number (seq) from its database's counter;
+deletes leave a tombstone (see migration 7). A device exports the rows
+and tombstones changed since the last change a peer confirmed, and the
+peer applies them in one transaction, so a sync costs time in proportion
+to the number of changes, not the size of either database.
+
+    python sync.py status --db kayscoops.db
+    python sync.py export --db kayscoops.db --peer <device id> --out sync/
+    python sync.py import sync/kayscoops-1a2b3c4d-120.json.gz --db kayscoops.db
+
+Conflicts are settled per row: the change with the later updated_at wins,
+and equal times go to the higher device id, so every device ends up with
+the same row whatever order files arrive in. A delete wins over an edit
+made before it and loses to one made after. Stock changes not tied to an
+order are exchanged as ledger movements and added up; total_spent, stock
+sold, the daily summaries and the picker statistics are rebuilt from the
+synced rows by triggers rather than sent.
+
+A database copied to set up another device keeps the first device's id;
+run `python sync.py new-device --db <copy>` on the copy before syncing.
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from db_ops import local_now_str, normalize_email
+from db_trace import timed
+from migrations import rebuild_daily_sales
+from row_cache import get_cache
+
+FORMAT = 1
+
+# Synced columns in dependency order; a reference is sent as the gid of
+# the row it points at, since local ids differ between devices
+TABLES = [
+    ("clients", [("name", None), ("contact_info", None), ("email", None)]),
+    ("items", [("name", None), ("cost_price", None), ("selling_price", None)]),
+    ("scoops", [("client_id", "clients"), ("date", None), ("total_price", None), ("video_url", None)]),
+    ("scoop_items", [("scoop_id", "scoops"), ("item_id", "items"), ("quantity", None)]),
+]
+# Append-only: applied once, never updated or deleted
+MOVEMENT_COLUMNS = [("item_id", "items"), ("kind", None), ("change", None)]
+
+
+class SyncError(Exception):
+    """A change file that cannot be applied to this database."""
+
+
+def _export_query(table, columns, stamp="t.updated_at"):
+    select = ["t.gid", stamp, "t.updated_by"]
+    joins = []
+    for n, (column, ref) in enumerate(columns):
+        if ref:
+            joins.append(f"JOIN {ref} r{n} ON r{n}.id = t.{column}")
+            select.append(f"r{n}.gid")
+        else:
+            select.append(f"t.{column}")
+    # Rows last changed by the peer itself are already there
+    return f"""
+        SELECT {", ".join(select)} FROM {table} t {" ".join(joins)}
+        WHERE t.seq > ? AND t.seq <= ? AND t.updated_by IS NOT ?
+        ORDER BY t.seq
+    """
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def sync_state(conn):
+    """(device_id, last change number) of this database."""
+    return conn.execute("SELECT device_id, seq FROM sync_state WHERE id = 1").fetchone()
+
+
+@timed
+def export_changes(db, peer=None):
+    """
+    Everything changed since `peer` (a device id) last confirmed our
+    changes, as a plain dict ready for JSON. Without a peer, or for a
+    device never synced with, that is every row.
+    """
+    with db.reader() as conn:
+        # Read the counter first: rows changed while exporting have a higher
+        # seq and go out next time instead of being half-included now
+        device, seq = sync_state(conn)
+        peers = dict(conn.execute("SELECT device_id, acked_seq FROM sync_peers").fetchall())
+        since = peers.get(peer, 0)
+        params = (since, seq, peer)
+
+        changes = {}
+        for table, columns in TABLES:
+            changes[table] = {
+                "columns": ["gid", "updated_at", "updated_by"] + [c for c, _ in columns],
+                "rows": [list(row) for row in conn.execute(_export_query(table, columns), params)],
+            }
+        changes["stock_movements"] = {
+            "columns": ["gid", "at", "updated_by"] + [c for c, _ in MOVEMENT_COLUMNS],
+            "rows": [
+                list(row) for row in
+                conn.execute(_export_query("stock_movements", MOVEMENT_COLUMNS, stamp="t.at"), params)
+            ],
+        }
+        deleted = [list(row) for row in conn.execute("""
+            SELECT gid, tbl, deleted_at, deleted_by FROM sync_tombstones
+            WHERE seq > ? AND seq <= ? AND deleted_by IS NOT ?
+            ORDER BY seq
+        """, params)]
+        acks = dict(conn.execute("SELECT device_id, received_seq FROM sync_peers").fetchall())
+
+    return {
+        "format": FORMAT,
+        "device": device,
+        "since": since,
+        "seq": seq,
+        "acks": acks,
+        "changes": changes,
+        "deleted": deleted,
+    }
+
+
+def write_changes(db, directory, peer=None):
+    """export_changes() as a gzipped JSON file in directory; returns (path, row count)."""
+    payload = export_changes(db, peer)
+    os.makedirs(directory, exist_ok=True)
+    name = f"kayscoops-{payload['device'][:8]}-{payload['seq']}.json.gz"
+    path = os.path.join(directory, name)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    count = sum(len(t["rows"]) for t in payload["changes"].values()) + len(payload["deleted"])
+    return path, count
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _find(cursor, table, gid, extra=""):
+    """(id, updated_at, updated_by[, extra]) of the row with this gid or an alias of it."""
+    select = f"SELECT id, updated_at, updated_by{extra} FROM {table} WHERE gid = ?"
+    row = cursor.execute(select, (gid,)).fetchone()
+    if row is None:
+        alias = cursor.execute("SELECT target_gid FROM sync_aliases WHERE gid = ?", (gid,)).fetchone()
+        if alias:
+            row = cursor.execute(select, alias).fetchone()
+    return row
+
+
+def _scoop_day(cursor, scoop_id):
+    row = cursor.execute("SELECT substr(date, 1, 10) FROM scoops WHERE id = ?", (scoop_id,)).fetchone()
+    return row[0] if row else None
+
+
+class _Apply:
+    """State of one import: the change number it writes under and what it touched."""
+
+    def __init__(self, cursor, seq):
+        self.cursor = cursor
+        self.seq = seq
+        self.days = set()
+        self.report = {"applied": 0, "deleted": 0, "stale": 0, "skipped": 0}
+
+    def _values(self, columns, values):
+        """Incoming values with references turned into local ids (None if a target is missing)."""
+        local = []
+        for (column, ref), value in zip(columns, values):
+            if ref and value is not None:
+                row = _find(self.cursor, ref, value)
+                if row is None:
+                    return None
+                value = row[0]
+            local.append(value)
+        return local
+
+    def _touch(self, table, row_id, values=None):
+        # Days whose summary rows need recomputing
+        if table == "scoops":
+            self.days.add(_scoop_day(self.cursor, row_id))
+            if values:
+                self.days.add(values[1][:10])
+        elif table == "scoop_items":
+            scoop_id = values[0] if values else self.cursor.execute(
+                "SELECT scoop_id FROM scoop_items WHERE id = ?", (row_id,)
+            ).fetchone()[0]
+            self.days.add(_scoop_day(self.cursor, scoop_id))
+
+    def row(self, table, columns, row):
+        gid, updated_at, updated_by, *values = row
+        values = self._values(columns, values)
+        if values is None:
+            # Points at a row deleted here (or never received): nothing to attach it to
+            self.report["skipped"] += 1
+            return
+        local = _find(self.cursor, table, gid)
+        if local is not None:
+            self._update(table, columns, local, values, updated_at, updated_by)
+            return
+
+        tombstone = self.cursor.execute(
+            "SELECT deleted_at, deleted_by FROM sync_tombstones WHERE gid = ?", (gid,)
+        ).fetchone()
+        if tombstone and tuple(tombstone) >= (updated_at, updated_by):
+            self.report["stale"] += 1
+            return
+        names = [c for c, _ in columns] + ["gid", "updated_at", "updated_by", "seq"]
+        params = values + [gid, updated_at, updated_by, self.seq]
+        if table == "items":
+            # Stock arrives separately, as ledger movements
+            names.append("quantity")
+            params.append(0)
+        try:
+            self.cursor.execute(
+                f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})", params
+            )
+        except sqlite3.IntegrityError:
+            if table != "clients":
+                raise
+            # Same email registered on both devices: one client with two gids
+            existing = self.cursor.execute(
+                """SELECT id, updated_at, updated_by, gid FROM clients
+                   WHERE LOWER(TRIM(email)) = ? AND email IS NOT NULL AND TRIM(email) != ''""",
+                (normalize_email(values[2]),)
+            ).fetchone()
+            if existing is None:
+                raise
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO sync_aliases (gid, tbl, target_gid) VALUES (?, ?, ?)",
+                (gid, table, existing[3])
+            )
+            self._update(table, columns, existing[:3], values, updated_at, updated_by)
+            return
+        if tombstone:
+            # Edited after it was deleted: the row is back everywhere
+            self.cursor.execute("DELETE FROM sync_tombstones WHERE gid = ?", (gid,))
+        self._touch(table, self.cursor.lastrowid, values)
+        self.report["applied"] += 1
+
+    def _update(self, table, columns, local, values, updated_at, updated_by):
+        row_id, local_at, local_by = local
+        if (updated_at, updated_by) <= (local_at, local_by):
+            self.report["stale"] += 1
+            return
+        self._touch(table, row_id)
+        assignments = ", ".join(f"{c} = ?" for c, _ in columns)
+        try:
+            self.cursor.execute(
+                f"UPDATE {table} SET {assignments}, updated_at = ?, updated_by = ?, seq = ? WHERE id = ?",
+                values + [updated_at, updated_by, self.seq, row_id]
+            )
+        except sqlite3.IntegrityError:
+            # The new email belongs to another client here
+            self.report["skipped"] += 1
+            return
+        self._touch(table, row_id, values)
+        self.report["applied"] += 1
+
+    def movement(self, row):
+        gid, _, updated_by, *values = row
+        if self.cursor.execute("SELECT 1 FROM stock_movements WHERE gid = ?", (gid,)).fetchone():
+            self.report["stale"] += 1
+            return
+        values = self._values(MOVEMENT_COLUMNS, values)
+        if values is None:
+            self.report["skipped"] += 1
+            return
+        item_id, kind, change = values
+        self.cursor.execute("""
+            INSERT INTO stock_movements (item_id, at, kind, change, gid, updated_by, seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (item_id, local_now_str(), kind, change, gid, updated_by, self.seq))
+        self.cursor.execute("UPDATE items SET quantity = quantity + ? WHERE id = ?", (change, item_id))
+        self.report["applied"] += 1
+
+    def delete(self, gid, table, deleted_at, deleted_by):
+        tombstone = self.cursor.execute(
+            "SELECT deleted_at, deleted_by FROM sync_tombstones WHERE gid = ?", (gid,)
+        ).fetchone()
+        if tombstone and tuple(tombstone) >= (deleted_at, deleted_by):
+            self.report["stale"] += 1
+            return
+        local = _find(self.cursor, table, gid)
+        if local is not None:
+            if (deleted_at, deleted_by) <= tuple(local[1:]):
+                # Edited here after the other device deleted it: the edit wins
+                self.report["stale"] += 1
+                return
+            self._touch(table, local[0])
+            try:
+                self.cursor.execute(f"DELETE FROM {table} WHERE id = ?", (local[0],))
+            except sqlite3.IntegrityError:
+                # Still referenced here (orders of a deleted client); keep it
+                self.report["skipped"] += 1
+                return
+            self.report["deleted"] += 1
+        # Keep the other device's tombstone so it travels on unchanged
+        self.cursor.execute("""
+            INSERT OR REPLACE INTO sync_tombstones (gid, tbl, deleted_at, deleted_by, seq)
+            VALUES (?, ?, ?, ?, ?)
+        """, (gid, table, deleted_at, deleted_by, self.seq))
+
+
+@timed
+def import_changes(db, payload):
+    """
+    Apply a dict from export_changes() in one transaction and return a
+    report of applied, deleted, stale (older than what is here) and
+    skipped rows. Raises SyncError for a file this database cannot use.
+    """
+    if payload.get("format") != FORMAT:
+        raise SyncError(f"Unsupported change file format {payload.get('format')!r}")
+    started = time.perf_counter()
+    peer = payload["device"]
+    order = [table for table, _ in TABLES]
+
+    with db.writer(immediate=True) as conn:
+        cursor = conn.cursor()
+        device, seq = sync_state(cursor)
+        if peer == device:
+            raise SyncError("This change file was exported from this device")
+        received = cursor.execute(
+            "SELECT received_seq FROM sync_peers WHERE device_id = ?", (peer,)
+        ).fetchone()
+        if payload["since"] > (received[0] if received else 0):
+            raise SyncError(
+                "Changes are missing between the last import from this device and this file; "
+                "export again from the other device"
+            )
+
+        # Everything applied here shares one new change number, so it is
+        # passed on to other devices with our next export
+        seq += 1
+        cursor.execute("UPDATE sync_state SET seq = ? WHERE id = 1", (seq,))
+        last_movement = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements").fetchone()[0]
+        apply = _Apply(cursor, seq)
+
+        for table, columns in TABLES:
+            for row in payload["changes"].get(table, {}).get("rows", []):
+                apply.row(table, columns, row)
+        for row in payload["changes"].get("stock_movements", {}).get("rows", []):
+            apply.movement(row)
+        # Children before parents, so an order's lines go before the order
+        for gid, table, deleted_at, deleted_by in sorted(
+            payload["deleted"], key=lambda d: -order.index(d[1])
+        ):
+            apply.delete(gid, table, deleted_at, deleted_by)
+
+        # The ledger assumes movement ids grow with time; stock moved by this
+        # import is recorded as of now, not as of the original sale
+        cursor.execute(
+            "UPDATE stock_movements SET at = ? WHERE id > ?", (local_now_str(), last_movement)
+        )
+        apply.days.discard(None)
+        rebuild_daily_sales(cursor, sorted(apply.days))
+
+        cursor.execute("""
+            INSERT INTO sync_peers (device_id, received_seq, acked_seq, synced_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(device_id) DO UPDATE SET
+                received_seq = MAX(received_seq, excluded.received_seq),
+                acked_seq = MAX(acked_seq, excluded.acked_seq),
+                synced_at = excluded.synced_at
+        """, (peer, payload["seq"], payload["acks"].get(device, 0), local_now_str()))
+
+    for table in ("clients", "items"):
+        get_cache(db.db_path, table).clear()
+    report = apply.report
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def read_changes(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def import_file(db, path):
+    return import_changes(db, read_changes(path))
+
+
+# -----------------------------
+# Devices
+# -----------------------------
+def peers(db):
+    """(device_id, received_seq, acked_seq, synced_at) of every device synced with."""
+    with db.reader() as conn:
+        return conn.execute(
+            "SELECT device_id, received_seq, acked_seq, synced_at FROM sync_peers ORDER BY synced_at DESC"
+        ).fetchall()
+
+
+def new_device(db):
+    """Give a copied database its own device id and forget the copied sync history."""
+    device = uuid.uuid4().hex
+    with db.writer(immediate=True) as conn:
+        conn.execute("UPDATE sync_state SET device_id = ? WHERE id = 1", (device,))
+        conn.execute("DELETE FROM sync_peers")
+    return device
+
+
+# -----------------------------
+# Command line
+# -----------------------------
+def main():
+    from db import init_db
+    from db_ops import DBOps
+
+    parser = argparse.ArgumentParser(description="Delta sync between KayScoops devices")
+    parser.add_argument("action", choices=["status", "export", "import", "new-device"])
+    parser.add_argument("path", nargs="?", help="change file to import")
+    parser.add_argument("--db", required=True, help="path to kayscoops.db")
+    parser.add_argument("--peer", help="device id to export for (default: everything)")
+    parser.add_argument("--out", default=".", help="directory for exported change files")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    db = DBOps(args.db)
+
+    if args.action == "status":
+        with db.reader() as conn:
+            device, seq = sync_state(conn)
+        print(f"Device {device}, change {seq}")
+        for peer, received, acked, synced_at in peers(db):
+            print(f"  {peer}: received up to {received}, they have up to {acked} (last sync {synced_at})")
+    elif args.action == "export":
+        start = time.perf_counter()
+        path, count = write_changes(db, args.out, args.peer)
+        print(f"Exported {count} changes to {path} in {time.perf_counter() - start:.2f}s")
+    elif args.action == "import":
+        if not args.path:
+            parser.error("import needs a change file")
+        try:
+            report = import_file(db, args.path)
+        except SyncError as e:
+            raise SystemExit(f"Sync failed: {e}")
+        print(f"Applied {report['applied']}, deleted {report['deleted']}, "
+              f"{report['stale']} already newer here, {report['skipped']} skipped "
+              f"in {report['seconds']:.2f}s")
+    else:
+        print(f"New device id {new_device(db)}")
+
+
+if __name__ == "__main__":
+    main()
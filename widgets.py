@@ -0,0 +1,50 @@
+import importlib
+import time
+
+from kivy.metrics import dp
+from kivy.uix.screenmanager import ScreenManager
+
+
+def scrolled_near_end(view, margin=None):
+    """True when a ScrollView/RecycleView is within margin pixels of its bottom."""
+    if not view.children:
+        return False
+    if margin is None:
+        margin = dp(200)
+    hidden = view.children[0].height - view.height
+    if hidden <= 0:
+        return True
+    # scroll_y runs from 1 (top) to 0 (bottom)
+    return view.scroll_y * hidden <= margin
+
+
+class LazyScreenManager(ScreenManager):
+    """
+    ScreenManager that builds each screen the first time it is shown or
+    looked up. screens maps a screen name to "module:ClassName"; the
+    module, and the kv file it loads, is only imported at that point.
+    """
+
+    def __init__(self, screens, **kwargs):
+        self.factories = dict(screens)
+        self.build_times = {}   # screen name -> seconds spent importing and building it
+        super().__init__(**kwargs)
+
+    def get_screen(self, name):
+        self._ensure_screen(name)
+        return super().get_screen(name)
+
+    def on_current(self, instance, value):
+        if value:
+            self._ensure_screen(value)
+        super().on_current(instance, value)
+
+    def _ensure_screen(self, name):
+        if name not in self.factories or self.has_screen(name):
+            return
+        start = time.perf_counter()
+        module_name, class_name = self.factories[name].split(":")
+        screen_class = getattr(importlib.import_module(module_name), class_name)
+        self.add_widget(screen_class(name=name))
+        self.build_times[name] = time.perf_counter() - start
+        print(f"Built screen '{name}' in {self.build_times[name] * 1000:.0f} ms")